@@ -1,16 +1,31 @@
 import argparse
+import json
 import logging
 import os
 import re
-import requests
 import streamlit as st
-import tldextract
 import traceback
+import uuid
 
 from agents.Web_Agent import Web_Agent
 from agents.News_Agent import News_Agent
+from agents.news_cache import get_news_cache
+from agents.news_time import parse_since
+from agents.prefetcher import get_prefetcher
+from agents.search_overfetch import overfetch_tracker
+from agents.summary_cache import get_summary_cache
+from providers.image_pipeline import image_pipeline_stats
+from providers.latency_tracker import latency_tracker
+from providers.model_registry import model_registry
+from providers.model_selector import AUTO_MODEL
+from providers.provider_registry import provider_registry
+from providers.rate_limiter import rate_limiters
+from providers.response_cache import get_response_cache
+from providers.token_estimator import token_estimate_stats
+from providers.vision_cache import get_vision_cache
+from tools.domain_utils import domain_cache_info, root_domain
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from urllib.parse import quote_plus, unquote_plus, urlparse
 
 # Load environment variables from .env file
@@ -41,25 +56,9 @@ def sanitize_message(message):
     except UnicodeEncodeError:
         return message.encode("ascii", "ignore").decode("ascii")
 
-@st.cache_data
 def fetch_groq_models(api_key):
-    url = "https://api.groq.com/openai/v1/models"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        models = response.json()['data']
-        return {model['id']: model for model in models}
-    except Exception as e:
-        log_debug(f"Error fetching Groq models: {str(e)}")
-        return {
-            "llama3-8b-8192": {"id": "llama3-8b-8192", "context_window": 32768},
-            "llama2-70b-4096": {"id": "llama2-70b-4096", "context_window": 4096},
-            "llama-3.2-11b-vision-preview": {"id": "llama-3.2-11b-vision-preview", "context_window": 4096}
-        }
+    # The registry caches the list for MODEL_LIST_TTL and falls back to its last snapshot offline
+    return model_registry.models(api_key)
 
 def get_groq_api_key(api_key_arg: str = None) -> str:
     # Check URL parameters first
@@ -129,21 +128,37 @@ def is_image_url(url: str) -> bool:
     parsed_url = urlparse(url)
     return parsed_url.scheme in ['http', 'https'] and any(parsed_url.path.lower().endswith(ext) for ext in image_extensions)
 
+def create_vision_agent(api_key: str):
+    return Web_Agent(
+        api_key,
+        num_results=1,
+        max_tokens=model_registry.clamp_max_tokens("llama-3.2-11b-vision-preview", st.session_state.context_window),
+        model="llama-3.2-11b-vision-preview",
+        temperature=st.session_state.temperature,
+        comprehension_grade=st.session_state.comprehension_grade,
+        summary_length=st.session_state.summary_length
+    )
+
+def process_uploaded_image(image_bytes: bytes, custom_prompt: str, api_key: str):
+    try:
+        agent = create_vision_agent(api_key)
+        return agent._process_image_request(image_bytes, custom_prompt or "Describe this image in one sentence.")
+    except Exception as e:
+        st.error(f"An error occurred while processing the image: {str(e)}")
+        return [{
+            "title": "Error",
+            "url": "",
+            "description": f"An error occurred while analyzing the image: {str(e)}",
+            "prompt_used": custom_prompt
+        }]
+
 def process_image(query: str, api_key: str):
     image_url, custom_prompt = extract_url_and_prompt(query)
     if not image_url:
         return None
 
     try:
-        agent = Web_Agent(
-            api_key,
-            num_results=1,
-            max_tokens=st.session_state.context_window,
-            model="llama-3.2-11b-vision-preview",
-            temperature=st.session_state.temperature,
-            comprehension_grade=st.session_state.comprehension_grade,
-            summary_length=st.session_state.summary_length
-        )
+        agent = create_vision_agent(api_key)
         results = agent._process_image_request(image_url, custom_prompt)
         return results
     except Exception as e:
@@ -190,14 +205,19 @@ def update_sidebar(models):
             value=st.session_state.summary_length, 
             step=10
         )
+        # "auto" picks a model per page from its size and observed latency
+        model_options = [AUTO_MODEL] + list(models.keys())
         st.session_state.selected_model = st.selectbox(
             "Select Model", 
-            list(models.keys()),
-            index=list(models.keys()).index(st.session_state.selected_model) if st.session_state.selected_model in models else 0
+            model_options,
+            index=model_options.index(st.session_state.selected_model) if st.session_state.selected_model in model_options else 0
         )
 
         # Context window slider
-        max_context = models[st.session_state.selected_model]['context_window']
+        if st.session_state.selected_model == AUTO_MODEL:
+            max_context = max(1024, max(model['context_window'] for model in models.values()))
+        else:
+            max_context = max(1024, models[st.session_state.selected_model]['context_window'])
         st.session_state.context_window = st.slider(
             "Context Window",
             min_value=1024,
@@ -250,6 +270,15 @@ def update_sidebar(models):
         # Add Humanize checkbox
         st.session_state.humanize = st.checkbox("Humanize", value=False, key="humanize_checkbox")
 
+        # Background prefetching of the top results so summaries open quickly
+        st.session_state.prefetch = st.checkbox("Prefetch top results", value=False, key="prefetch_checkbox")
+        st.session_state.presummarize = st.checkbox(
+            "Pre-summarize prefetched results",
+            value=False,
+            key="presummarize_checkbox",
+            disabled=not st.session_state.prefetch
+        )
+
 def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096, default_summary_length: int = 300):
     st.set_page_config(page_title="Groqqle", layout="wide", initial_sidebar_state="collapsed")
 
@@ -259,7 +288,7 @@ def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096,
     if 'summary_length' not in st.session_state:
         st.session_state.summary_length = default_summary_length
     if 'selected_model' not in st.session_state:
-        st.session_state.selected_model = "llama3-8b-8192"
+        st.session_state.selected_model = AUTO_MODEL
     if 'temperature' not in st.session_state:
         st.session_state.temperature = 0.0
     if 'comprehension_grade' not in st.session_state:
@@ -267,13 +296,12 @@ def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096,
     if 'context_window' not in st.session_state:
         st.session_state.context_window = max_tokens
     if 'models' not in st.session_state:
-        st.session_state.models = {
-            "llama3-8b-8192": {"id": "llama3-8b-8192", "context_window": 32768},
-            "llama2-70b-4096": {"id": "llama2-70b-4096", "context_window": 4096},
-            "llama-3.2-11b-vision-preview": {"id": "llama-3.2-11b-vision-preview", "context_window": 4096}
-        }
+        st.session_state.models = model_registry.models()
     if 'search_type' not in st.session_state:
         st.session_state.search_type = "Web"
+    if 'session_id' not in st.session_state:
+        # Keys per-session background work such as prefetching
+        st.session_state.session_id = uuid.uuid4().hex
     if 'api_key_source' not in st.session_state:
         st.session_state.api_key_source = 'none'
 
@@ -379,6 +407,8 @@ def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096,
                 perform_search()
         with col2:
             search_type = st.radio("Search Type", ["Web", "News"], index=0, key="search_type", on_change=update_search_type)
+        with col3:
+            st.checkbox("Deep Search", value=False, key="deep_search", help="Fetch and summarize the top results", disabled=st.session_state.search_type == 'News')
         with col4:
             json_results = st.checkbox("JSON Results", value=False, key="json_results")
 
@@ -396,9 +426,12 @@ def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096,
                                 st.session_state.image_url = url
                                 st.session_state.image_prompt = image_results[0].get('prompt_used', "Describe this image in one sentence.")
                                 display_results(image_results, json_results, api_key)
-                        else:
+                        elif json_results:
                             summary = summarize_url(url, api_key, st.session_state.comprehension_grade, st.session_state.temperature)
                             display_results([summary], json_results, api_key)
+                        else:
+                            st.markdown("---")
+                            render_streamed_summary(url, api_key, st.session_state.comprehension_grade, st.session_state.temperature)
                 elif 'search_results' in st.session_state and st.session_state.search_results:
                     display_results(st.session_state.search_results, json_results, api_key)
                 else:
@@ -408,6 +441,19 @@ def main(api_key_arg: str = None, num_results: int = 10, max_tokens: int = 4096,
 
     with image_col:
         st.markdown('<div class="image-analysis">', unsafe_allow_html=True)
+        uploaded_image = st.file_uploader("Upload an image to analyze", type=["jpg", "jpeg", "png", "gif", "bmp", "webp"], key="image_upload")
+        if uploaded_image is not None:
+            image_prompt = st.text_input("Question about the image", value="Describe this image in one sentence.", key="image_upload_prompt")
+            if st.button("Analyze Image", key="analyze_image_button"):
+                if not validate_api_key(api_key):
+                    st.error("Please enter a valid Groq API Key in the sidebar to use Groqqle.")
+                else:
+                    with st.spinner('Analyzing image...'):
+                        image_bytes = uploaded_image.getvalue()
+                        image_results = process_uploaded_image(image_bytes, image_prompt, api_key)
+                        st.session_state.image_analysis = image_results[0]['description']
+                        st.session_state.image_url = image_bytes
+                        st.session_state.image_prompt = image_results[0].get('prompt_used', image_prompt)
         if 'image_analysis' in st.session_state and 'image_url' in st.session_state:
             st.image(st.session_state.image_url, use_column_width=True)
             st.markdown("### IMAGE ANALYSIS")
@@ -424,14 +470,18 @@ def perform_search():
     num_results = st.session_state.num_results
     summary_length = st.session_state.summary_length
     selected_model = st.session_state.selected_model
-    context_window = st.session_state.context_window
+    context_window = model_registry.clamp_max_tokens(selected_model, st.session_state.context_window)
     temperature = 0 if st.session_state.search_type == 'News' else st.session_state.temperature
     comprehension_grade = st.session_state.comprehension_grade
     search_type = st.session_state.search_type
+    humanize = st.session_state.get('humanize', False)
+    deep_search = st.session_state.get('deep_search', False)
 
     log_debug(f"perform_search: comprehension_grade = {comprehension_grade}, temperature = {temperature}, search_type = {search_type}")
 
     if query and api_key:
+        # A new query makes any prefetching for the previous results pointless
+        get_prefetcher().cancel(st.session_state.session_id)
         with st.spinner('Processing...'):
             log_debug(f"Processing query: {query}")
             url, _ = extract_url_and_prompt(query)
@@ -447,7 +497,7 @@ def perform_search():
                         temperature=temperature,
                         comprehension_grade=comprehension_grade,
                         summary_length=summary_length,
-                        humanize=data.get("humanize", False) 
+                        humanize=humanize
                     )
                     results = [summarize_url(url, api_key, comprehension_grade, temperature)]
             elif search_type == "Web":
@@ -459,9 +509,9 @@ def perform_search():
                     temperature=temperature,
                     comprehension_grade=comprehension_grade,
                     summary_length=summary_length,
-                    humanize=data.get("humanize", False) 
+                    humanize=humanize
                 )
-                results = agent.process_request(query)
+                results = agent.process_request(query, deep=deep_search)
             else:  # News search
                 agent = News_Agent(
                     api_key,
@@ -475,28 +525,39 @@ def perform_search():
             
             log_debug(f"Processing completed. Number of results: {len(results)}")
         st.session_state.search_results = results
+
+        if st.session_state.get('prefetch') and not url:
+            try:
+                summary_agent = create_summary_agent(api_key, comprehension_grade, temperature)
+                get_prefetcher().prefetch(summary_agent, results, summarize=st.session_state.get('presummarize', False), session=st.session_state.session_id)
+            except Exception as e:
+                log_debug(f"Error starting prefetch: {str(e)}")
     else:
         if not api_key:
             st.error("Please provide a valid Groq API Key in the sidebar to perform the search.")
         if not query:
             st.error("Please enter a search query or URL.")
 
+def create_summary_agent(api_key, comprehension_grade, temperature):
+    summary_length = st.session_state.summary_length
+    agent = Web_Agent(
+        api_key,
+        num_results=1,
+        max_tokens=4096,
+        comprehension_grade=comprehension_grade,
+        temperature=temperature,
+        summary_length=summary_length,
+        humanize=st.session_state.get('humanize', False)
+    )
+    log_debug(f"Web_Agent initialized for URL summary with comprehension grade: {comprehension_grade}, temperature: {temperature}, and summary_length: {summary_length}")
+    return agent
+
 def summarize_url(url, api_key, comprehension_grade, temperature):
     if not validate_api_key(api_key):
         return {"title": "API Key Required", "url": url, "description": "A valid Groq API key is required to summarize content. Please enter it in the sidebar."}
     
-    summary_length = st.session_state.summary_length
     try:
-        agent = Web_Agent(
-            api_key,
-            num_results=1,
-            max_tokens=4096,
-            comprehension_grade=comprehension_grade,
-            temperature=temperature,
-            summary_length=summary_length,
-            humanize=data.get("humanize", False) 
-        )
-        log_debug(f"Web_Agent initialized for URL summary with comprehension grade: {comprehension_grade}, temperature: {temperature}, and summary_length: {summary_length}")
+        agent = create_summary_agent(api_key, comprehension_grade, temperature)
         summary_result = agent.process_request(url)
         if summary_result and len(summary_result) > 0:
             return summary_result[0]
@@ -506,6 +567,41 @@ def summarize_url(url, api_key, comprehension_grade, temperature):
         log_debug(f"Error in summarize_url: {str(e)}")
         return {"title": "Summary Error", "url": url, "description": f"Error generating summary: {str(e)}"}
 
+def render_streamed_summary(url, api_key, comprehension_grade, temperature):
+    if not validate_api_key(api_key):
+        st.markdown("##### API Key Required")
+        st.markdown("A valid Groq API key is required to summarize content. Please enter it in the sidebar.")
+        return None
+
+    headline_placeholder = st.empty()
+    headline_placeholder.markdown("##### Summary:<br/>...", unsafe_allow_html=True)
+    st.markdown(f"*Source: [{url}]({url})*")
+    summary = {}
+
+    def body_stream():
+        try:
+            agent = create_summary_agent(api_key, comprehension_grade, temperature)
+            for event in agent.stream_summary(url):
+                if event['event'] == 'headline':
+                    headline_placeholder.markdown(f"##### Summary:<br/>{event['data']}", unsafe_allow_html=True)
+                elif event['event'] == 'delta':
+                    yield event['data']
+                elif event['event'] == 'done':
+                    summary.update(event['data'])
+                elif event['event'] == 'error':
+                    headline_placeholder.markdown("##### Summary Error")
+                    yield event['data']
+        except Exception as e:
+            log_debug(f"Error in render_streamed_summary: {str(e)}")
+            headline_placeholder.markdown("##### Summary Error")
+            yield f"Error generating summary: {str(e)}"
+
+    st.write_stream(body_stream())
+    return summary
+
+def format_sse(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
 def display_results(results, json_format=False, api_key=None):
     log_debug(f"display_results called with {len(results)} results")
     
@@ -530,10 +626,12 @@ def display_results(results, json_format=False, api_key=None):
                 
                 if is_news_search:
                     # For news search, extract root domain from URL
-                    ext = tldextract.extract(result['url'])
-                    source = f"{ext.domain}.{ext.suffix}"
+                    source = root_domain(result['url'])
                     st.markdown(f"*Source: {source}*")
                     st.markdown(f"*Published: {result['timestamp']}*")
+                    if result.get('alternate_sources'):
+                        alternates = ", ".join(f"[{alt['source'] or alt['url']}]({alt['url']})" for alt in result['alternate_sources'])
+                        st.markdown(f"*Also covered by: {alternates}*")
                 else:
                     # For web search, use the original source if available
                     source = result.get('source')
@@ -541,20 +639,15 @@ def display_results(results, json_format=False, api_key=None):
                         st.markdown(f"*Source: {source}*")
                     else:
                         # Fallback to domain extraction if source is not available or Unknown
-                        ext = tldextract.extract(result['url'])
-                        source = f"{ext.domain}.{ext.suffix}"
+                        source = root_domain(result['url'])
                         st.markdown(f"*Source: {source}*")
                 
                 st.markdown(result['description'])
                 
                 if summary_button:
-                    with st.spinner("Generating summary..."):
-                        summary = summarize_url(result['url'], api_key, st.session_state.comprehension_grade, st.session_state.temperature)
-                        st.markdown("---")
-                        st.markdown(f"##### Summary:<br/>{summary['title']}", unsafe_allow_html=True)
-                        st.markdown(f"*Source: [{summary['url']}]({summary['url']})*")
-                        st.markdown(summary['description'])
-                        st.markdown("---")
+                    st.markdown("---")
+                    render_streamed_summary(result['url'], api_key, st.session_state.comprehension_grade, st.session_state.temperature)
+                    st.markdown("---")
                 
                 st.markdown("---")  # Add a separator between results
 
@@ -564,34 +657,54 @@ def display_results(results, json_format=False, api_key=None):
 def create_api_app(api_key_arg: str = None, default_num_results: int = 10, default_max_tokens: int = 4096, default_summary_length: int = 300):
     app = Flask(__name__)
 
-    @app.route('/search', methods=['POST'])
-    def api_search():
+    def request_api_key():
         # Check for API key in Authorization header
         auth_header = request.headers.get('Authorization')
         if auth_header and auth_header.startswith('Bearer '):
-            api_key = auth_header.split('Bearer ')[1]
-        else:
-            # Fallback to environment variable if no Authorization header
-            api_key = api_key_arg or os.getenv('GROQ_API_KEY')
+            return auth_header.split('Bearer ')[1]
+        # Fallback to environment variable if no Authorization header
+        return api_key_arg or os.getenv('GROQ_API_KEY')
 
+    def request_max_tokens(data, api_key):
+        # Never ask for more than the model's context window, whatever the client sent
+        model_registry.models(api_key)
+        return model_registry.clamp_max_tokens(data.get('model', AUTO_MODEL), data.get('max_tokens', default_max_tokens))
+
+    missing_key_error = "No API key provided. Please include it in the Authorization header as 'Bearer YOUR_API_KEY' or set it as an environment variable."
+
+    @app.route('/search', methods=['POST'])
+    def api_search():
+        api_key = request_api_key()
         if not api_key:
-            return jsonify({"error": "No API key provided. Please include it in the Authorization header as 'Bearer YOUR_API_KEY' or set it as an environment variable."}), 401
+            return jsonify({"error": missing_key_error}), 401
 
         data = request.json
         query = data.get('query')
         num_results = data.get('num_results', default_num_results)
-        max_tokens = data.get('max_tokens', default_max_tokens)
+        max_tokens = request_max_tokens(data, api_key)
         summary_length = data.get('summary_length', default_summary_length)
-        model = data.get('model', 'llama3-8b-8192')
+        model = data.get('model', AUTO_MODEL)
         temperature = data.get('temperature', 0.0)
         comprehension_grade = data.get('comprehension_grade', 8)
         search_type = data.get('search_type', 'web').lower()
         custom_prompt = data.get('custom_prompt')
+        deep = data.get('deep', False)
+        stream = data.get('stream', False)
+        deep_top_n = data.get('deep_top_n')
+        deep_min_summaries = data.get('deep_min_summaries')
+        cluster = data.get('cluster_stories', True)
+        since = data.get('since')
+        latency_target = data.get('latency_target')
         
         if not query:
             return jsonify({"error": "No query provided"}), 400
 
-        log_debug(f"API search endpoint hit with query: {query}, num_results: {num_results}, summary_length: {summary_length}, model: {model}, max_tokens: {max_tokens}, temperature: {temperature}, comprehension_grade: {comprehension_grade}, search_type: {search_type}, custom_prompt: {custom_prompt}")
+        try:
+            since = parse_since(since)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid since value: {str(e)}"}), 400
+
+        log_debug(f"API search endpoint hit with query: {query}, num_results: {num_results}, summary_length: {summary_length}, model: {model}, max_tokens: {max_tokens}, temperature: {temperature}, comprehension_grade: {comprehension_grade}, search_type: {search_type}, custom_prompt: {custom_prompt}, deep: {deep}")
         
         try:
             agent = Web_Agent(
@@ -602,14 +715,25 @@ def create_api_app(api_key_arg: str = None, default_num_results: int = 10, defau
                 temperature=temperature,
                 comprehension_grade=comprehension_grade,
                 summary_length=summary_length,
-                humanize=data.get("humanize", False) 
+                humanize=data.get("humanize", False),
+                latency_target=latency_target
             )
 
             url, _ = extract_url_and_prompt(query)
             if url and is_image_url(url):
                 results = process_image(query, api_key)
+            elif stream and is_url(query):
+                def summary_events():
+                    try:
+                        for event in agent.stream_summary(query):
+                            yield format_sse(event)
+                    except Exception as e:
+                        log_debug(f"Error in API summary stream: {str(e)}")
+                        yield format_sse({"event": "error", "data": str(e)})
+
+                return Response(stream_with_context(summary_events()), mimetype='text/event-stream')
             elif search_type == 'web':
-                results = agent.process_request(query)
+                results = agent.process_request(query, deep=deep, deep_top_n=deep_top_n, deep_min_summaries=deep_min_summaries)
             elif search_type == 'news':
                 news_agent = News_Agent(
                     api_key, 
@@ -617,9 +741,11 @@ def create_api_app(api_key_arg: str = None, default_num_results: int = 10, defau
                     max_tokens=max_tokens, 
                     model=model,
                     temperature=temperature,
-                    comprehension_grade=comprehension_grade
+                    comprehension_grade=comprehension_grade,
+                    cluster_stories=cluster,
+                    latency_target=latency_target
                 )
-                results = news_agent.process_request(query)
+                results = news_agent.process_request(query, since=since)
             else:
                 return jsonify({"error": "Invalid search type. Use 'web' or 'news'."}), 400
 
@@ -629,6 +755,65 @@ def create_api_app(api_key_arg: str = None, default_num_results: int = 10, defau
             log_debug(f"Error in API search: {str(e)}")
             return jsonify({"error": str(e)}), 500
 
+    @app.route('/news/articles', methods=['POST'])
+    def api_news_articles():
+        api_key = request_api_key()
+        if not api_key:
+            return jsonify({"error": missing_key_error}), 401
+
+        data = request.json
+        query = data.get('query')
+        if not query:
+            return jsonify({"error": "No query provided"}), 400
+        try:
+            since = parse_since(data.get('since'))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": f"Invalid since value: {str(e)}"}), 400
+
+        try:
+            news_agent = News_Agent(
+                api_key,
+                num_results=data.get('num_results', default_num_results),
+                max_tokens=request_max_tokens(data, api_key),
+                model=data.get('model', AUTO_MODEL),
+                temperature=data.get('temperature', 0.0),
+                comprehension_grade=data.get('comprehension_grade', 8),
+                cluster_stories=data.get('cluster_stories', True),
+                latency_target=data.get('latency_target')
+            )
+            stories = [story for story in news_agent.process_request(query, since=since) if story.get('url')]
+        except Exception as e:
+            log_debug(f"Error in API news articles: {str(e)}")
+            return jsonify({"error": str(e)}), 500
+
+        def article_events():
+            try:
+                for event in news_agent.summarize_stories(stories):
+                    yield format_sse(event)
+            except Exception as e:
+                log_debug(f"Error in API news article stream: {str(e)}")
+                yield format_sse({"event": "error", "data": str(e)})
+
+        return Response(stream_with_context(article_events()), mimetype='text/event-stream')
+
+    @app.route('/cache/stats', methods=['GET'])
+    def api_cache_stats():
+        cache = get_summary_cache()
+        return jsonify({
+            "summary_cache": cache.stats() if cache else None,
+            "news_cache": get_news_cache().stats() if get_news_cache() else None,
+            "provider_registry": provider_registry.stats(),
+            "rate_limits": rate_limiters.stats(),
+            "provider_latency": latency_tracker.stats(),
+            "response_cache": get_response_cache().stats() if get_response_cache() else None,
+            "prefetcher": get_prefetcher().stats(),
+            "search_survival_rates": overfetch_tracker.stats(),
+            "image_pipeline": image_pipeline_stats.snapshot(),
+            "token_estimates": token_estimate_stats.snapshot(),
+            "domain_cache": domain_cache_info(),
+            "vision_cache": get_vision_cache().stats() if get_vision_cache() else None
+        })
+
     return app
 
 if __name__ == "__main__":
@@ -661,7 +846,8 @@ if __name__ == "__main__":
                 "model": "llama3-8b-8192",
                 "temperature": 0.0,
                 "comprehension_grade": 8,
-                "search_type": "web"  // Use "web" for web search or "news" for news search
+                "search_type": "web",  // Use "web" for web search or "news" for news search
+                "deep": false  // Set to true to fetch and summarize the top results
             }
             ''')
 
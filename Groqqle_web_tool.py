@@ -2,6 +2,7 @@ from typing import Dict, Any, List
 from tools.web_tools.WebSearch_Tool import WebSearch_Tool
 from tools.web_tools.WebGetContents_Tool import WebGetContents_Tool
 from providers.provider_factory import ProviderFactory
+from agents.search_overfetch import search_with_topup
 
 class Groqqle_web_tool:
     def __init__(self, api_key: str, provider_name: str = 'groq', num_results: int = 10, max_tokens: int = 4096, model: str = "llama3-8b-8192", temperature: float = 0.0, comprehension_grade: int = 8):
@@ -14,13 +15,17 @@ class Groqqle_web_tool:
         self.provider = ProviderFactory.get_provider(provider_name, api_key)
 
     def run(self, query: str) -> List[Dict[str, Any]]:
-        search_results = self._perform_web_search(query)
-        filtered_results = self._filter_search_results(search_results)
-        deduplicated_results = self._remove_duplicates(filtered_results)
+        _, deduplicated_results = search_with_topup(
+            query,
+            self.num_results,
+            self._filter_search_results,
+            self._remove_duplicates,
+            search=self._perform_web_search
+        )
         return deduplicated_results[:self.num_results]
 
-    def _perform_web_search(self, query: str) -> List[Dict[str, Any]]:
-        return WebSearch_Tool(query, self.num_results * 2)
+    def _perform_web_search(self, query: str, num_results: int = None, offset: int = 0) -> List[Dict[str, Any]]:
+        return WebSearch_Tool(query, num_results or self.num_results * 2, offset)
 
     def _filter_search_results(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         return [result for result in results if result['description'] and result['title'] != 'No title' and result['url'].startswith('https://')]
@@ -1,16 +1,28 @@
+import math
 import os
 import sys
-import requests
 import time
-import tldextract
+import requests
 
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 from urllib.parse import quote_plus, urljoin
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 from agents.Base_Agent import Base_Agent
+from agents.news_cache import build_recency_index, get_news_cache, select_since
+from agents.news_clustering import cluster_stories
+from agents.news_time import parse_news_timestamp, parse_since
+from agents.page_cache import get_page_cache, page_cache_key
+from agents.prompt_budget import PromptBudget, generate_within_budget
+from providers.model_selector import AUTO_MODEL, get_model_selector
 from providers.provider_factory import ProviderFactory
+from providers.token_estimator import estimate_tokens, words_to_tokens
+from tools.domain_utils import root_domain
+from tools.rate_limiter import host_rate_limiter
+from tools.web_tools.WebGetContents_Tool import WebGetContents_Tool
 
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
 
@@ -19,8 +31,22 @@ def log_debug(message):
         print(f"Debug: {message}")
 
 class News_Agent(Base_Agent):
-    def __init__(self, api_key, provider_name='groq', num_results=10, max_tokens=4096, model="llama3-8b-8192", temperature=0.0, comprehension_grade=8):
-        log_debug(f"Initializing News_Agent with provider_name: {provider_name}, num_results: {num_results}, max_tokens: {max_tokens}, model: {model}, temperature: {temperature}, comprehension_grade: {comprehension_grade}")
+    # Expected length of a rewritten article, used to reserve output space in the prompt budget
+    ARTICLE_WORDS = 600
+
+    # Bing News returns at most this many cards per page
+    NEWS_PAGE_SIZE = 30
+    MAX_NEWS_PAGES = 10
+    NEWS_FETCH_WORKERS = 4
+    # Bing News filters: past 7 days, newest first
+    NEWS_QFT = ('interval%3d"7"', 'sortbydate%3d"1"')
+    # Cards fetched per requested story when clustering duplicate coverage
+    CLUSTER_OVERFETCH = 2
+    # Article pages fetched at once when rewriting a batch of stories
+    ARTICLE_FETCH_WORKERS = 6
+
+    def __init__(self, api_key, provider_name='groq', num_results=10, max_tokens=4096, model="llama3-8b-8192", temperature=0.0, comprehension_grade=8, cluster_stories=True, latency_target=None):
+        log_debug(f"Initializing News_Agent with provider_name: {provider_name}, num_results: {num_results}, max_tokens: {max_tokens}, model: {model}, temperature: {temperature}, comprehension_grade: {comprehension_grade}, cluster_stories: {cluster_stories}, latency_target: {latency_target}")
         
         if not api_key:
             log_debug("API key is missing or empty")
@@ -29,9 +55,13 @@ class News_Agent(Base_Agent):
         self.api_key = api_key
         self.num_results = num_results
         self.max_tokens = max_tokens
-        self.model = model
+        # With model="auto" each article gets a model sized to it
+        self.latency_target = latency_target
+        self.model_selector = get_model_selector(provider_name) if model == AUTO_MODEL else None
+        self.model = (self.model_selector.select(0, api_key=api_key) or "llama3-8b-8192") if self.model_selector else model
         self.temperature = temperature
         self.comprehension_grade = comprehension_grade
+        self.cluster_stories = cluster_stories
 
         try:
             log_debug(f"Attempting to get provider with API key: {api_key[:5]}...")
@@ -41,12 +71,18 @@ class News_Agent(Base_Agent):
             log_debug(f"Error in News_Agent.__init__: {str(e)}")
             raise
 
-    def process_request(self, user_request: str) -> List[Dict[str, Any]]:
-        log_debug(f"Processing request: {user_request}")
+    def process_request(self, user_request: str, since: Union[str, datetime, None] = None) -> List[Dict[str, Any]]:
+        log_debug(f"Processing request: {user_request}, since: {since}")
         log_debug(f"Using comprehension grade: {self.comprehension_grade}, temperature: {self.temperature}")
         
         try:
-            search_results = self._perform_news_search(user_request)
+            # Clustering folds duplicate coverage together, so fetch extra cards to fill num_results stories
+            fetch_count = self.num_results
+            if self.cluster_stories:
+                fetch_count = min(self.num_results * self.CLUSTER_OVERFETCH, self.NEWS_PAGE_SIZE * self.MAX_NEWS_PAGES)
+            search_results = self._cached_news_search(user_request, fetch_count, parse_since(since))
+            if self.cluster_stories:
+                search_results = cluster_stories(search_results)
             log_debug(f"News search completed. Number of results: {len(search_results)}")
             
             if not search_results:
@@ -58,80 +94,225 @@ class News_Agent(Base_Agent):
             log_debug(f"Error in process_request: {str(e)}")
             return [{"title": "Error", "url": "", "description": f"An error occurred while processing your request: {str(e)}"}]
 
-    def _perform_news_search(self, query: str) -> List[Dict[str, Any]]:
-        log_debug(f"Performing news search with query: {query} and num_results: {self.num_results}")
-        
+    def _cached_news_search(self, query: str, num_results: int, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        results, recency = self._news_results_with_index(query, num_results)
+        if since is not None:
+            results = select_since(results, recency, since)
+            log_debug(f"{len(results)} news results published since {since.isoformat()}")
+        return results[:num_results]
+
+    def _news_results_with_index(self, query: str, num_results: int) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+        cache = get_news_cache()
+        if cache is None:
+            results = self._perform_news_search(query, num_results)
+            return results, build_recency_index(results)
+
+        key = cache.make_key(query, self.NEWS_QFT)
+        entry, fresh = cache.get(key, num_results)
+        if entry and fresh:
+            log_debug(f"News cache hit for {query}")
+            return entry["results"], entry["recency"]
+
+        if entry:
+            # Stale: the newest stories are on the first page, so only that needs refetching
+            try:
+                first_page = self._fetch_news_page(self._news_page_urls(query, num_results)[0])
+            except Exception as e:
+                log_debug(f"Error refreshing news for {query}, serving stale results: {str(e)}")
+                return entry["results"], entry["recency"]
+            entry = cache.refresh(key, entry, first_page, limit=self.MAX_NEWS_PAGES * self.NEWS_PAGE_SIZE)
+            log_debug(f"Refreshed news for {query} from the first page ({len(first_page)} cards)")
+            return entry["results"], entry["recency"]
+
+        results = self._perform_news_search(query, num_results)
+        if not results:
+            return results, []
+        entry = cache.store(key, results, complete=len(results) < num_results)
+        return entry["results"], entry["recency"]
+
+    def _news_page_urls(self, query: str, num_results: int) -> List[str]:
         encoded_query = quote_plus(query)
-        base_url = f'https://www.bing.com/news/search?q={encoded_query}&qft=interval%3d"7"&qft=sortbydate%3d"1" '
+        qft = "&".join(f"qft={value}" for value in self.NEWS_QFT)
+        base_url = f'https://www.bing.com/news/search?q={encoded_query}&{qft} '
+
+        # All page offsets are known up front, so they can be fetched together
+        page_count = min(self.MAX_NEWS_PAGES, max(1, math.ceil(num_results / self.NEWS_PAGE_SIZE)))
+        return [
+            f"{base_url}&count={min(self.NEWS_PAGE_SIZE, num_results - page * self.NEWS_PAGE_SIZE)}&first={page * self.NEWS_PAGE_SIZE + 1}"
+            for page in range(page_count)
+        ]
+
+    def _perform_news_search(self, query: str, num_results: int) -> List[Dict[str, Any]]:
+        log_debug(f"Performing news search with query: {query} and num_results: {num_results}")
         
+        page_urls = self._news_page_urls(query, num_results)
+        page_count = len(page_urls)
+
+        results = []
+        seen_urls = set()
+        pool = ThreadPoolExecutor(max_workers=min(self.NEWS_FETCH_WORKERS, page_count), thread_name_prefix="news-page")
+        try:
+            futures = [pool.submit(self._fetch_news_page, url) for url in page_urls]
+            for page, future in enumerate(futures, start=1):
+                try:
+                    cards = future.result()
+                except Exception as e:
+                    log_debug(f"Error fetching news page {page}: {str(e)}")
+                    break
+                if not cards:
+                    break  # No more results found
+                for card in cards:
+                    if card["url"] not in seen_urls:
+                        seen_urls.add(card["url"])
+                        results.append(card)
+                if len(results) >= num_results:
+                    break
+        finally:
+            # Pages that have not started yet are not needed once we have enough cards
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        log_debug(f"News search completed successfully. Number of results: {len(results)}")
+        return results[:num_results] 
+
+    def _fetch_news_page(self, url: str) -> List[Dict[str, Any]]:
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         }
+        host_rate_limiter.acquire(url)
+        response = requests.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        return self._parse_news_cards(response.text, fetched_at=datetime.now(timezone.utc))
 
+    def _parse_news_cards(self, html: str, fetched_at: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        soup = BeautifulSoup(html, 'html.parser')
         results = []
-        page = 1
-        while len(results) < self.num_results:
-            url = f"{base_url}&count={min(30, self.num_results - len(results))}&first={(page-1)*30+1}"
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                news_cards = soup.find_all('div', class_='news-card')
-                
-                if not news_cards:
-                    break  # No more results found
-                
-                for card in news_cards:
-                    if len(results) >= self.num_results:
-                        break
-                    
-                    title_elem = card.find('a', class_='title')
-                    if title_elem:
-                        title = title_elem.text.strip()
-                        url = urljoin("https://www.bing.com", title_elem.get('href', ''))
-                        
-                        snippet_elem = card.find('div', class_='snippet')
-                        description = snippet_elem.text.strip() if snippet_elem else ''
-                        
-                        source_elem = card.find('div', class_='source')
-                        source = source_elem.text.strip() if source_elem else ''
-                        
-                        timestamp_elem = card.find('span', attrs={'aria-label': True})
-                        timestamp = timestamp_elem['aria-label'] if timestamp_elem else ''
-                        
-                        # Extract the root domain from the URL
-                        ext = tldextract.extract(url)
-                        root_domain = f"{ext.domain}.{ext.suffix}"
-                        
-                        results.append({
-                            "title": title,
-                            "url": url,
-                            "description": description,
-                            "source": root_domain,  # Use the root domain as the source
-                            "timestamp": timestamp
-                        })
-                
-                page += 1
-                time.sleep(1)  # Add a small delay between requests to avoid rate limiting
-            except Exception as e:
-                log_debug(f"Error in _perform_news_search: {str(e)}")
-                break
+        for card in soup.find_all('div', class_='news-card'):
+            title_elem = card.find('a', class_='title')
+            if not title_elem:
+                continue
+            title = title_elem.text.strip()
+            url = urljoin("https://www.bing.com", title_elem.get('href', ''))
+            
+            snippet_elem = card.find('div', class_='snippet')
+            description = snippet_elem.text.strip() if snippet_elem else ''
+            
+            timestamp_elem = card.find('span', attrs={'aria-label': True})
+            timestamp = timestamp_elem['aria-label'] if timestamp_elem else ''
+            # Bing labels are relative to the fetch ("3h"), so resolve them now while that is known
+            published_at = parse_news_timestamp(timestamp, fetched_at)
+            
+            results.append({
+                "title": title,
+                "url": url,
+                "description": description,
+                "source": root_domain(url),  # Use the root domain as the source
+                "timestamp": timestamp,
+                "published_at": published_at.isoformat(timespec="seconds") if published_at else None
+            })
+        return results
 
-        log_debug(f"News search completed successfully. Number of results: {len(results)}")
-        return results[:self.num_results] 
+    def summarize_stories(self, results: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Rewrite a batch of news cards into articles, yielding each one as soon as it is ready.
+
+        Article pages are fetched on one pool and rewritten on another sized to the
+        provider's concurrency limit, so slow pages never hold an LLM slot. Yields
+        dicts with 'event' and 'data' keys: 'article' with the rewritten article,
+        the card's index and per-item timing; 'error' for a card that could not be
+        fetched or rewritten; then 'done' with batch totals. Closing the generator
+        early cancels work that has not started.
+        """
+        started = time.perf_counter()
+        candidates = [(index, result) for index, result in enumerate(results) if result.get('url')]
+        log_debug(f"Rewriting {len(candidates)} news stories")
+
+        fetch_pool = ThreadPoolExecutor(max_workers=self.ARTICLE_FETCH_WORKERS, thread_name_prefix="news-fetch")
+        llm_pool = ThreadPoolExecutor(max_workers=getattr(self.provider, 'max_concurrent_requests', 2), thread_name_prefix="news-llm")
+        articles = failed = 0
+        try:
+            pending = {fetch_pool.submit(self._timed, self._get_news_content, result['url']): ('fetch', index, None)
+                       for index, result in candidates}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, index, fetch_seconds = pending.pop(future)
+                    result = results[index]
+                    try:
+                        value, seconds = future.result()
+                    except Exception as e:
+                        log_debug(f"News article {kind} failed for {result['url']}: {str(e)}")
+                        failed += 1
+                        yield {"event": "error", "data": {"index": index, "url": result['url'], "error": str(e)}}
+                        continue
+
+                    if kind == 'fetch':
+                        if value:
+                            pending[llm_pool.submit(self._timed, self._summarize_news_content, value, result['url'])] = ('summarize', index, seconds)
+                        else:
+                            failed += 1
+                            yield {"event": "error", "data": {"index": index, "url": result['url'], "error": "Failed to retrieve content from the URL"}}
+                        continue
+
+                    articles += 1
+                    yield {"event": "article", "data": dict(
+                        value,
+                        index=index,
+                        source=result.get('source', ''),
+                        published_at=result.get('published_at'),
+                        timing={
+                            "fetch_seconds": round(fetch_seconds, 3),
+                            "summarize_seconds": round(seconds, 3),
+                            "total_seconds": round(time.perf_counter() - started, 3)
+                        }
+                    )}
+        finally:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+
+        yield {"event": "done", "data": {"articles": articles, "failed": failed, "elapsed_seconds": round(time.perf_counter() - started, 3)}}
+
+    @staticmethod
+    def _timed(function, *args):
+        started = time.perf_counter()
+        value = function(*args)
+        return value, time.perf_counter() - started
+
+    def _article_budget(self, model: Optional[str] = None) -> PromptBudget:
+        return PromptBudget(model or self.model, context_window=self.max_tokens, output_tokens=words_to_tokens(self.ARTICLE_WORDS) + 50)
+
+    def _get_news_content(self, url: str) -> str:
+        # Under auto, fetch enough for the largest candidate; the summary prompt is trimmed to the selected model
+        fetch_model = self.model_selector.largest(self.max_tokens, api_key=self.api_key) if self.model_selector else None
+        budget = self._article_budget(fetch_model)
+        max_tokens = budget.content_budget(lambda article: self._create_summary_prompt(article, url))
+
+        page_cache = get_page_cache()
+        cache_key = page_cache_key(url, max_tokens)
+        content = page_cache.get(cache_key)
+        if content is not None:
+            return content
+
+        content = WebGetContents_Tool(url, output_format='markdown', max_tokens=max_tokens, token_counter=budget.count_tokens)
+        if content:
+            page_cache.set(cache_key, content)
+        return content
 
     def _summarize_news_content(self, content: str, url: str) -> Dict[str, str]:
         log_debug(f"Summarizing content from URL: {url}")
-        summary_prompt = self._create_summary_prompt(content, url)
+        budget = self._article_budget(self._select_model(content, url))
+        summary_prompt = budget.render(lambda article: self._create_summary_prompt(article, url), content)
         log_debug(f"Summary prompt: {summary_prompt[:500]}...")  # Log first 500 characters of the prompt
-        summary = self.provider.generate(
-            summary_prompt,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature
-        )
+        summary = generate_within_budget(self.provider, summary_prompt, budget, self.temperature)
         return self._format_summary(summary, url)
 
+    def _select_model(self, content: str, url: str) -> str:
+        if not self.model_selector:
+            return self.model
+        prompt_tokens = estimate_tokens(self._create_summary_prompt(content, url), self.model)
+        output_tokens = words_to_tokens(self.ARTICLE_WORDS) + 50
+        return self.model_selector.select(prompt_tokens, output_tokens, self.latency_target, api_key=self.api_key,
+                                          max_context=self.max_tokens) or self.model
+
     def _create_summary_prompt(self, content: str, url: str) -> str:
         grade_descriptions = {
             1: "a 6-year-old in 1st grade", 2: "a 7-year-old in 2nd grade", 3: "an 8-year-old in 3rd grade",
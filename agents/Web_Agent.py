@@ -1,11 +1,22 @@
 import os
 import sys
 import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator
 from urllib.parse import urlparse
 from tools.web_tools.WebSearch_Tool import WebSearch_Tool
 from tools.web_tools.WebGetContents_Tool import WebGetContents_Tool
 from tools.web_tools.WebGetLinks_Tool import WebGetLinks_Tool
 from agents.Base_Agent import Base_Agent
+from agents.search_overfetch import search_with_topup
+from agents.prompt_budget import PromptBudget, compact_prompt, generate_within_budget, is_truncated, split_into_chunks
+from agents.page_cache import get_page_cache, page_cache_key
+from agents.prefetcher import get_prefetcher
+from agents.summary_cache import get_summary_cache
+from agents.summary_stream import HeadlineStreamParser
+from providers.image_pipeline import is_vision_model
+from providers.model_selector import AUTO_MODEL, get_model_selector
+from providers.token_estimator import estimate_tokens, words_to_tokens
 
 import logging
 
@@ -59,8 +70,17 @@ except ImportError as e:
     ProviderFactory = None
 
 class Web_Agent(Base_Agent):
-    def __init__(self, api_key, provider_name='groq', num_results=10, max_tokens=4096, model="llama3-8b-8192", temperature=0.0, comprehension_grade=8, summary_length=300, humanize=False):
-        log_debug(f"Initializing Web_Agent with provider_name: {provider_name}, num_results: {num_results}, max_tokens: {max_tokens}, model: {model}, temperature: {temperature}, comprehension_grade: {comprehension_grade}, summary_length: {summary_length}, humanize: {humanize}")
+    # Worker pool sizes for deep search; fetches are I/O bound, LLM calls are rate limited
+    DEEP_FETCH_WORKERS = 6
+    DEEP_LLM_WORKERS = 3
+    DEEP_TOP_N = 5
+    DEEP_MIN_SUMMARIES = 3
+    # Pages longer than the content budget are summarized in at most this many chunks
+    MAP_REDUCE_MAX_CHUNKS = 8
+    CHUNK_SUMMARY_WORDS = 150
+
+    def __init__(self, api_key, provider_name='groq', num_results=10, max_tokens=4096, model="llama3-8b-8192", temperature=0.0, comprehension_grade=8, summary_length=300, humanize=False, latency_target=None):
+        log_debug(f"Initializing Web_Agent with provider_name: {provider_name}, num_results: {num_results}, max_tokens: {max_tokens}, model: {model}, temperature: {temperature}, comprehension_grade: {comprehension_grade}, summary_length: {summary_length}, humanize: {humanize}, latency_target: {latency_target}")
         if not api_key:
             log_debug("API key is missing or empty")
             raise ValueError("API key is required")
@@ -71,12 +91,15 @@ class Web_Agent(Base_Agent):
         self.api_key = api_key
         self.num_results = num_results
         self.max_tokens = max_tokens
-        self.model = model
+        # With model="auto" each page gets a model sized to it; self.model is the default for everything else
+        self.model_choice = model
+        self.latency_target = latency_target
+        self.model_selector = get_model_selector(provider_name) if model == AUTO_MODEL else None
+        self.model = (self.model_selector.select(0, api_key=api_key) or "llama3-8b-8192") if self.model_selector else model
         self.temperature = temperature
         self.comprehension_grade = comprehension_grade
         self.summary_length = summary_length
         self.humanize = humanize
-        self.provider = ProviderFactory.get_provider(provider_name, api_key)
         self.image_handler = self._initialize_image_handler()
 
         try:
@@ -96,12 +119,18 @@ class Web_Agent(Base_Agent):
         return lambda image_url, prompt: self.provider.generate(prompt, image_path=image_url)
 
 
-    def process_request(self, user_request: str) -> list:
+    def process_request(self, user_request: str, deep: bool = False, deep_top_n: int = None, deep_min_summaries: int = None) -> list:
         log_debug(f"Processing request: {user_request}")
-        log_debug(f"Using comprehension grade: {self.comprehension_grade}, temperature: {self.temperature}")
+        log_debug(f"Using comprehension grade: {self.comprehension_grade}, temperature: {self.temperature}, deep: {deep}")
         try:
             if self._is_url(user_request):
                 return self._process_direct_url_request(user_request)
+            elif deep:
+                return self._process_deep_search(
+                    user_request,
+                    deep_top_n or self.DEEP_TOP_N,
+                    deep_min_summaries or self.DEEP_MIN_SUMMARIES
+                )
             else:
                 return self._process_web_search(user_request)
         except Exception as e:
@@ -121,29 +150,35 @@ class Web_Agent(Base_Agent):
         parsed_url = urlparse(url)
         return parsed_url.scheme in ['http', 'https'] and any(parsed_url.path.lower().endswith(ext) for ext in image_extensions)
 
-    def _process_image_request(self, image_url: str, custom_prompt: str = None) -> list:
-        log_debug(f"Processing image request: {image_url}")
+    def _process_image_request(self, image_url, custom_prompt: str = None) -> list:
+        # image_url may also be a local path or the raw bytes of an uploaded image
+        is_upload = isinstance(image_url, (bytes, bytearray))
+        log_debug(f"Processing image request: {'uploaded image' if is_upload else image_url}")
         default_prompt = "What's in this image?"
         prompt = custom_prompt if custom_prompt else default_prompt
         
         try:
-            if self.model == "llava-v1.5-7b-4096-preview":
+            if is_vision_model(self.model):
                 description = self.provider.generate(prompt, image_path=image_url, model=self.model)
             else:
                 description = self.provider.generate(f"{prompt}\n\nImage URL: {image_url}")
             
             log_debug(f"Image description generated successfully")
-            return [{
+            result = {
                 "title": "Image Analysis",
-                "url": image_url,
+                "url": "" if is_upload else image_url,
                 "description": description,
                 "prompt_used": prompt
-            }]
+            }
+            image_stats = getattr(self.provider, 'last_image_stats', None)
+            if image_stats:
+                result["image_bytes_saved"] = image_stats["bytes_saved"]
+            return [result]
         except Exception as e:
             log_debug(f"Error in _process_image_request: {str(e)}")
             return [{
                 "title": "Error",
-                "url": image_url,
+                "url": "" if is_upload else image_url,
                 "description": f"An error occurred while analyzing the image: {str(e)}",
                 "prompt_used": prompt
             }]
@@ -171,22 +206,93 @@ class Web_Agent(Base_Agent):
 
     def _process_web_search(self, user_request: str) -> list:
         log_debug(f"Entering _process_web_search with num_results: {self.num_results}")
-        search_results = self._perform_web_search(user_request)
+        search_results, deduplicated_results = search_with_topup(
+            user_request,
+            self.num_results,
+            self._filter_search_results,
+            self._remove_duplicates,
+            search=self._perform_web_search
+        )
         log_debug(f"Web search completed. Number of results: {len(search_results)}")
         if not search_results:
             log_debug("No search results found")
             return [{"title": "No Results", "url": "", "description": "I'm sorry, but I couldn't find any relevant information for your request."}]
 
-        filtered_results = self._filter_search_results(search_results)
-        log_debug(f"Results filtered. Number of filtered results: {len(filtered_results)}")
-        if not filtered_results:
+        if not deduplicated_results:
             log_debug("No results after filtering")
             return [{"title": "No Results", "url": "", "description": "I found some results, but they were all from domains I've been instructed to skip. Could you try rephrasing your request?"}]
 
-        deduplicated_results = self._remove_duplicates(filtered_results)
         log_debug(f"Results deduplicated. Number of final results: {len(deduplicated_results[:self.num_results])}")
         return deduplicated_results[:self.num_results]  # Return top num_results unique results
 
+    def _process_deep_search(self, user_request: str, top_n: int, min_summaries: int) -> list:
+        """
+        Search, then fetch and summarize the top N results concurrently.
+
+        Page fetches and LLM calls run in separate bounded pools so slow pages do not
+        hold up summarization. Once min_summaries good summaries are in, pending work
+        is cancelled and the remaining results keep their search snippets.
+        """
+        results = self._process_web_search(user_request)
+        candidates = [(index, result) for index, result in enumerate(results[:top_n]) if result.get('url')]
+        if not candidates:
+            return results
+
+        min_summaries = min(min_summaries, len(candidates))
+        log_debug(f"Deep search over {len(candidates)} results, stopping after {min_summaries} summaries")
+
+        summaries = {}
+        fetch_pool = ThreadPoolExecutor(max_workers=self.DEEP_FETCH_WORKERS, thread_name_prefix="deep-fetch")
+        llm_pool = ThreadPoolExecutor(max_workers=self.DEEP_LLM_WORKERS, thread_name_prefix="deep-llm")
+        try:
+            pending = {}
+            for index, result in candidates:
+                pending[fetch_pool.submit(self._get_web_content, result['url'])] = ('fetch', index)
+
+            while pending and len(summaries) < min_summaries:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, index = pending.pop(future)
+                    url = results[index]['url']
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        log_debug(f"Deep search {kind} failed for {url}: {str(e)}")
+                        continue
+
+                    if kind == 'fetch':
+                        if value:
+                            pending[llm_pool.submit(self._summarize_web_content, value, url)] = ('summarize', index)
+                        else:
+                            log_debug(f"Deep search could not fetch {url}")
+                    elif self._is_good_summary(value):
+                        summaries[index] = value
+
+            if pending:
+                log_debug(f"Deep search cancelling {len(pending)} pending tasks")
+                for future in pending:
+                    future.cancel()
+        finally:
+            fetch_pool.shutdown(wait=False, cancel_futures=True)
+            llm_pool.shutdown(wait=False, cancel_futures=True)
+
+        deep_results = []
+        for index, result in enumerate(results):
+            if index in summaries:
+                summary = dict(summaries[index])
+                summary["snippet"] = result.get('description', '')
+                summary["deep_summary"] = True
+                deep_results.append(summary)
+            else:
+                deep_results.append(result)
+        log_debug(f"Deep search completed with {len(summaries)} summaries")
+        return deep_results
+
+    def _is_good_summary(self, summary: dict) -> bool:
+        if not summary or not summary.get('description'):
+            return False
+        return not summary['description'].startswith('Error:')
+
     def _initialize_tools(self):
         return {
             "WebSearch_Tool": WebSearch_Tool,
@@ -194,10 +300,12 @@ class Web_Agent(Base_Agent):
             "WebGetLinks_Tool": WebGetLinks_Tool
         }
 
-    def _perform_web_search(self, query: str):
-        log_debug(f"Performing web search with query: {query} and num_results: {self.num_results}")
+    def _perform_web_search(self, query: str, num_results: int = None, offset: int = 0):
+        # Callers size num_results to allow for filtering; see search_with_topup
+        num_results = num_results or self.num_results * 2
+        log_debug(f"Performing web search with query: {query}, num_results: {num_results}, offset: {offset}")
         try:
-            results = self.tools["WebSearch_Tool"](query, self.num_results * 2)  # Request more results to account for filtering
+            results = self.tools["WebSearch_Tool"](query, num_results, offset)
             log_debug(f"Web search completed successfully. Number of results: {len(results)}")
             return results
         except Exception as e:
@@ -228,20 +336,190 @@ class Web_Agent(Base_Agent):
         return unique_results
 
     def _get_web_content(self, url: str) -> str:
-        return self.tools["WebGetContents_Tool"](url)
+        budget = self._prompt_budget(self._fetch_model())
+        # Fetch enough for map-reduce; anything past the chunk limit would never be summarized
+        content_budget = budget.content_budget(lambda content: self._create_summary_prompt(content, url))
+        max_tokens = content_budget * self.MAP_REDUCE_MAX_CHUNKS
+
+        page_cache = get_page_cache()
+        cache_key = page_cache_key(url, max_tokens)
+        content = page_cache.get(cache_key)
+        get_prefetcher().note_request(url, hit=content is not None)
+        if content is not None:
+            log_debug(f"Page cache hit for {url}")
+            return content
+
+        content = self.tools["WebGetContents_Tool"](
+            url,
+            output_format='markdown',
+            max_tokens=max_tokens,
+            token_counter=budget.count_tokens
+        )
+        if content:
+            page_cache.set(cache_key, content)
+        return content
+
+    def _prompt_budget(self, model: str = None) -> PromptBudget:
+        # The context window is shared by the instructions, the page content and the summary
+        expected_output_tokens = words_to_tokens(self.summary_length) + 50
+        return PromptBudget(model or self.model, context_window=self.max_tokens, output_tokens=expected_output_tokens)
+
+    def _select_model(self, content: str, url: str) -> str:
+        """Model for summarizing this content: the configured one, or the selector's pick when model is auto"""
+        if not self.model_selector:
+            return self.model
+        prompt_tokens = estimate_tokens(self._create_summary_prompt(content, url), self.model)
+        output_tokens = words_to_tokens(self.summary_length) + 50
+        return self.model_selector.select(prompt_tokens, output_tokens, self.latency_target, api_key=self.api_key,
+                                          max_context=self.max_tokens) or self.model
+
+    def _fetch_model(self) -> str:
+        """Model whose budget sizes page fetches; under auto the largest candidate, so selection sees the whole page"""
+        if not self.model_selector:
+            return self.model
+        return self.model_selector.largest(self.max_tokens, api_key=self.api_key) or self.model
 
     def _summarize_web_content(self, content: str, url: str) -> dict:
         log_debug(f"Summarizing content from URL: {url}")
-        summary_prompt = self._create_summary_prompt(content, url)
+        cache_key, cached = self._summary_cache_lookup(content)
+        if cached:
+            return dict(cached, url=url)
+
+        summary = self._generate_summary(content, url)
+        self._summary_cache_store(cache_key, summary)
+        return summary
+
+    def stream_summary(self, url: str) -> Iterator[dict]:
+        """
+        Fetch a page and stream its summary as it is generated.
+
+        Yields dicts with 'event' and 'data' keys: 'headline' once the headline is
+        known, 'delta' for each fragment of the body, then 'done' with the formatted
+        summary. An 'error' event is yielded instead if the page cannot be fetched.
+        """
+        log_debug(f"Streaming summary for URL: {url}")
+        content = self._get_web_content(url)
+        if not content:
+            yield {"event": "error", "data": "Failed to retrieve content from the URL. Some sites prohibit summarization. Click URL to go there directly."}
+            return
+
+        cache_key, summary = self._summary_cache_lookup(content)
+        if summary:
+            summary = dict(summary, url=url)
+        else:
+            budget = self._prompt_budget(self._select_model(content, url))
+            build_prompt = lambda page: self._create_summary_prompt(page, url)
+            if budget.count_tokens(content) > budget.content_budget(build_prompt):
+                # Map-reduce needs every partial summary before it can write anything
+                summary = self._generate_summary(content, url)
+            else:
+                summary_prompt = budget.render(build_prompt, content)
+                parser = HeadlineStreamParser()
+                generated = []
+                for delta in self.provider.generate_stream(summary_prompt, max_tokens=budget.max_output_tokens, temperature=self.temperature, model=budget.model):
+                    generated.append(delta)
+                    for kind, text in parser.feed(delta):
+                        yield {"event": "headline" if kind == 'headline' else "delta", "data": text}
+                for kind, text in parser.finish():
+                    yield {"event": "headline" if kind == 'headline' else "delta", "data": text}
+                budget.record(summary_prompt, self.provider.last_usage)
+                summary = self._format_summary("".join(generated), url)
+                # Streamed text cannot be retried, but a cut-off summary should not be served again from cache
+                if is_truncated(self.provider.last_usage):
+                    log_debug(f"Streamed summary of {url} hit the {budget.max_output_tokens} token cap")
+                else:
+                    self._summary_cache_store(cache_key, summary)
+                yield {"event": "done", "data": summary}
+                return
+            self._summary_cache_store(cache_key, summary)
+
+        yield {"event": "headline", "data": summary['title']}
+        yield {"event": "delta", "data": summary['description']}
+        yield {"event": "done", "data": summary}
+
+    def _summary_cache_lookup(self, content: str):
+        cache = get_summary_cache()
+        if not cache or not cache.is_cacheable(self.temperature):
+            return None, None
+        cache_key = cache.make_key(content, self.model_choice, self.comprehension_grade, self.summary_length, self.humanize, self.temperature)
+        return cache_key, cache.get(cache_key)
+
+    def _summary_cache_store(self, cache_key: str, summary: dict):
+        cache = get_summary_cache()
+        if cache_key and cache and self._is_good_summary(summary):
+            cache.set(cache_key, summary)
+
+    def _generate_summary(self, content: str, url: str) -> dict:
+        budget = self._prompt_budget(self._select_model(content, url))
+        build_prompt = lambda page: self._create_summary_prompt(page, url)
+        if budget.count_tokens(content) > budget.content_budget(build_prompt):
+            return self._map_reduce_summarize(content, url, budget.model)
+
+        summary_prompt = budget.render(build_prompt, content)
         log_debug(f"Summary prompt: {sanitize_message(summary_prompt)}")
-        summary = self.provider.generate(
-            summary_prompt,
-            max_tokens=self.max_tokens,
-            temperature=self.temperature
-        )
+        summary = generate_within_budget(self.provider, summary_prompt, budget, self.temperature)
         return self._format_summary(summary, url)
 
-    def _create_summary_prompt(self, content: str, url: str) -> str:
+    def _map_reduce_summarize(self, content: str, url: str, model: str = None) -> dict:
+        """
+        Summarize content that does not fit the context window.
+
+        The content is split into budget-sized chunks on section boundaries, the
+        chunks are summarized concurrently, and the partial summaries are combined
+        with _combine_summaries into the final headline and summary.
+        """
+        map_budget = PromptBudget(model or self.model, context_window=self.max_tokens, output_tokens=words_to_tokens(self.CHUNK_SUMMARY_WORDS) + 20)
+        chunk_tokens = map_budget.content_budget(lambda chunk: self._create_chunk_prompt(chunk, url, 1, 1))
+        chunks = split_into_chunks(content, chunk_tokens, map_budget.count_tokens)[:self.MAP_REDUCE_MAX_CHUNKS]
+        workers = max(1, min(len(chunks), self._provider_concurrency()))
+        log_debug(f"Map-reduce summarizing {url} in {len(chunks)} chunks with {workers} workers")
+
+        def summarize_chunk(item):
+            index, chunk = item
+            try:
+                return self._summarize_chunk(chunk, url, index + 1, len(chunks), map_budget)
+            except Exception as e:
+                log_debug(f"Error summarizing chunk {index + 1} of {url}: {str(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="map-summarize") as pool:
+            partials = list(pool.map(summarize_chunk, enumerate(chunks)))
+
+        partials = [partial for partial in partials if partial and not partial.startswith('Error:')]
+        if not partials:
+            return {"title": "Error", "url": url, "description": "Failed to summarize the content from the URL."}
+
+        summary = self._combine_summaries(partials, self._create_combine_request(url), map_budget.model)
+        return self._format_summary(summary, url)
+
+    def _summarize_chunk(self, chunk: str, url: str, part: int, total: int, budget: PromptBudget) -> str:
+        chunk_prompt = budget.render(lambda text: self._create_chunk_prompt(text, url, part, total), chunk)
+        return generate_within_budget(self.provider, chunk_prompt, budget, self.temperature)
+
+    def _provider_concurrency(self) -> int:
+        concurrency = getattr(self.provider, 'max_concurrent_requests', 2)
+        # Fanning out past the requests the rate limit allows right now would only queue
+        headroom = self.provider.rate_limit_headroom(self.model) if hasattr(self.provider, 'rate_limit_headroom') else None
+        if headroom:
+            concurrency = min(concurrency, max(1, int(headroom["requests"])))
+        return concurrency
+
+    def _create_chunk_prompt(self, chunk: str, url: str, part: int, total: int) -> str:
+        return f"""
+            The following is part {part} of {total} of the web content from {url}:
+            {chunk}
+
+            Summarize this part in at most {self.CHUNK_SUMMARY_WORDS} words. Keep the key facts, findings, names, quotes and statistics. Do not add a headline, an introduction or any commentary.
+            """
+
+    def _create_combine_request(self, url: str) -> str:
+        return (
+            f"Write a summary of the web content from {url} for {self._grade_description()}, approximately {self.summary_length} words long. "
+            f"Begin with a line formatted exactly as 'HEADLINE: [Your SEO-optimized headline here]', then write the summary in the inverted pyramid style "
+            f"using a neutral, journalistic tone."
+        )
+
+    def _grade_description(self) -> str:
         grade_descriptions = {
             1: "a 6-year-old in 1st grade", 2: "a 7-year-old in 2nd grade", 3: "an 8-year-old in 3rd grade",
             4: "a 9-year-old in 4th grade", 5: "a 10-year-old in 5th grade", 6: "an 11-year-old in 6th grade",
@@ -249,7 +527,10 @@ class Web_Agent(Base_Agent):
             10: "a 15-year-old in 10th grade", 11: "a 16-year-old in 11th grade", 12: "a 17-year-old in 12th grade",
             13: "a college undergraduate", 14: "a master's degree student", 15: "a PhD candidate"
         }
-        grade_description = grade_descriptions.get(self.comprehension_grade, "an average adult")
+        return grade_descriptions.get(self.comprehension_grade, "an average adult")
+
+    def _create_summary_prompt(self, content: str, url: str) -> str:
+        grade_description = self._grade_description()
 
         log_debug(f"Selected grade description: {grade_description}")
 
@@ -355,14 +636,16 @@ class Web_Agent(Base_Agent):
             "description": body
         }
 
-    def _combine_summaries(self, summaries: list, user_request: str) -> str:
+    def _combine_summaries(self, summaries: list, user_request: str, model: str = None) -> str:
+        joined_summaries = "\n\n".join(summaries)
         combined_prompt = f"""
         Given the following summaries from multiple sources:
-        {' '.join(summaries)}
+        {joined_summaries}
 
         Respond to the user's request: "{user_request}"
         
         Provide a concise, coherent response that addresses the user's request using the information from the summaries.
         Focus on the most relevant and important points, and present the information in a clear and organized manner.
         """
-        return self.provider.generate(combined_prompt, max_tokens=self.max_tokens)
\ No newline at end of file
+        # The combined answer is the page summary, so it gets the summary's output cap
+        return generate_within_budget(self.provider, compact_prompt(combined_prompt), self._prompt_budget(model), self.temperature)
\ No newline at end of file
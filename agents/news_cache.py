@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from tools.cache import TieredCache
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class NewsCache:
+    """
+    Caches Bing News result lists keyed on the normalized query and qft filters.
+
+    Entries are served as-is while fresh. After that they are stale but kept (up
+    to the cache's own hard TTL) so a refresh only needs the first, newest page
+    merged into the existing list rather than a full rescrape. Each story
+    remembers when it was first seen; refreshes drop stories older than the
+    hard TTL and cap the list, so repeated refreshes do not grow it forever.
+
+    How long an entry stays fresh follows the age of its newest story: a topic
+    whose latest story is minutes old refreshes after min_ttl, one that has been
+    quiet for hours can be served for up to max_ttl.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None, min_ttl: float = 120.0,
+                 max_ttl: float = 1800.0, age_factor: float = 0.1):
+        self.cache = cache or TieredCache("news", max_memory_entries=256, max_disk_entries=2000, ttl=6 * 3600)
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.age_factor = age_factor
+
+    def fresh_ttl(self, entry: Dict[str, Any]) -> float:
+        recency = entry.get("recency")
+        if not recency:
+            return self.min_ttl
+        newest_age = max(entry["fetched_at"] - recency[0][0], 0)
+        return min(max(newest_age * self.age_factor, self.min_ttl), self.max_ttl)
+
+    def make_key(self, query: str, qft: Sequence[str]) -> str:
+        return f"{' '.join(query.lower().split())}|{'&'.join(qft)}"
+
+    def get(self, key: str, wanted: int) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Look up a result list.
+
+        Returns:
+            Tuple of (entry, fresh). entry is None when nothing usable is cached,
+            including when the cached list is shorter than wanted and was not
+            already the complete result set.
+        """
+        entry = self.cache.get(key)
+        if entry is None:
+            return None, False
+        if len(entry["results"]) < wanted and not entry.get("complete"):
+            log_debug(f"News cache entry for {key} has {len(entry['results'])} of {wanted} results")
+            return None, False
+        return entry, time.time() - entry["fetched_at"] <= self.fresh_ttl(entry)
+
+    def store(self, key: str, results: List[Dict[str, Any]], complete: bool,
+              first_seen: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        now = time.time()
+        first_seen = first_seen or {}
+        entry = {
+            "fetched_at": now,
+            "complete": complete,
+            "results": results,
+            "recency": build_recency_index(results),
+            "first_seen": {result["url"]: first_seen.get(result["url"], now) for result in results}
+        }
+        self.cache.set(key, entry)
+        return entry
+
+    def refresh(self, key: str, entry: Dict[str, Any], first_page: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+        """Merge a refetched first page into a stale entry, expire old stories and store at most limit results"""
+        now = time.time()
+        first_seen = entry.get("first_seen", {})
+        hard_ttl = self.cache.ttl
+        cached = [
+            result for result in entry["results"]
+            if hard_ttl is None or now - first_seen.get(result["url"], entry["fetched_at"]) <= hard_ttl
+        ]
+        results = merge_news_results(first_page, cached, limit)
+        # A list that lost stories is no longer known to be the whole result set
+        complete = entry.get("complete", False) and len(cached) == len(entry["results"])
+        return self.store(key, results, complete, first_seen)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+def build_recency_index(results: List[Dict[str, Any]]) -> List[List[int]]:
+    """[published epoch seconds, result position] pairs, newest first; undated results are left out"""
+    index = []
+    for position, result in enumerate(results):
+        published_at = result.get("published_at")
+        if published_at:
+            index.append([int(datetime.fromisoformat(published_at).timestamp()), position])
+    index.sort(key=lambda item: item[0], reverse=True)
+    return index
+
+def select_since(results: List[Dict[str, Any]], index: List[List[int]], since: datetime) -> List[Dict[str, Any]]:
+    """Results published at or after since, in their original rank order"""
+    cutoff = since.timestamp()
+    positions = []
+    for published, position in index:
+        if published < cutoff:
+            break
+        positions.append(position)
+    return [results[position] for position in sorted(positions)]
+
+def merge_news_results(newest: List[Dict[str, Any]], cached: List[Dict[str, Any]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Put a freshly fetched first page ahead of the cached list, dropping cached duplicates by URL"""
+    urls = {result["url"] for result in newest}
+    merged = newest + [result for result in cached if result["url"] not in urls]
+    return merged if limit is None else merged[:limit]
+
+_news_cache = None
+_news_cache_lock = threading.Lock()
+
+def get_news_cache() -> Optional[NewsCache]:
+    """Return the process-wide news cache, or None when NEWS_CACHE is disabled"""
+    global _news_cache
+    if os.getenv('NEWS_CACHE', 'True').lower() != 'true':
+        return None
+    with _news_cache_lock:
+        if _news_cache is None:
+            _news_cache = NewsCache(
+                min_ttl=float(os.getenv('NEWS_CACHE_TTL', '120')),
+                max_ttl=float(os.getenv('NEWS_CACHE_MAX_TTL', '1800'))
+            )
+        return _news_cache
@@ -0,0 +1,85 @@
+import os
+import re
+import zlib
+from typing import Any, Dict, List
+
+import numpy as np
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Width of the hashed feature space; collisions are rare enough at news-card sizes
+FEATURE_DIMENSIONS = 4096
+# Titles say what the story is; snippets mostly add shared context
+TITLE_WEIGHT = 2.0
+SNIPPET_WEIGHT = 1.0
+DEFAULT_SIMILARITY_THRESHOLD = 0.45
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the this to was were will with
+after over says said new about into than more
+""".split())
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+def _features(text: str) -> List[int]:
+    """Hashed word unigrams, word bigrams and character trigrams of the text"""
+    words = [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+    grams = words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return [zlib.crc32(gram.encode("utf-8")) % FEATURE_DIMENSIONS for gram in grams]
+
+def vectorize_cards(cards: List[Dict[str, Any]]) -> np.ndarray:
+    """Build an L2-normalized hashed n-gram matrix with one row per card"""
+    matrix = np.zeros((len(cards), FEATURE_DIMENSIONS), dtype=np.float32)
+    for row, card in enumerate(cards):
+        for field, weight in (("title", TITLE_WEIGHT), ("description", SNIPPET_WEIGHT)):
+            indices = _features(card.get(field) or "")
+            if indices:
+                np.add.at(matrix[row], indices, weight)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def cluster_stories(cards: List[Dict[str, Any]], threshold: float = DEFAULT_SIMILARITY_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Group news cards that cover the same story.
+
+    Cards are compared by cosine similarity of their title and snippet vectors.
+    Walking the cards in rank order, each card not yet claimed starts a story and
+    claims every later unclaimed card at or above the threshold. The first card
+    of each story is returned with the others listed under alternate_sources.
+
+    Args:
+        cards: News results in rank order
+        threshold: Minimum cosine similarity for two cards to be the same story
+
+    Returns:
+        One representative per story, in rank order
+    """
+    if len(cards) < 2:
+        return [dict(card, alternate_sources=[]) for card in cards]
+
+    vectors = vectorize_cards(cards)
+    similarity = vectors @ vectors.T
+    claimed = np.zeros(len(cards), dtype=bool)
+    stories = []
+    for index in range(len(cards)):
+        if claimed[index]:
+            continue
+        members = np.flatnonzero((similarity[index] >= threshold) & ~claimed)
+        members = members[members >= index]
+        claimed[members] = True
+        alternates = [
+            {"title": cards[member]["title"], "url": cards[member]["url"], "source": cards[member].get("source", "")}
+            for member in members if member != index
+        ]
+        stories.append(dict(cards[index], alternate_sources=alternates))
+
+    log_debug(f"Clustered {len(cards)} news cards into {len(stories)} stories")
+    return stories
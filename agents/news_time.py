@@ -0,0 +1,72 @@
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Union
+
+UNIT_SECONDS = {
+    "s": 1, "sec": 1, "secs": 1, "second": 1, "seconds": 1,
+    "m": 60, "min": 60, "mins": 60, "minute": 60, "minutes": 60,
+    "h": 3600, "hr": 3600, "hrs": 3600, "hour": 3600, "hours": 3600,
+    "d": 86400, "day": 86400, "days": 86400,
+    "w": 604800, "wk": 604800, "wks": 604800, "week": 604800, "weeks": 604800,
+    "mo": 2592000, "mon": 2592000, "month": 2592000, "months": 2592000,
+    "y": 31536000, "yr": 31536000, "yrs": 31536000, "year": 31536000, "years": 31536000,
+}
+
+RELATIVE_PATTERN = re.compile(r"^(\d+)\s*([a-z]+)(?:\s+ago)?$")
+
+ABSOLUTE_FORMATS = ("%b %d, %Y", "%B %d, %Y", "%m/%d/%Y", "%d %b %Y", "%d %B %Y", "%Y-%m-%d")
+
+def parse_news_timestamp(label: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Turn a Bing News age label ("3h", "2 days ago", "Yesterday", "Sep 12, 2024") into a UTC datetime.
+
+    Relative labels are resolved against now, which should be the time the page was fetched.
+    Returns None for labels that cannot be parsed.
+    """
+    now = now or datetime.now(timezone.utc)
+    text = " ".join((label or "").lower().replace(".", "").split())
+    if not text:
+        return None
+    if text in ("just now", "now"):
+        return now
+    if text == "yesterday":
+        return now - timedelta(days=1)
+
+    match = RELATIVE_PATTERN.match(text)
+    if match and match.group(2) in UNIT_SECONDS:
+        return now - timedelta(seconds=int(match.group(1)) * UNIT_SECONDS[match.group(2)])
+
+    for date_format in ABSOLUTE_FORMATS:
+        try:
+            return datetime.strptime(label.strip(), date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+def parse_since(value: Union[str, int, float, datetime, None], now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Interpret a "since" filter as a UTC datetime.
+
+    Accepts a datetime, a Unix timestamp, an ISO 8601 string, or an age such as "6h" or "2 days".
+    Anything else, such as a list from a JSON body, raises ValueError.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return datetime.fromtimestamp(value, timezone.utc)
+        except (OverflowError, OSError, ValueError):
+            raise ValueError(f"Timestamp out of range: {value}")
+    if not isinstance(value, str):
+        raise ValueError(f"Unsupported since value of type {type(value).__name__}")
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except ValueError:
+        pass
+    parsed = parse_news_timestamp(value, now)
+    if parsed is None:
+        raise ValueError(f"Unrecognized since value: {value}")
+    return parsed
@@ -0,0 +1,25 @@
+import os
+import threading
+from typing import Optional
+
+from tools.cache import TieredCache
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache() -> TieredCache:
+    """Return the process-wide cache of extracted page content (memory only, short TTL)"""
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = TieredCache(
+                "pages",
+                max_memory_entries=int(os.getenv('PAGE_CACHE_SIZE', '128')),
+                ttl=float(os.getenv('PAGE_CACHE_TTL', '600')),
+                persist=False
+            )
+        return _page_cache
+
+def page_cache_key(url: str, max_tokens: Optional[int]) -> str:
+    # Extraction is truncated to the caller's budget, so the budget is part of the key
+    return f"{url}|{max_tokens}"
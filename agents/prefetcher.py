@@ -0,0 +1,175 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Session used by callers that do not distinguish users, such as scripts
+DEFAULT_SESSION = "default"
+
+class Prefetcher:
+    """
+    Speculatively fetches, and optionally summarizes, the top search results in the background.
+
+    Work goes through a bounded queue served by a few daemon threads. Each call to
+    prefetch() starts a new generation for its session; queued work from that
+    session's older generations is dropped, so a new query cancels prefetching
+    for the previous one without touching other sessions' work. Content
+    lands in the page cache and summaries in the summary cache, where the normal
+    Web_Agent code paths pick them up.
+    """
+
+    # Remember this many prefetched URLs when attributing hits
+    TRACKED_URLS = 256
+    # Remember the current generation of this many sessions
+    TRACKED_SESSIONS = 1024
+
+    def __init__(self, workers: int = 3, max_queue: int = 16, top_k: int = 3, summarize: bool = False):
+        self.workers = workers
+        self.top_k = top_k
+        self.summarize = summarize
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Generation numbers come from one counter, so a forgotten session's work never looks current
+        self._generation = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._local = threading.local()
+        self._prefetched_urls = OrderedDict()
+        self._stats = {"scheduled": 0, "fetched": 0, "summarized": 0, "failed": 0, "dropped": 0, "cancelled": 0, "hits": 0, "misses": 0}
+
+    def prefetch(self, agent: Any, results: List[Dict[str, Any]], top_k: Optional[int] = None, summarize: Optional[bool] = None,
+                 session: str = DEFAULT_SESSION) -> int:
+        """
+        Queue the top results of a new search for background fetching.
+
+        Args:
+            agent: The Web_Agent whose settings clicks will use
+            results: Search results in rank order
+            top_k: Number of results to prefetch, defaults to the prefetcher's top_k
+            summarize: Whether to pre-summarize as well as fetch
+            session: Id of the user session the search came from
+
+        Returns:
+            Number of URLs queued
+        """
+        top_k = self.top_k if top_k is None else top_k
+        summarize = self.summarize if summarize is None else summarize
+        generation = self.cancel(session)
+        self._ensure_workers()
+
+        queued = 0
+        for result in results[:top_k]:
+            url = result.get('url')
+            if not url or not url.startswith('http'):
+                continue
+            try:
+                self._queue.put_nowait((session, generation, agent, url, summarize))
+            except queue.Full:
+                with self._lock:
+                    self._stats["dropped"] += 1
+                continue
+            queued += 1
+            with self._lock:
+                self._stats["scheduled"] += 1
+                self._prefetched_urls[url] = True
+                self._prefetched_urls.move_to_end(url)
+                while len(self._prefetched_urls) > self.TRACKED_URLS:
+                    self._prefetched_urls.popitem(last=False)
+        log_debug(f"Prefetcher queued {queued} URLs for generation {generation}")
+        return queued
+
+    def cancel(self, session: str = DEFAULT_SESSION) -> int:
+        """Drop a session's queued work from earlier searches and start a new generation for it"""
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+            self._sessions[session] = generation
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.TRACKED_SESSIONS:
+                self._sessions.popitem(last=False)
+        # Queue has no selective removal, so filter its deque under the queue's own lock
+        with self._queue.mutex:
+            kept = [item for item in self._queue.queue if item[0] != session]
+            removed = len(self._queue.queue) - len(kept)
+            self._queue.queue.clear()
+            self._queue.queue.extend(kept)
+            self._queue.not_full.notify(removed)
+        if removed:
+            with self._lock:
+                self._stats["cancelled"] += removed
+        return generation
+
+    def note_request(self, url: str, hit: bool):
+        """Record whether a user-initiated fetch of a prefetched URL was served from cache"""
+        if getattr(self._local, 'is_worker', False):
+            return
+        with self._lock:
+            if url not in self._prefetched_urls:
+                return
+            self._stats["hits" if hit else "misses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+    def _is_current(self, session: str, generation: int) -> bool:
+        with self._lock:
+            return self._sessions.get(session) == generation
+
+    def _ensure_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"prefetch-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self):
+        self._local.is_worker = True
+        while True:
+            session, generation, agent, url, summarize = self._queue.get()
+            if not self._is_current(session, generation):
+                with self._lock:
+                    self._stats["cancelled"] += 1
+                continue
+            try:
+                content = agent._get_web_content(url)
+                if not content:
+                    with self._lock:
+                        self._stats["failed"] += 1
+                    continue
+                with self._lock:
+                    self._stats["fetched"] += 1
+                if summarize and self._is_current(session, generation):
+                    agent._summarize_web_content(content, url)
+                    with self._lock:
+                        self._stats["summarized"] += 1
+            except Exception as e:
+                log_debug(f"Prefetch failed for {url}: {str(e)}")
+                with self._lock:
+                    self._stats["failed"] += 1
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+def get_prefetcher() -> Prefetcher:
+    """Return the process-wide prefetcher"""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(
+                workers=int(os.getenv('PREFETCH_WORKERS', '3')),
+                max_queue=int(os.getenv('PREFETCH_QUEUE_SIZE', '16')),
+                top_k=int(os.getenv('PREFETCH_TOP_K', '3'))
+            )
+        return _prefetcher
@@ -0,0 +1,159 @@
+import math
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from providers.token_estimator import estimate_tokens, get_context_window, token_estimate_stats
+from tools.web_tools.WebGetContents_Tool import split_markdown_sections, truncate_markdown
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+CONTENT_PLACEHOLDER = "\x00CONTENT\x00"
+
+# Headroom for estimator error and chat-format overhead
+SAFETY_MARGIN_TOKENS = 128
+MIN_CONTENT_TOKENS = 256
+
+# Generation caps sit this far above the expected output so a slightly long answer is not cut off
+OUTPUT_MARGIN = 0.25
+# finish_reason values meaning the answer hit max_tokens (Groq/OpenAI and Anthropic)
+TRUNCATED_FINISH_REASONS = ("length", "max_tokens")
+TRUNCATION_RETRIES = 1
+
+def compact_prompt(template: str) -> str:
+    """Strip the indentation that triple-quoted templates carry and collapse blank runs"""
+    lines = [line.strip() for line in template.strip().splitlines()]
+    compacted = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", compacted)
+
+def split_into_chunks(content: str, max_tokens: int, token_counter: Callable[[str], int]) -> List[str]:
+    """
+    Split content into chunks of at most max_tokens, breaking on section boundaries.
+
+    Sections are packed greedily. A section larger than a chunk is split on
+    paragraphs, and a single oversized paragraph is cut on whitespace.
+
+    Args:
+        content: The Markdown or plain text to split
+        max_tokens: Token limit per chunk
+        token_counter: Callable returning the token count of a string
+
+    Returns:
+        List of chunks in document order
+    """
+    pieces = []
+    for section in split_markdown_sections(content):
+        if token_counter(section) <= max_tokens:
+            pieces.append(section)
+            continue
+        for paragraph in section.split("\n\n"):
+            if token_counter(paragraph) <= max_tokens:
+                pieces.append(paragraph)
+                continue
+            # Cut on whitespace at the character length that matches the token limit
+            chars_per_chunk = max(int(len(paragraph) * max_tokens / token_counter(paragraph)), 1)
+            while paragraph:
+                cut = len(paragraph) if len(paragraph) <= chars_per_chunk else paragraph.rfind(" ", 0, chars_per_chunk)
+                if cut <= 0:
+                    cut = chars_per_chunk
+                # The length ratio is an average; back off word by word if this stretch is denser
+                while token_counter(paragraph[:cut]) > max_tokens and paragraph.rfind(" ", 0, cut) > 0:
+                    cut = paragraph.rfind(" ", 0, cut)
+                pieces.append(paragraph[:cut].strip())
+                paragraph = paragraph[cut:].strip()
+
+    chunks = []
+    current = []
+    used = 0
+    for piece in pieces:
+        piece_tokens = token_counter(piece)
+        if current and used + piece_tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current = []
+            used = 0
+        current.append(piece)
+        used += piece_tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+class PromptBudget:
+    """
+    Sizes the content slice of a prompt so the whole request fits the model's context window.
+
+    The budget is the context window minus the estimated instruction tokens, the
+    output cap and a small safety margin. The output cap is the expected output
+    plus OUTPUT_MARGIN; it is what callers pass as max_tokens, so the context
+    window never doubles as the generation limit.
+    """
+
+    def __init__(self, model: Optional[str], context_window: Optional[int] = None, output_tokens: int = 0):
+        model_window = get_context_window(model)
+        self.model = model
+        self.context_window = min(context_window, model_window) if context_window else model_window
+        self.output_tokens = output_tokens
+
+    @property
+    def max_output_tokens(self) -> int:
+        return math.ceil(self.output_tokens * (1 + OUTPUT_MARGIN))
+
+    def count_tokens(self, text: str) -> int:
+        return estimate_tokens(text, self.model)
+
+    def content_budget(self, build_prompt: Callable[[str], str]) -> int:
+        """Return how many content tokens fit alongside the instructions built by build_prompt"""
+        instructions = compact_prompt(build_prompt(""))
+        budget = self.context_window - self.count_tokens(instructions) - self.max_output_tokens - SAFETY_MARGIN_TOKENS
+        log_debug(f"Content budget for {self.model}: {budget} tokens (context window {self.context_window}, output cap {self.max_output_tokens})")
+        return max(budget, MIN_CONTENT_TOKENS)
+
+    def render(self, build_prompt: Callable[[str], str], content: str) -> str:
+        """
+        Build a compacted prompt with the content trimmed to fit the budget.
+
+        Args:
+            build_prompt: Callable that returns the prompt template for a given content string
+            content: The full content to embed in the prompt
+
+        Returns:
+            The prompt, with template indentation removed and content truncated section-aware
+        """
+        budget = self.content_budget(build_prompt)
+        content_slice = truncate_markdown(content or "", budget, self.count_tokens)
+        template = compact_prompt(build_prompt(CONTENT_PLACEHOLDER))
+        return template.replace(CONTENT_PLACEHOLDER, content_slice)
+
+    def record(self, prompt: str, usage: Optional[Dict[str, Any]]) -> None:
+        """Record the estimated prompt size against the provider's reported prompt tokens"""
+        actual = (usage or {}).get("prompt_tokens")
+        token_estimate_stats.record(self.model, self.count_tokens(prompt), actual)
+
+def is_truncated(usage: Optional[Dict[str, Any]]) -> bool:
+    return (usage or {}).get("finish_reason") in TRUNCATED_FINISH_REASONS
+
+def generate_within_budget(provider, prompt: str, budget: PromptBudget, temperature: float) -> str:
+    """
+    Generate with max_tokens set to the budget's output cap, retrying a truncated answer.
+
+    A response that stopped on the cap is regenerated with the cap doubled, up
+    to TRUNCATION_RETRIES times and never past what the context window leaves
+    after the prompt. If it is still truncated the partial answer is returned.
+    """
+    max_tokens = budget.max_output_tokens
+    room = budget.context_window - budget.count_tokens(prompt) - SAFETY_MARGIN_TOKENS
+    for attempt in range(TRUNCATION_RETRIES + 1):
+        response = provider.generate(prompt, max_tokens=max_tokens, temperature=temperature, model=budget.model)
+        budget.record(prompt, provider.last_usage)
+        if not is_truncated(provider.last_usage):
+            break
+        larger = min(max_tokens * 2, room)
+        if attempt == TRUNCATION_RETRIES or larger <= max_tokens:
+            log_debug(f"Response from {budget.model} still truncated at {max_tokens} output tokens")
+            break
+        log_debug(f"Response from {budget.model} truncated at {max_tokens} output tokens; retrying with {larger}")
+        max_tokens = larger
+    return response
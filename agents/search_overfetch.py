@@ -0,0 +1,108 @@
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tools.web_tools.WebSearch_Tool import (
+    OFFSET_BACKENDS,
+    PLACEHOLDER_BACKENDS,
+    WebSearch_Tool,
+    last_search_backend,
+    last_search_page_size,
+)
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class OverfetchTracker:
+    """
+    Tracks what fraction of raw search results survive filtering, per search backend.
+
+    The survival rate is an exponentially weighted moving average, and the
+    over-fetch factor is its inverse plus a safety margin. A backend with no
+    history starts at a 50% survival rate, the same as the old fixed 2x over-fetch.
+    """
+
+    def __init__(self, alpha: float = 0.3, default_rate: float = 0.5, margin: float = 0.15,
+                 min_factor: float = 1.1, max_factor: float = 4.0):
+        self.alpha = alpha
+        self.default_rate = default_rate
+        self.margin = margin
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self._rates: Dict[str, float] = {}
+        self._last_backend: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def predicted_backend(self) -> Optional[str]:
+        """The backend that served the last search, our best guess for the next one"""
+        with self._lock:
+            return self._last_backend
+
+    def factor(self, backend: Optional[str]) -> float:
+        with self._lock:
+            rate = self._rates.get(backend, self.default_rate)
+        factor = (1 + self.margin) / max(rate, 0.01)
+        return min(max(factor, self.min_factor), self.max_factor)
+
+    def fetch_count(self, backend: Optional[str], wanted: int) -> int:
+        return max(wanted, math.ceil(wanted * self.factor(backend)))
+
+    def record(self, backend: Optional[str], fetched: int, survived: int):
+        # Canned fallback links say nothing about how a real backend's results filter
+        if not backend or backend in PLACEHOLDER_BACKENDS or fetched <= 0:
+            return
+        rate = min(survived / fetched, 1.0)
+        with self._lock:
+            previous = self._rates.get(backend)
+            self._rates[backend] = rate if previous is None else self.alpha * rate + (1 - self.alpha) * previous
+            self._last_backend = backend
+        log_debug(f"Search backend {backend}: {survived}/{fetched} results survived filtering")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {backend: round(rate, 3) for backend, rate in self._rates.items()}
+
+overfetch_tracker = OverfetchTracker()
+
+def search_with_topup(query: str, wanted: int,
+                      filter_results: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                      remove_duplicates: Callable[[List[Dict[str, Any]]], List[Dict[str, Any]]],
+                      search: Callable[..., List[Dict[str, Any]]] = WebSearch_Tool) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Search, over-fetching by the observed filter-survival rate, and top up if short.
+
+    If the first batch leaves fewer than wanted results after filtering, one more
+    page is requested for the missing count only (scaled by the survival rate),
+    provided the backend supports paging and returned every result it asked for
+    (backends cap a page, so that may be fewer than requested).
+
+    Args:
+        query: The search query
+        wanted: Number of results the caller needs
+        filter_results: Callable dropping unusable results
+        remove_duplicates: Callable removing duplicate URLs
+        search: Search function taking (query, num_results, offset)
+
+    Returns:
+        Tuple of (raw results, filtered and deduplicated results)
+    """
+    fetch_count = overfetch_tracker.fetch_count(overfetch_tracker.predicted_backend(), wanted)
+    raw_results = search(query, fetch_count)
+    backend = last_search_backend()
+    results = remove_duplicates(filter_results(raw_results))
+    overfetch_tracker.record(backend, len(raw_results), len(results))
+
+    missing = wanted - len(results)
+    page_size = last_search_page_size() or fetch_count
+    if missing > 0 and backend in OFFSET_BACKENDS and len(raw_results) >= min(fetch_count, page_size):
+        top_up_count = overfetch_tracker.fetch_count(backend, missing)
+        log_debug(f"Topping up search for {query}: {missing} missing, requesting {top_up_count}")
+        top_up = search(query, top_up_count, offset=len(raw_results))
+        raw_results = raw_results + top_up
+        results = remove_duplicates(results + filter_results(top_up))
+
+    return raw_results, results
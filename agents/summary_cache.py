@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from tools.cache import TieredCache
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class SummaryCache:
+    """
+    Content-addressed cache of summaries.
+
+    Keys combine a hash of the extracted page content with every setting that
+    changes the generated summary. Only deterministic generations (temperature 0)
+    are cached unless cache_nondeterministic is set.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None, cache_nondeterministic: bool = False):
+        self.cache = cache or TieredCache("summaries", max_memory_entries=512, max_disk_entries=10000)
+        self.cache_nondeterministic = cache_nondeterministic
+
+    def make_key(self, content: str, model: str, comprehension_grade: int, summary_length: int,
+                 humanize: bool, temperature: float) -> str:
+        content_hash = hashlib.sha256((content or "").encode("utf-8")).hexdigest()
+        settings = json.dumps({
+            "model": model,
+            "comprehension_grade": comprehension_grade,
+            "summary_length": summary_length,
+            "humanize": bool(humanize),
+            "temperature": round(float(temperature), 3)
+        }, sort_keys=True)
+        return f"{content_hash}:{hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]}"
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return self.cache_nondeterministic or float(temperature) == 0.0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        summary = self.cache.get(key)
+        log_debug(f"Summary cache {'hit' if summary else 'miss'} for {key[:16]}")
+        return summary
+
+    def set(self, key: str, summary: Dict[str, Any]) -> None:
+        self.cache.set(key, summary)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
+
+def get_summary_cache() -> Optional[SummaryCache]:
+    """Return the process-wide summary cache, or None when SUMMARY_CACHE is disabled"""
+    global _summary_cache
+    if os.getenv('SUMMARY_CACHE', 'True').lower() != 'true':
+        return None
+    with _summary_cache_lock:
+        if _summary_cache is None:
+            _summary_cache = SummaryCache(
+                cache_nondeterministic=os.getenv('SUMMARY_CACHE_ALL_TEMPERATURES', 'False').lower() == 'true'
+            )
+        return _summary_cache
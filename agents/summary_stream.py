@@ -0,0 +1,66 @@
+from typing import List, Tuple
+
+HEADLINE_PREFIX = "HEADLINE:"
+
+class HeadlineStreamParser:
+    """
+    Incrementally splits a streamed summary into its headline and body.
+
+    Mirrors _format_summary: a leading "HEADLINE:" line becomes the headline,
+    otherwise the first sentence does. Body text is passed through as soon as
+    the headline has been emitted.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._headline_done = False
+        self.headline = ""
+        self.body = ""
+
+    def feed(self, delta: str) -> List[Tuple[str, str]]:
+        """
+        Consume a text delta.
+
+        Returns:
+            List of (event, text) tuples, where event is 'headline' or 'body'
+        """
+        if self._headline_done:
+            return self._emit_body(delta)
+
+        self._buffer += delta
+        text = self._buffer.lstrip()
+        if HEADLINE_PREFIX.startswith(text[:len(HEADLINE_PREFIX)]) and len(text) < len(HEADLINE_PREFIX):
+            # Not enough text yet to tell whether a headline line follows
+            return []
+
+        if text.startswith(HEADLINE_PREFIX):
+            if "\n" not in text:
+                return []
+            headline, rest = text.split("\n", 1)
+            return self._emit_headline(headline.replace(HEADLINE_PREFIX, "").strip(), rest.lstrip())
+
+        if ". " not in text:
+            return []
+        headline, rest = text.split(". ", 1)
+        return self._emit_headline(headline.strip(), rest)
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush anything still buffered once the stream has ended"""
+        if self._headline_done:
+            return []
+        text = self._buffer.strip()
+        if text.startswith(HEADLINE_PREFIX):
+            return self._emit_headline(text.replace(HEADLINE_PREFIX, "").strip(), "")
+        return self._emit_headline(text, "")
+
+    def _emit_headline(self, headline: str, rest: str) -> List[Tuple[str, str]]:
+        self._headline_done = True
+        self._buffer = ""
+        self.headline = headline
+        return [("headline", headline)] + self._emit_body(rest)
+
+    def _emit_body(self, text: str) -> List[Tuple[str, str]]:
+        if not text:
+            return []
+        self.body += text
+        return [("body", text)]
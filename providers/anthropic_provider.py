@@ -1,8 +1,15 @@
 import anthropic
 import os
-from typing import Dict, Any
+import threading
+import time
+from typing import Dict, Any, List, Optional
 
 from providers.base_provider import BaseLLMProvider
+from providers.latency_tracker import latency_tracker
+from providers.model_registry import model_registry
+
+# Largest completion the Messages API accepts, independent of the context window
+MAX_OUTPUT_TOKENS = 4096
 
 class AnthropicProvider(BaseLLMProvider):
     def __init__(self, api_key: str):
@@ -11,26 +18,40 @@ class AnthropicProvider(BaseLLMProvider):
             raise ValueError("Anthropic API key is not provided")
         self.api_url = "https://api.anthropic.com/v1/messages"
         self.client = anthropic.Anthropic(api_key=self.api_key)
+        self._local = threading.local()
+        # Upper bound on parallel requests callers should fan out to this provider
+        self.max_concurrent_requests = int(os.environ.get('ANTHROPIC_MAX_CONCURRENCY', '2'))
 
-    def generate(self, prompt: str) -> str:
-        data = {
-            "model": os.environ.get('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20240620'),
-            "messages": [{"role": "user", "content": prompt}]
-        }
-        response = self.send_request(data)
+    def generate(self, prompt: str, max_tokens: int = 4096, temperature: float = 0.1, model: Optional[str] = None, **kwargs) -> str:
+        response = self.send_request(self._build_request(prompt, max_tokens, temperature, model))
+        self._record_usage(self._extract_usage(response))
         processed_response = self.process_response(response)
         return processed_response['choices'][0]['message']['content']
 
-    def get_available_models(self) -> Dict[str, int]:
+    def _build_request(self, prompt: str, max_tokens: int, temperature: float, model: Optional[str]) -> Dict[str, Any]:
+        # Agents pass their configured model, which may belong to another provider
+        if model not in self.get_available_models():
+            model = os.environ.get('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20240620')
         return {
-            "claude-3-5-sonnet-20240620": 4096,
-            "claude-3-opus-20240229": 4096,
-            "claude-3-sonnet-20240229": 4096,
-            "claude-3-haiku-20240307": 4096,
-            "claude-2.1": 100000,
-            "claude-2.0": 100000,
-            "claude-instant-1.2": 100000,
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
         }
+
+    def _extract_usage(self, response: Any) -> Optional[Dict[str, Any]]:
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return None
+        return {
+            "prompt_tokens": usage.input_tokens,
+            "completion_tokens": usage.output_tokens,
+            "total_tokens": usage.input_tokens + usage.output_tokens,
+            "finish_reason": getattr(response, 'stop_reason', None)
+        }
+
+    def get_available_models(self) -> Dict[str, int]:
+        return model_registry.context_windows(provider="anthropic")
                 
     def process_response(self, response: Any) -> Dict[str, Any]:
         if response is not None:
@@ -45,22 +66,52 @@ class AnthropicProvider(BaseLLMProvider):
             }
         return None
     
+    def _message_params(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        model = data['model']
+        return {
+            "model": model,
+            "max_tokens": min(data.get('max_tokens', 4096), MAX_OUTPUT_TOKENS),
+            "temperature": data.get('temperature', 0.1),
+            "messages": [
+                {"role": "user", "content": message["content"]}
+                for message in data['messages']
+            ]
+        }
+
     def send_request(self, data: Dict[str, Any]) -> Any:
+        started = time.perf_counter()
         try:
-            model = data['model']
-            max_tokens = min(data.get('max_tokens', 4096), self.get_available_models()[model])
-            
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=data.get('temperature', 0.1),
-                messages=[
-                    {"role": "user", "content": message["content"]}
-                    for message in data['messages']
-                ]
-            )
+            response = self.client.messages.create(**self._message_params(data))
+            latency_tracker.record(f"anthropic:{data['model']}", round(time.perf_counter() - started, 3))
             return response
         except anthropic.APIError as e:
+            latency_tracker.record(f"anthropic:{data['model']}", None, ok=False)
             if os.environ.get('DEBUG') == 'True':
                 print(f"Anthropic API error: {e}")
-            raise Exception(f"Anthropic API error: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Anthropic API error: {str(e)}")
+
+    async def _async_create_completion(self, **kwargs) -> str:
+        """Create a completion asynchronously on the async SDK client"""
+        data = self._build_request(
+            kwargs.get('prompt', ''),
+            kwargs.get('max_tokens', 4096),
+            kwargs.get('temperature', 0.1),
+            kwargs.get('model')
+        )
+        try:
+            client = self._async_client(lambda: anthropic.AsyncAnthropic(api_key=self.api_key))
+            response = await client.messages.create(**self._message_params(data))
+        except anthropic.APIError as e:
+            if os.environ.get('DEBUG') == 'True':
+                print(f"Anthropic async API error: {e}")
+            raise Exception(f"Anthropic API error: {str(e)}")
+        return self.process_response(response)['choices'][0]['message']['content']
+
+    def _process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
+        """Process tool calls in the response"""
+        # Tool use is not wired up for Anthropic yet, but we need to implement the method
+        return "Tool calls not supported in Anthropic yet"
+
+    async def _async_process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
+        """Process tool calls in the response asynchronously"""
+        return self._process_tool_calls(response, tools)
\ No newline at end of file
@@ -1,5 +1,8 @@
+import asyncio
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Union, AsyncIterator, List
+from typing import Dict, Any, Callable, Iterator, Optional, Union, AsyncIterator, List
 
 class BaseLLMProvider(ABC):
     @abstractmethod
@@ -10,6 +13,14 @@ class BaseLLMProvider(ABC):
     def generate(self, prompt: str, **kwargs) -> Union[str, AsyncIterator[str]]:
         pass
 
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Stream a response as text deltas.
+
+        Providers without native streaming yield the complete response as a single delta.
+        """
+        yield self.generate(prompt, **kwargs)
+
     @abstractmethod
     def get_available_models(self) -> Dict[str, int]:
         pass
@@ -32,4 +43,78 @@ class BaseLLMProvider(ABC):
 
     @abstractmethod
     async def _async_process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
-        pass
\ No newline at end of file
+        pass
+
+    @property
+    def last_usage(self) -> Optional[Dict[str, Any]]:
+        """Token usage reported for the most recent request made on the calling thread"""
+        local = getattr(self, '_local', None)
+        return getattr(local, 'usage', None) if local is not None else None
+
+    def _record_usage(self, usage: Optional[Dict[str, Any]]) -> None:
+        local = getattr(self, '_local', None)
+        if local is not None:
+            local.usage = usage
+
+    async def agenerate(self, prompt: str, **kwargs) -> str:
+        """Generate a response without blocking the event loop"""
+        return await self._async_create_completion(prompt=prompt, **kwargs)
+
+    async def agenerate_many(self, prompts: List[str], concurrency: Optional[int] = None,
+                             return_exceptions: bool = False, **kwargs) -> List[Union[str, BaseException]]:
+        """
+        Run several prompts concurrently on the calling event loop.
+
+        At most concurrency requests (default max_concurrent_requests) are in flight
+        at once. Responses come back in the order of prompts. With return_exceptions,
+        a failed prompt yields its exception in place instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency or getattr(self, 'max_concurrent_requests', 2))
+
+        async def run(prompt: str) -> str:
+            async with semaphore:
+                return await self.agenerate(prompt, **kwargs)
+
+        return await asyncio.gather(*(run(prompt) for prompt in prompts), return_exceptions=return_exceptions)
+
+    def generate_many(self, prompts: List[str], concurrency: Optional[int] = None,
+                      return_exceptions: bool = False, **kwargs) -> List[Union[str, BaseException]]:
+        """
+        Blocking wrapper around agenerate_many for synchronous callers.
+
+        The batch runs on a long-lived event loop owned by this provider, so its
+        async client and connection pool are reused across calls, and it is safe
+        to call from a thread that already runs its own loop.
+        """
+        if not prompts:
+            return []
+        future = asyncio.run_coroutine_threadsafe(
+            self.agenerate_many(prompts, concurrency=concurrency, return_exceptions=return_exceptions, **kwargs),
+            self._background_loop()
+        )
+        return future.result()
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        lock = self.__dict__.setdefault('_loop_lock', threading.Lock())
+        with lock:
+            loop = self.__dict__.get('_loop')
+            if loop is None or loop.is_closed():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=f"{type(self).__name__}-loop", daemon=True).start()
+                self._loop = loop
+            return loop
+
+    def _async_client(self, create: Callable[[], Any]) -> Any:
+        """
+        Return the async client for the running event loop, creating it on first use.
+
+        Async HTTP clients are bound to the loop they were first used on, so each
+        loop gets its own; clients are dropped when their loop is garbage collected.
+        """
+        clients = self.__dict__.setdefault('_async_clients', weakref.WeakKeyDictionary())
+        loop = asyncio.get_running_loop()
+        client = clients.get(loop)
+        if client is None:
+            client = create()
+            clients[loop] = client
+        return client
@@ -1,9 +1,22 @@
 import os
 import asyncio
+import json
+import random
+import threading
+import time
 import requests
-from typing import Dict, Any, Optional, Union, AsyncIterator, List
+from email.utils import parsedate_to_datetime
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, Optional, Union, Iterator, List
 
 from providers.base_provider import BaseLLMProvider
+from providers.image_pipeline import is_vision_model, prepare_image
+from providers.latency_tracker import latency_tracker
+from providers.model_registry import model_registry
+from providers.rate_limiter import rate_limiters
+from providers.response_cache import get_response_cache
+from providers.token_estimator import estimate_tokens
+from providers.vision_cache import get_vision_cache
 
 # Try to import groq, but provide a fallback for cloud environments
 try:
@@ -13,13 +26,44 @@ except ImportError:
     HAS_GROQ_SDK = False
     print("Warning: groq package not found; using HTTP fallback implementation")
 
+# httpx ships with the groq and anthropic SDKs; it backs async requests when the groq SDK is missing
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    HAS_HTTPX = False
+
+# Statuses worth retrying: rate limited, or a transient server-side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 class GroqProvider(BaseLLMProvider):
+    # HTTP fallback settings; connect and read timeouts are in seconds
+    HTTP_TIMEOUT = (
+        float(os.environ.get('GROQ_HTTP_CONNECT_TIMEOUT', '5')),
+        float(os.environ.get('GROQ_HTTP_READ_TIMEOUT', '60'))
+    )
+    HTTP_MAX_RETRIES = int(os.environ.get('GROQ_HTTP_MAX_RETRIES', '3'))
+    BACKOFF_BASE = 0.5
+    BACKOFF_MAX = 20.0
+
     def __init__(self, api_key: str):
         self.api_key = api_key
         if not self.api_key:
             raise ValueError("Groq API key is not provided")
         
-        self.base_url = "https://api.groq.com/v1"
+        self.base_url = "https://api.groq.com/openai/v1"
+        self._local = threading.local()
+        # Upper bound on parallel requests callers should fan out to this provider
+        self.max_concurrent_requests = int(os.environ.get('GROQ_MAX_CONCURRENCY', '4'))
+        
+        # One pooled session per provider; providers are shared per API key by the registry
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(self.max_concurrent_requests * 2, 10))
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
         
         if HAS_GROQ_SDK:
             try:
@@ -30,7 +74,7 @@ class GroqProvider(BaseLLMProvider):
         else:
             self.client = None
 
-    def generate(self, prompt: str, max_tokens: int = 4096, temperature: float = 0.0, model: str = None, image_path: Optional[str] = None) -> str:
+    def generate(self, prompt: str, max_tokens: int = 4096, temperature: float = 0.0, model: str = None, image_path: Optional[Union[str, bytes]] = None) -> str:
         """
         Generate a response from the Groq API
         
@@ -39,7 +83,7 @@ class GroqProvider(BaseLLMProvider):
             max_tokens: Maximum number of tokens to generate
             temperature: Temperature parameter for generation
             model: Optional model name, uses environment variable or default if not specified
-            image_path: Optional path to an image for vision models
+            image_path: Optional image for vision models: a URL, local path, data URL or raw bytes
         
         Returns:
             Generated text response
@@ -55,28 +99,170 @@ class GroqProvider(BaseLLMProvider):
         }
         
         # Handle image input for vision models
-        if image_path and model == "llama-3.2-11b-vision-preview":
+        if image_path and is_vision_model(model):
             # For vision model
             return self._generate_with_vision(prompt, image_path, max_tokens, temperature, model)
         else:
             # Text-only generation
+            cache, cache_key = self._response_cache_key(data)
+            if cache_key:
+                cached = cache.get(cache_key)
+                if cached:
+                    self._record_usage({"cached": True, "finish_reason": cached["finish_reason"]})
+                    return cached["text"]
             response = self.send_request(data)
+            usage = self._extract_usage(response)
+            self._record_usage(usage)
             processed_response = self.process_response(response)
+            if cache_key and not processed_response.startswith("Error:"):
+                cache.set(cache_key, processed_response, (usage or {}).get("finish_reason"))
             return processed_response
     
-    def _generate_with_vision(self, prompt: str, image_path: str, max_tokens: int, temperature: float, model: str) -> str:
+    def generate_stream(self, prompt: str, max_tokens: int = 4096, temperature: float = 0.0, model: str = None) -> Iterator[str]:
+        """
+        Stream a response from the Groq API as it is generated
+        
+        Args:
+            prompt: The input prompt for the model
+            max_tokens: Maximum number of tokens to generate
+            temperature: Temperature parameter for generation
+            model: Optional model name, uses environment variable or default if not specified
+        
+        Yields:
+            Text deltas in generation order
+        """
+        if not model:
+            model = os.environ.get('GROQ_MODEL', 'llama3-8b-8192')
+        
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        
+        cache, cache_key = self._response_cache_key(data)
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached:
+                self._record_usage({"cached": True, "finish_reason": cached["finish_reason"]})
+                yield cached["text"]
+                return
+        
+        limiter = rate_limiters.get(self.api_key, model)
+        reserved_tokens = self._reserved_tokens(data)
+        if limiter:
+            limiter.acquire(reserved_tokens)
+        self._record_usage(None)
+        generated = []
+        settled = False
+        try:
+            if self.client:
+                stream = self.client.chat.completions.create(
+                    model=data["model"],
+                    messages=data["messages"],
+                    max_tokens=data["max_tokens"],
+                    temperature=data["temperature"],
+                    stream=True
+                )
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        generated.append(delta)
+                        yield delta
+                    if chunk.choices[0].finish_reason:
+                        # Groq reports usage on the final chunk under x_groq
+                        x_groq = getattr(chunk, 'x_groq', None)
+                        usage = getattr(x_groq, 'usage', None) if x_groq else None
+                        self._record_usage({
+                            "prompt_tokens": getattr(usage, 'prompt_tokens', None),
+                            "completion_tokens": getattr(usage, 'completion_tokens', None),
+                            "total_tokens": getattr(usage, 'total_tokens', None),
+                            "finish_reason": chunk.choices[0].finish_reason
+                        })
+            else:
+                for delta in self._stream_http(data):
+                    generated.append(delta)
+                    yield delta
+            if limiter:
+                limiter.settle(reserved_tokens, self.last_usage)
+                settled = True
+            if cache_key:
+                cache.set(cache_key, "".join(generated), (self.last_usage or {}).get("finish_reason"))
+        except Exception as e:
+            if os.getenv('DEBUG') == 'True':
+                print(f"Groq streaming API error: {e}")
+            raise Exception(f"Groq API error: {str(e)}")
+        finally:
+            # Reached without settling on an error or when the caller closes the stream early (GeneratorExit);
+            # keep only the prompt and the output streamed so far charged
+            if limiter and not settled:
+                limiter.release(reserved_tokens, self._estimate_request_tokens(data) + estimate_tokens("".join(generated), model))
+
+    def _stream_http(self, data: Dict[str, Any]) -> Iterator[str]:
+        """Stream a completion over HTTP using server-sent events"""
+        payload = dict(data, stream=True)
+        
+        # Retries only cover getting the stream started; a stream that breaks midway is not replayed
+        response, _ = self._post_with_retry(f"{self.base_url}/chat/completions", payload, stream=True, headers={"Accept": "text/event-stream"})
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event_data = line[len("data:"):].strip()
+                if event_data == "[DONE]":
+                    break
+                chunk = json.loads(event_data)
+                choices = chunk.get("choices") or []
+                if not choices:
+                    continue
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+                if choices[0].get("finish_reason"):
+                    usage = (chunk.get("x_groq") or {}).get("usage") or chunk.get("usage") or {}
+                    self._record_usage({
+                        "prompt_tokens": usage.get("prompt_tokens"),
+                        "completion_tokens": usage.get("completion_tokens"),
+                        "total_tokens": usage.get("total_tokens"),
+                        "finish_reason": choices[0].get("finish_reason")
+                    })
+
+    def _generate_with_vision(self, prompt: str, image_path: Union[str, bytes], max_tokens: int, temperature: float, model: str) -> str:
         """Generate a response using a vision model with an image input"""
         try:
+            # Downsize and inline the image so the model receives only what it can use
+            prepared = None
+            try:
+                prepared = prepare_image(image_path, model=model)
+                image_url = prepared.data_url
+                self._local.image_stats = prepared.stats()
+            except Exception as e:
+                if not (isinstance(image_path, str) and image_path.startswith(('http://', 'https://'))):
+                    raise
+                # Formats Pillow cannot read can still be fetched by the API itself
+                if os.getenv('DEBUG') == 'True':
+                    print(f"Image preprocessing failed, sending URL directly: {e}")
+                image_url = image_path
+                self._local.image_stats = None
+            
+            # The same picture at another URL or size gets the same answer
+            vision_cache = get_vision_cache() if prepared is not None else None
+            if vision_cache and not vision_cache.is_cacheable(temperature):
+                vision_cache = None
+            if vision_cache:
+                cached = vision_cache.get(prepared.phash, prompt, model)
+                if cached is not None:
+                    self._record_usage(None)
+                    return cached
+            
             # For vision models, we need to structure the content differently
-            if image_path.startswith(('http://', 'https://')):
-                # For image URLs
-                content = [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": image_path}}
-                ]
-            else:
-                # For local image paths - not implemented here since we're using URLs
-                raise ValueError("Local image paths are not supported")
+            content = [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": image_url}}
+            ]
             
             data = {
                 "model": model,
@@ -86,7 +272,10 @@ class GroqProvider(BaseLLMProvider):
             }
             
             response = self.send_request(data)
+            self._record_usage(self._extract_usage(response))
             processed_response = self.process_response(response)
+            if vision_cache and not processed_response.startswith("Error:"):
+                vision_cache.set(prepared.phash, prompt, model, processed_response)
             return processed_response
             
         except Exception as e:
@@ -96,13 +285,7 @@ class GroqProvider(BaseLLMProvider):
     
     def get_available_models(self) -> Dict[str, int]:
         """Return a dictionary of available models and their context windows"""
-        return {
-            "llama3-8b-8192": 32768,
-            "llama2-70b-4096": 4096,
-            "llama-3.2-11b-vision-preview": 4096,
-            "mixtral-8x7b-32768": 32768,
-            "gemma-7b-it": 8192
-        }
+        return model_registry.context_windows(self.api_key)
     
     def process_response(self, response: Any) -> str:
         """Process the response from the Groq API"""
@@ -116,8 +299,64 @@ class GroqProvider(BaseLLMProvider):
                 print(f"Error processing Groq response: {e}")
             return "Error: Failed to extract content from Groq response"
     
+    def _response_cache_key(self, data: Dict[str, Any]):
+        """Return (cache, key) for a cacheable request, or (None, None) when caching is off or bypassed"""
+        cache = get_response_cache()
+        if not cache or not cache.is_cacheable(data["temperature"]):
+            return None, None
+        return cache, cache.make_key("groq", data["model"], data["messages"], data["max_tokens"], data["temperature"])
+
+    def rate_limit_headroom(self, model: Optional[str] = None) -> Optional[Dict[str, float]]:
+        """Requests and tokens this API key can send to model right now without queueing"""
+        limiter = rate_limiters.get(self.api_key, model or os.environ.get('GROQ_MODEL', 'llama3-8b-8192'))
+        return limiter.headroom() if limiter else None
+
+    def _reserved_tokens(self, data: Dict[str, Any]) -> int:
+        """Tokens a request may use against the TPM limit: its estimated prompt plus the whole output cap"""
+        return self._estimate_request_tokens(data) + int(data.get("max_tokens", 4096))
+
+    def _estimate_request_tokens(self, data: Dict[str, Any]) -> int:
+        text = []
+        for message in data["messages"]:
+            content = message["content"]
+            if isinstance(content, str):
+                text.append(content)
+            else:
+                text.extend(part.get("text", "") for part in content if part.get("type") == "text")
+        return estimate_tokens("\n".join(text), data["model"])
+
+    @property
+    def last_image_stats(self) -> Optional[Dict[str, Any]]:
+        """Byte counts for the image sent by the most recent vision request on the calling thread"""
+        return getattr(self._local, 'image_stats', None)
+
+    def _extract_usage(self, response: Any) -> Optional[Dict[str, Any]]:
+        """Pull token usage, the finish reason and request timing out of an SDK or fallback response"""
+        usage = getattr(response, 'usage', None)
+        timing = getattr(self._local, 'request_timing', None) or {}
+        if usage is None:
+            return dict(timing) if timing else None
+        try:
+            finish_reason = response.choices[0].finish_reason
+        except (AttributeError, IndexError):
+            finish_reason = None
+        return dict(
+            timing,
+            prompt_tokens=getattr(usage, 'prompt_tokens', None),
+            completion_tokens=getattr(usage, 'completion_tokens', None),
+            total_tokens=getattr(usage, 'total_tokens', None),
+            finish_reason=finish_reason
+        )
+
     def send_request(self, data: Dict[str, Any]) -> Any:
         """Send a request to the Groq API"""
+        limiter = rate_limiters.get(self.api_key, data["model"])
+        reserved_tokens = self._reserved_tokens(data)
+        if limiter:
+            # Queue here rather than let the API reject the request with a 429
+            limiter.acquire(reserved_tokens)
+        started = time.perf_counter()
+        settled = False
         try:
             if self.client:
                 # Use the SDK if available
@@ -127,16 +366,14 @@ class GroqProvider(BaseLLMProvider):
                     max_tokens=data.get("max_tokens", 4096),
                     temperature=data.get("temperature", 0.0)
                 )
+                self._local.request_timing = {"latency_seconds": round(time.perf_counter() - started, 3), "attempts": 1}
+                latency_tracker.record(f"groq:{data['model']}", self._local.request_timing["latency_seconds"])
+                if limiter:
+                    limiter.settle(reserved_tokens, self._extract_usage(response))
+                    settled = True
                 return response
             else:
                 # Fallback implementation using direct HTTP requests
-                url = f"{self.base_url}/chat/completions"
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Prepare the payload
                 payload = {
                     "model": data["model"],
                     "messages": data["messages"],
@@ -144,15 +381,73 @@ class GroqProvider(BaseLLMProvider):
                     "temperature": data.get("temperature", 0.0)
                 }
                 
-                # Send the request
-                response = requests.post(url, headers=headers, json=payload)
-                response.raise_for_status()
-                return self._convert_to_sdk_response(response.json())
+                response, attempts = self._post_with_retry(f"{self.base_url}/chat/completions", payload)
+                self._local.request_timing = {"latency_seconds": round(time.perf_counter() - started, 3), "attempts": attempts}
+                latency_tracker.record(f"groq:{data['model']}", self._local.request_timing["latency_seconds"])
+                response = self._convert_to_sdk_response(response.json())
+                if limiter:
+                    limiter.settle(reserved_tokens, self._extract_usage(response))
+                    settled = True
+                return response
                 
         except Exception as e:
+            latency_tracker.record(f"groq:{data['model']}", None, ok=False)
             if os.getenv('DEBUG') == 'True':
                 print(f"Groq API error: {e}")
             raise Exception(f"Groq API error: {str(e)}")
+        finally:
+            # A failed request was not counted by the API, so its reservation goes back
+            if limiter and not settled:
+                limiter.release(reserved_tokens)
+
+    def _post_with_retry(self, url: str, payload: Dict[str, Any], stream: bool = False,
+                         headers: Optional[Dict[str, str]] = None):
+        """
+        POST on the pooled session, retrying rate limits, server errors and connection failures.
+
+        Waits follow Retry-After when the server sends it, otherwise exponential
+        backoff with jitter. Returns the successful response and the attempt count.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = self._session.post(url, json=payload, headers=headers, timeout=self.HTTP_TIMEOUT, stream=stream)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt > self.HTTP_MAX_RETRIES:
+                    raise
+                delay = self._backoff_delay(attempt)
+                if os.getenv('DEBUG') == 'True':
+                    print(f"Groq request failed ({e}); retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt > self.HTTP_MAX_RETRIES:
+                    if response.status_code >= 400:
+                        response.close()
+                    response.raise_for_status()
+                    return response, attempt
+                delay = self._retry_after(response) or self._backoff_delay(attempt)
+                response.close()
+                if os.getenv('DEBUG') == 'True':
+                    print(f"Groq returned {response.status_code}; retrying in {delay:.1f}s")
+            time.sleep(min(delay, self.BACKOFF_MAX))
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return self.BACKOFF_BASE * (2 ** (attempt - 1)) * (1 + random.random() * 0.25)
+
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[float]:
+        """Seconds the server asked us to wait, from a numeric or HTTP-date Retry-After header"""
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+        except (TypeError, ValueError):
+            return None
     
     def _convert_to_sdk_response(self, json_response: Dict[str, Any]) -> Any:
         """Convert a JSON response to a format compatible with the SDK response"""
@@ -167,24 +462,101 @@ class GroqProvider(BaseLLMProvider):
                         self.message = type('Message', (), {
                             'content': choice_data['message']['content'] 
                         })
+                        self.finish_reason = choice_data.get('finish_reason')
                 
                 self.choices = [Choice(choice) for choice in json_data['choices']]
+                usage = json_data.get('usage')
+                self.usage = type('Usage', (), usage) if usage else None
         
         return MockResponse(json_response)
     
-    async def _async_create_completion(self, **kwargs) -> Union[str, AsyncIterator[str]]:
-        """Create a completion asynchronously"""
-        # This is a placeholder implementation
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            None, 
-            lambda: self.generate(
-                kwargs.get('prompt', ''),
-                max_tokens=kwargs.get('max_tokens', 4096),
-                temperature=kwargs.get('temperature', 0.0),
-                model=kwargs.get('model', None)
+    async def _async_create_completion(self, **kwargs) -> str:
+        """Create a completion asynchronously on the async SDK client, or a pooled async HTTP client without the SDK"""
+        prompt = kwargs.get('prompt', '')
+        max_tokens = kwargs.get('max_tokens', 4096)
+        temperature = kwargs.get('temperature', 0.0)
+        model = kwargs.get('model') or os.environ.get('GROQ_MODEL', 'llama3-8b-8192')
+        image_path = kwargs.get('image_path')
+        
+        if image_path and is_vision_model(model):
+            # Image preparation is blocking Pillow and download work, so keep it off the event loop
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                None,
+                lambda: self.generate(prompt, max_tokens=max_tokens, temperature=temperature, model=model, image_path=image_path)
             )
-        )
+        
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        cache, cache_key = self._response_cache_key(data)
+        if cache_key:
+            cached = cache.get(cache_key)
+            if cached:
+                return cached["text"]
+        response = await self._async_send_request(data)
+        processed_response = self.process_response(response)
+        if cache_key and not processed_response.startswith("Error:"):
+            cache.set(cache_key, processed_response, (self._extract_usage(response) or {}).get("finish_reason"))
+        return processed_response
+
+    async def _async_send_request(self, data: Dict[str, Any]) -> Any:
+        """Send a request to the Groq API without blocking the event loop"""
+        limiter = rate_limiters.get(self.api_key, data["model"])
+        reserved_tokens = self._reserved_tokens(data)
+        reserved = False
+        try:
+            if limiter and (self.client or HAS_HTTPX):
+                await limiter.aacquire(reserved_tokens)
+                reserved = True
+            started = time.perf_counter()
+            if self.client:
+                client = self._async_client(lambda: groq.AsyncGroq(api_key=self.api_key))
+                response = await client.chat.completions.create(
+                    model=data["model"],
+                    messages=data["messages"],
+                    max_tokens=data.get("max_tokens", 4096),
+                    temperature=data.get("temperature", 0.0)
+                )
+            elif HAS_HTTPX:
+                client = self._async_client(lambda: httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0)))
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        "model": data["model"],
+                        "messages": data["messages"],
+                        "max_tokens": data.get("max_tokens", 4096),
+                        "temperature": data.get("temperature", 0.0)
+                    }
+                )
+                response.raise_for_status()
+                response = self._convert_to_sdk_response(response.json())
+            else:
+                # No async HTTP client available; fall back to a worker thread, which does its own limiting
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(None, self.send_request, data)
+            latency_tracker.record(f"groq:{data['model']}", round(time.perf_counter() - started, 3))
+            if reserved:
+                usage = getattr(response, 'usage', None)
+                limiter.settle(reserved_tokens, {"total_tokens": getattr(usage, 'total_tokens', None)})
+                reserved = False
+            return response
+        except Exception as e:
+            latency_tracker.record(f"groq:{data['model']}", None, ok=False)
+            if os.getenv('DEBUG') == 'True':
+                print(f"Groq async API error: {e}")
+            raise Exception(f"Groq API error: {str(e)}")
+        finally:
+            # Also runs when the task is cancelled mid-request
+            if reserved:
+                limiter.release(reserved_tokens)
     
     def _process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
         """Process tool calls in the response"""
@@ -193,5 +565,5 @@ class GroqProvider(BaseLLMProvider):
     
     async def _async_process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
         """Process tool calls in the response asynchronously"""
-        # Groq doesn't support tool calls natively yet, but we need to implement the method
-        return "Tool calls not supported in Groq yet"
\ No newline at end of file
+        # Parsing tool calls needs no I/O, so the async variant shares the sync implementation
+        return self._process_tool_calls(response, tools)
\ No newline at end of file
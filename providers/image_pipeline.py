@@ -0,0 +1,164 @@
+import base64
+import os
+import threading
+from io import BytesIO
+from typing import Any, Dict, Optional, Union
+
+import requests
+from PIL import Image, ImageOps
+
+from providers.vision_cache import perceptual_hash
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Longest image side each vision model works at; larger images are downsized before upload
+VISION_MAX_SIDE = {
+    "llama-3.2-11b-vision-preview": 1120,
+    "llama-3.2-90b-vision-preview": 1120,
+    "llava-v1.5-7b-4096-preview": 672,
+}
+DEFAULT_MAX_SIDE = 1120
+
+MAX_DOWNLOAD_BYTES = int(os.getenv('IMAGE_MAX_DOWNLOAD_BYTES', str(20 * 1024 * 1024)))
+JPEG_QUALITY = int(os.getenv('IMAGE_JPEG_QUALITY', '85'))
+
+ImageSource = Union[str, bytes, Any]
+
+def is_vision_model(model: Optional[str]) -> bool:
+    return model in VISION_MAX_SIDE
+
+class PreparedImage:
+    """An image resized and encoded for a vision request, with before/after sizes"""
+
+    def __init__(self, data_url: str, original_bytes: int, final_bytes: int, original_size, final_size, phash: Optional[int] = None):
+        self.data_url = data_url
+        self.phash = phash
+        self.original_bytes = original_bytes
+        self.final_bytes = final_bytes
+        self.original_size = original_size
+        self.final_size = final_size
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.final_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "original_bytes": self.original_bytes,
+            "final_bytes": self.final_bytes,
+            "bytes_saved": self.bytes_saved,
+            "original_size": self.original_size,
+            "final_size": self.final_size
+        }
+
+class ImagePipelineStats:
+    """Running totals of how much image upload the pipeline has avoided"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"images": 0, "original_bytes": 0, "final_bytes": 0}
+
+    def record(self, prepared: PreparedImage):
+        with self._lock:
+            self._stats["images"] += 1
+            self._stats["original_bytes"] += prepared.original_bytes
+            self._stats["final_bytes"] += prepared.final_bytes
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, bytes_saved=self._stats["original_bytes"] - self._stats["final_bytes"])
+
+image_pipeline_stats = ImagePipelineStats()
+
+def fetch_image(url: str, max_bytes: int = MAX_DOWNLOAD_BYTES) -> bytes:
+    """Download an image, refusing anything larger than max_bytes"""
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    }
+    with requests.get(url, headers=headers, timeout=(5, 20), stream=True) as response:
+        response.raise_for_status()
+        declared = response.headers.get('Content-Length')
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ValueError(f"Image is {int(declared)} bytes, larger than the {max_bytes} byte limit")
+        data = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            data.extend(chunk)
+            if len(data) > max_bytes:
+                raise ValueError(f"Image exceeds the {max_bytes} byte limit")
+        return bytes(data)
+
+def load_image_bytes(source: ImageSource, max_bytes: int = MAX_DOWNLOAD_BYTES) -> bytes:
+    """Read image bytes from a URL, a data URL, a local path, raw bytes or a file-like upload"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        return source.read()
+    if source.startswith(('http://', 'https://')):
+        return fetch_image(source, max_bytes)
+    if source.startswith('data:'):
+        return base64.b64decode(source.split(',', 1)[1])
+    if os.path.getsize(source) > max_bytes:
+        raise ValueError(f"Image file {source} exceeds the {max_bytes} byte limit")
+    with open(source, 'rb') as f:
+        return f.read()
+
+def prepare_image(source: ImageSource, model: Optional[str] = None, max_side: Optional[int] = None,
+                  quality: int = JPEG_QUALITY) -> PreparedImage:
+    """
+    Load an image, downsize it to the vision model's working resolution and encode it as base64.
+
+    Args:
+        source: Image URL, data URL, local path, bytes or file-like object
+        model: Vision model the image is for, used to pick the target resolution
+        max_side: Optional override for the longest side in pixels
+        quality: JPEG quality used when re-encoding
+
+    Returns:
+        PreparedImage holding the data URL and the byte counts before and after
+    """
+    raw = load_image_bytes(source)
+    max_side = max_side or VISION_MAX_SIDE.get(model, DEFAULT_MAX_SIDE)
+
+    with Image.open(BytesIO(raw)) as image:
+        original_format = image.format
+        original_size = image.size
+        image = ImageOps.exif_transpose(image)
+        phash = perceptual_hash(image)
+        if max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            # JPEG has no alpha channel, so flatten onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image.convert("RGBA"), mask=image.convert("RGBA").split()[-1])
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+        encoded = buffer.getvalue()
+        final_size = image.size
+
+    mime_type = "image/jpeg"
+    if len(encoded) >= len(raw) and final_size == original_size and original_format in ("JPEG", "PNG", "WEBP"):
+        # Re-encoding did not help; send the original untouched
+        encoded = raw
+        mime_type = f"image/{original_format.lower()}"
+
+    prepared = PreparedImage(
+        f"data:{mime_type};base64,{base64.b64encode(encoded).decode('ascii')}",
+        original_bytes=len(raw),
+        final_bytes=len(encoded),
+        original_size=original_size,
+        final_size=final_size,
+        phash=phash
+    )
+    image_pipeline_stats.record(prepared)
+    log_debug(f"Prepared image {original_size} -> {final_size}, {len(raw)} -> {len(encoded)} bytes ({prepared.bytes_saved} saved)")
+    return prepared
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class LatencyTracker:
+    """
+    Per-backend request latency and error rate, keyed like "groq:llama3-8b-8192".
+
+    Keeps exponentially weighted moving averages of latency (successful requests
+    only) and of the error rate, plus a window of recent latencies for percentiles.
+    """
+
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha = alpha
+        self.window = window
+        self._latency: Dict[str, float] = {}
+        self._errors: Dict[str, float] = {}
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+        self._last_error: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: Optional[float], ok: bool = True):
+        with self._lock:
+            counts = self._counts.setdefault(key, {"requests": 0, "errors": 0})
+            counts["requests"] += 1
+            error = 0.0 if ok else 1.0
+            previous_error = self._errors.get(key)
+            self._errors[key] = error if previous_error is None else self.alpha * error + (1 - self.alpha) * previous_error
+            if not ok:
+                counts["errors"] += 1
+                self._last_error[key] = time.monotonic()
+                return
+            previous = self._latency.get(key)
+            self._latency[key] = seconds if previous is None else self.alpha * seconds + (1 - self.alpha) * previous
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def latency(self, key: str) -> Optional[float]:
+        with self._lock:
+            return self._latency.get(key)
+
+    def error_rate(self, key: str) -> float:
+        with self._lock:
+            return self._errors.get(key, 0.0)
+
+    def seconds_since_error(self, key: str) -> Optional[float]:
+        with self._lock:
+            last_error = self._last_error.get(key)
+        return None if last_error is None else time.monotonic() - last_error
+
+    def percentile(self, key: str, percent: float, min_samples: int = 20) -> Optional[float]:
+        """Latency percentile over the recent window, or None until enough requests have been seen"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * percent / 100.0))]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._counts)
+        return {
+            key: dict(
+                self._counts[key],
+                latency_ewma=round(self.latency(key), 3) if self.latency(key) is not None else None,
+                error_rate=round(self.error_rate(key), 3),
+                p95=self.percentile(key, 95)
+            )
+            for key in keys
+        }
+
+latency_tracker = LatencyTracker()
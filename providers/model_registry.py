@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from providers.token_estimator import KNOWN_CONTEXT_WINDOWS
+from tools.cache import DEFAULT_CACHE_DIR
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+GROQ_MODELS_URL = "https://api.groq.com/openai/v1/models"
+
+def fallback_models(provider: str) -> Dict[str, int]:
+    """Built-in context windows, used only when there is no live list and no snapshot yet"""
+    is_claude = provider == "anthropic"
+    return {model_id: window for model_id, window in KNOWN_CONTEXT_WINDOWS.items() if model_id.startswith("claude") == is_claude}
+
+# Groq also lists speech models, which cannot serve chat completions
+NON_CHAT_MARKERS = ("whisper", "tts", "playai")
+
+class ModelRegistry:
+    """
+    Single source of model ids and context windows for every entry point.
+
+    Groq's model list is fetched from /openai/v1/models at most once per ttl
+    seconds. Each successful fetch is written to a snapshot file, which is what
+    the registry starts from when it has no network or no API key, so a restart
+    offline still knows yesterday's models. Anthropic models come from a static list.
+    """
+
+    def __init__(self, ttl: float = 3600.0, snapshot_path: Optional[str] = None):
+        self.ttl = ttl
+        self.snapshot_path = snapshot_path or os.path.join(DEFAULT_CACHE_DIR, "groq_models.json")
+        self._groq_models: Optional[Dict[str, Dict[str, Any]]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def models(self, api_key: Optional[str] = None, provider: str = "groq") -> Dict[str, Dict[str, Any]]:
+        """
+        Return {model id: {"id", "context_window", ...}} for a provider.
+
+        With an API key, a Groq list older than ttl is refreshed first; a failed
+        refresh keeps serving the last known good list.
+        """
+        if provider != "groq":
+            return {model_id: {"id": model_id, "context_window": window}
+                    for model_id, window in fallback_models(provider).items()}
+        with self._lock:
+            # Claim the refresh so one thread fetches while the rest keep serving the current list
+            refresh = bool(api_key) and time.time() - self._fetched_at > self.ttl
+            if refresh:
+                self._fetched_at = time.time()
+        if refresh:
+            models = self._fetch(api_key)
+            if models:
+                with self._lock:
+                    self._groq_models = models
+                self._save_snapshot(models)
+        with self._lock:
+            if self._groq_models is None:
+                self._groq_models = self._load_snapshot() or {
+                    model_id: {"id": model_id, "context_window": window}
+                    for model_id, window in fallback_models("groq").items()
+                }
+            return dict(self._groq_models)
+
+    def context_windows(self, api_key: Optional[str] = None, provider: str = "groq") -> Dict[str, int]:
+        return {model_id: model["context_window"] for model_id, model in self.models(api_key, provider).items()}
+
+    def context_window(self, model: Optional[str]) -> Optional[int]:
+        """Context window of a known model, from the cached list only (never hits the network)"""
+        if not model:
+            return None
+        for provider in ("groq", "anthropic"):
+            entry = self.models(provider=provider).get(model)
+            if entry and entry.get("context_window"):
+                return int(entry["context_window"])
+        return None
+
+    def clamp_max_tokens(self, model: Optional[str], max_tokens: int) -> int:
+        window = self.context_window(model)
+        return min(int(max_tokens), window) if window else int(max_tokens)
+
+    def _fetch(self, api_key: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Fetch the live Groq model list without holding the lock; None on failure"""
+        try:
+            response = requests.get(GROQ_MODELS_URL, headers={"Authorization": f"Bearer {api_key}"}, timeout=(5, 10))
+            response.raise_for_status()
+            models = {
+                model['id']: dict(model, context_window=model.get('context_window') or KNOWN_CONTEXT_WINDOWS.get(model['id'], 8192))
+                for model in response.json()['data']
+                if model.get('active', True) and not any(marker in model['id'] for marker in NON_CHAT_MARKERS)
+            }
+        except Exception as e:
+            log_debug(f"Error fetching Groq models, keeping last known list: {str(e)}")
+            return None
+        if models:
+            log_debug(f"Fetched {len(models)} Groq models")
+        return models or None
+
+    def _load_snapshot(self) -> Optional[Dict[str, Dict[str, Any]]]:
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_snapshot(self, models: Dict[str, Dict[str, Any]]):
+        try:
+            os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+            temp_path = f"{self.snapshot_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(models, f)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            log_debug(f"Could not save model snapshot: {str(e)}")
+
+model_registry = ModelRegistry(ttl=float(os.getenv('MODEL_LIST_TTL', '3600')))
@@ -0,0 +1,125 @@
+import math
+import os
+import re
+from typing import Iterable, List, Optional, Tuple
+
+from providers.image_pipeline import is_vision_model
+from providers.latency_tracker import LatencyTracker, latency_tracker
+from providers.model_registry import ModelRegistry, model_registry
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Model name agents and the API accept to let the selector choose per request
+AUTO_MODEL = "auto"
+
+# Guard and vision models answer chat requests but are not meant for summarizing text
+EXCLUDED_MARKERS = ("guard",)
+
+# Room left for estimation error when checking that a prompt fits a context window
+FIT_MARGIN = 0.1
+
+# Models "auto" may pick when AUTO_MODEL_CANDIDATES is unset, most preferred first.
+# An explicit list keeps the choice the same whether the registry holds the live Groq
+# list or the offline fallback, which would otherwise offer different small models.
+DEFAULT_CANDIDATES = {
+    "groq": ("llama3-8b-8192", "gemma-7b-it", "mixtral-8x7b-32768", "llama-3.1-70b-versatile", "llama3-70b-8192"),
+    "anthropic": ("claude-3-haiku-20240307", "claude-3-5-sonnet-20240620", "claude-3-opus-20240229"),
+}
+
+def model_size(model: str) -> float:
+    """Parameter count in billions parsed from a model id ("llama3-8b", "mixtral-8x7b"), or inf if absent"""
+    match = re.search(r"(\d+)x(\d+(?:\.\d+)?)b(?![a-z])", model.lower())
+    if match:
+        return int(match.group(1)) * float(match.group(2))
+    match = re.search(r"(?<![\d.])(\d+(?:\.\d+)?)b(?![a-z])", model.lower())
+    return float(match.group(1)) if match else math.inf
+
+class ModelSelector:
+    """
+    Picks a model for a prompt of a given size.
+
+    Candidates come from an ordered allow-list, most preferred first, so the
+    pick does not depend on which models the registry happens to list. A model
+    qualifies when its effective context window (its own, capped by the
+    caller's context budget) holds the prompt, the expected output and a margin
+    for estimation error. Among those, the ones whose observed latency EWMA
+    meets the latency target are preferred in allow-list order. Models without
+    latency history count as meeting the target so that they get measured.
+    If no model meets the target the fastest one that fits is used, and if
+    nothing fits the earliest model with the largest effective window wins and
+    the caller's map-reduce path handles the rest.
+    """
+
+    def __init__(self, provider_name: str = "groq", latency_target: float = 5.0, candidates: Optional[Iterable[str]] = None,
+                 registry: Optional[ModelRegistry] = None, tracker: Optional[LatencyTracker] = None):
+        self.provider_name = provider_name
+        self.latency_target = latency_target
+        self.candidates = list(candidates) if candidates else list(DEFAULT_CANDIDATES.get(provider_name, ()))
+        self.registry = registry or model_registry
+        self.tracker = tracker or latency_tracker
+
+    def _windows(self, api_key: Optional[str], max_context: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Candidate models the registry knows, in preference order, with their effective context windows"""
+        windows = self.registry.context_windows(api_key, provider=self.provider_name)
+        models = [model for model in self.candidates if model in windows]
+        if not models:
+            # None of the allow-list is offered any more; rank what is, smallest first, by name on ties
+            models = sorted(
+                (model for model in windows
+                 if not is_vision_model(model) and not any(marker in model for marker in EXCLUDED_MARKERS)),
+                key=lambda model: (model_size(model), model)
+            )
+            log_debug(f"No allow-listed {self.provider_name} model is available; ranking {len(models)} by size")
+        return [(model, min(windows[model], max_context) if max_context else windows[model]) for model in models]
+
+    def largest(self, max_context: Optional[int] = None, api_key: Optional[str] = None) -> Optional[str]:
+        """The most preferred model among those with the largest effective window, or None with no candidates"""
+        windows = self._windows(api_key, max_context)
+        if not windows:
+            return None
+        return max(windows, key=lambda item: item[1])[0]
+
+    def select(self, prompt_tokens: int, output_tokens: int = 0, latency_target: Optional[float] = None,
+               api_key: Optional[str] = None, max_context: Optional[int] = None) -> Optional[str]:
+        """
+        Return the model to use, or None when the registry knows no candidate models.
+
+        max_context is the caller's context budget; a window beyond it would go
+        unused, so it does not make a model fit.
+        """
+        target = self.latency_target if latency_target is None else latency_target
+        windows = self._windows(api_key, max_context)
+        if not windows:
+            return None
+
+        needed = (prompt_tokens + output_tokens) * (1 + FIT_MARGIN)
+        fitting = [(model, window) for model, window in windows if window >= needed]
+        if not fitting:
+            model = self.largest(max_context, api_key)
+            log_debug(f"No model fits {needed:.0f} tokens; using {model}")
+            return model
+
+        def latency(model: str) -> Optional[float]:
+            return self.tracker.latency(f"{self.provider_name}:{model}")
+
+        # fitting keeps preference order, so the first on-target model is the most preferred
+        on_target = [model for model, window in fitting if latency(model) is None or latency(model) <= target]
+        if on_target:
+            model = on_target[0]
+        else:
+            model = min(fitting, key=lambda item: latency(item[0]))[0]
+        log_debug(f"Selected {model} for {prompt_tokens} prompt + {output_tokens} output tokens (latency target {target}s)")
+        return model
+
+def get_model_selector(provider_name: str = "groq") -> ModelSelector:
+    """Build a selector for a provider from AUTO_MODEL_LATENCY_TARGET and AUTO_MODEL_CANDIDATES (ordered, most preferred first)"""
+    candidates = [model.strip() for model in os.getenv('AUTO_MODEL_CANDIDATES', '').split(',') if model.strip()]
+    return ModelSelector(
+        provider_name=provider_name if provider_name in ("groq", "anthropic") else "groq",
+        latency_target=float(os.getenv('AUTO_MODEL_LATENCY_TARGET', '5')),
+        candidates=candidates or None
+    )
@@ -2,6 +2,8 @@ import os
 import sys
 from providers.groq_provider import GroqProvider
 from providers.anthropic_provider import AnthropicProvider
+from providers.provider_registry import provider_registry
+from providers.routing_provider import Route, RoutingProvider, parse_routes
 
 # Set up logging only if DEBUG is True in .env
 DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
@@ -18,9 +20,19 @@ if DEBUG:
 
 class ProviderFactory:
     @staticmethod
-    def get_provider(provider_name, api_key):
+    def get_provider(provider_name, api_key, shared=True):
+        """
+        Return a provider instance for the given name and API key.
+
+        Shared providers are reused across agents so their clients and connection
+        pools survive between requests. Pass shared=False for a private instance.
+        """
         if DEBUG:
             log_debug(f"get_provider called with provider_name: {provider_name}")
+        if provider_name.lower() == 'routing':
+            # The registry builds outside its lock, so this factory can resolve its shared backends
+            return provider_registry.get(provider_name, api_key, lambda: ProviderFactory._create_routing_provider(api_key))
+
         providers = {
             'groq': GroqProvider,
             'anthropic': AnthropicProvider,
@@ -33,9 +45,45 @@ class ProviderFactory:
                 log_debug(f"Unsupported provider: {provider_name}")
             raise ValueError(f"Unsupported provider: {provider_name}")
         
-        if DEBUG:
-            log_debug(f"Creating {provider_name} instance with API key")
-        return provider_class(api_key)
+        if not shared:
+            if DEBUG:
+                log_debug(f"Creating {provider_name} instance with API key")
+            return provider_class(api_key)
+
+        return provider_registry.get(provider_name, api_key, lambda: provider_class(api_key))
+
+    @staticmethod
+    def _create_routing_provider(api_key):
+        """
+        Build a RoutingProvider over the backends listed in ROUTING_BACKENDS.
+
+        The given API key is used for Groq backends; other providers read their
+        key from the environment. Backends without a key of their own, or that
+        cannot be created, are skipped.
+        """
+        default_models = {
+            'groq': os.environ.get('GROQ_MODEL', 'llama3-8b-8192'),
+            'anthropic': os.environ.get('ANTHROPIC_MODEL', 'claude-3-5-sonnet-20240620'),
+        }
+        provider_keys = {
+            'groq': api_key,
+            'anthropic': os.environ.get('ANTHROPIC_API_KEY'),
+        }
+        routes = []
+        for provider_name, model in parse_routes(os.environ.get('ROUTING_BACKENDS', 'groq:llama3-8b-8192,groq:mixtral-8x7b-32768')):
+            backend_key = provider_keys.get(provider_name)
+            if not backend_key:
+                if DEBUG:
+                    log_debug(f"Skipping routing backend {provider_name}: no API key")
+                continue
+            try:
+                provider = ProviderFactory.get_provider(provider_name, backend_key)
+            except Exception as e:
+                if DEBUG:
+                    log_debug(f"Skipping routing backend {provider_name}: {str(e)}")
+                continue
+            routes.append(Route(provider_name, provider, model or default_models.get(provider_name)))
+        return RoutingProvider(routes, hedge=os.environ.get('ROUTING_HEDGE', 'False').lower() == 'true')
 
     @staticmethod
     def get_model():
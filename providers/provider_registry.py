@@ -0,0 +1,90 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        with open('debug_info.txt', 'a') as f:
+            f.write(f"{message}\n")
+
+def hash_api_key(api_key: str) -> str:
+    """Return a short, non-reversible identifier for an API key"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+class ProviderRegistry:
+    """
+    Process-wide cache of provider instances, keyed by provider name and API key hash.
+
+    Reusing a provider keeps its SDK client, and with it the HTTP connection pool,
+    alive across requests. The registry holds at most max_size providers and drops
+    any that have been idle for longer than idle_ttl seconds.
+    """
+
+    def __init__(self, max_size: int = 32, idle_ttl: float = 900.0):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self._providers: "OrderedDict[Tuple[str, str], Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, provider_name: str, api_key: str, create: Callable[[], Any]) -> Any:
+        key = (provider_name.lower(), hash_api_key(api_key))
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+
+        # Build outside the lock: SDK clients can be slow to construct, and a
+        # factory may itself resolve other providers through this registry
+        provider = create()
+        with self._lock:
+            entry = self._providers.get(key)
+            if entry is not None:
+                # Another caller built the same provider meanwhile; keep the one already shared
+                self._providers[key] = (entry[0], time.monotonic())
+                self._providers.move_to_end(key)
+                return entry[0]
+            self._providers[key] = (provider, time.monotonic())
+            while len(self._providers) > self.max_size:
+                # Evicted providers are not closed; agents still holding one can finish their requests
+                evicted_key, _ = self._providers.popitem(last=False)
+                self._stats["evictions"] += 1
+                log_debug(f"Evicted {evicted_key[0]} provider from registry")
+            return provider
+
+    def _lookup(self, key: Tuple[str, str]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._providers.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._providers[key] = (entry[0], now)
+            self._providers.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[0]
+
+    def _evict_idle(self, now: float):
+        idle = [key for key, (_, last_used) in self._providers.items() if now - last_used > self.idle_ttl]
+        for key in idle:
+            del self._providers[key]
+            self._stats["evictions"] += 1
+            log_debug(f"Evicted idle {key[0]} provider from registry")
+
+    def clear(self):
+        with self._lock:
+            self._providers.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, size=len(self._providers))
+
+provider_registry = ProviderRegistry(
+    max_size=int(os.getenv('PROVIDER_REGISTRY_SIZE', '32')),
+    idle_ttl=float(os.getenv('PROVIDER_IDLE_TTL', '900'))
+)
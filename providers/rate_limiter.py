@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from providers.provider_registry import hash_api_key
+from tools.rate_limiter import TokenBucket
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Requests and tokens per minute; GROQ_RPM and GROQ_TPM override these for every model
+DEFAULT_LIMITS = (30, 30000)
+MODEL_LIMITS = {
+    "llama3-8b-8192": (30, 30000),
+    "llama3-70b-8192": (30, 6000),
+    "mixtral-8x7b-32768": (30, 5000),
+    "gemma-7b-it": (30, 15000),
+    "llama-3.2-11b-vision-preview": (30, 7000),
+    "llama-3.2-90b-vision-preview": (15, 7000),
+}
+
+class ModelRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets for one API key and model.
+
+    A request takes one request token and its worst-case token use up front,
+    waiting for both: the estimated prompt plus its max_tokens, since the
+    output of concurrent requests counts against the same minute. Once the
+    response reports actual usage, settle() refunds the unused part of the
+    reservation (or charges an underestimate), so the token bucket tracks what
+    the API actually counted. A request that fails or is abandoned gets its
+    reservation back through release().
+    """
+
+    def __init__(self, rpm: float, tpm: float):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm / 60.0, rpm)
+        self.tokens = TokenBucket(tpm / 60.0, tpm)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "waits": 0, "wait_seconds": 0.0}
+
+    def _reservation(self, reserved_tokens: int) -> float:
+        # A request larger than the whole bucket could never be admitted; cap it and let settle() charge the rest
+        return float(min(max(reserved_tokens, 1), self.tpm))
+
+    def acquire(self, reserved_tokens: int) -> float:
+        """Block until the request fits within both limits; returns the seconds spent waiting"""
+        started = time.monotonic()
+        self.requests.acquire()
+        self.tokens.acquire(self._reservation(reserved_tokens))
+        return self._note_wait(time.monotonic() - started)
+
+    async def aacquire(self, reserved_tokens: int) -> float:
+        """Asynchronous acquire that sleeps on the event loop instead of blocking it"""
+        started = time.monotonic()
+        for bucket, amount in ((self.requests, 1.0), (self.tokens, self._reservation(reserved_tokens))):
+            while True:
+                wait = bucket.try_acquire(amount)
+                if wait == 0.0:
+                    break
+                await asyncio.sleep(wait)
+        return self._note_wait(time.monotonic() - started)
+
+    def settle(self, reserved_tokens: int, usage: Optional[Dict[str, Any]]):
+        """Refund the part of the reservation the API did not count, or charge what it counted beyond it"""
+        if not usage or usage.get("total_tokens") is None:
+            return
+        self.tokens.credit(self._reservation(reserved_tokens) - usage["total_tokens"])
+
+    def release(self, reserved_tokens: int, used_tokens: int = 0):
+        """Refund a reservation for a request that failed or was abandoned, keeping only used_tokens charged"""
+        self.tokens.credit(max(self._reservation(reserved_tokens) - used_tokens, 0.0))
+
+    def _note_wait(self, waited: float) -> float:
+        with self._lock:
+            self._stats["requests"] += 1
+            if waited > 0.01:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += waited
+        if waited > 0.01:
+            log_debug(f"Rate limiter queued a request for {waited:.2f}s")
+        return waited
+
+    def headroom(self) -> Dict[str, float]:
+        """Requests and tokens that could be sent right now without waiting"""
+        return {
+            "requests": round(max(self.requests.available(), 0.0), 2),
+            "tokens": round(max(self.tokens.available(), 0.0)),
+            "rpm": self.rpm,
+            "tpm": self.tpm
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, wait_seconds=round(self._stats["wait_seconds"], 2))
+        stats.update(self.headroom())
+        return stats
+
+class RateLimiterRegistry:
+    """One ModelRateLimiter per (API key hash, model), shared by every provider instance"""
+
+    def __init__(self):
+        self._limiters: Dict[Tuple[str, str], ModelRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def enabled(self) -> bool:
+        return os.getenv('GROQ_RATE_LIMIT', 'True').lower() == 'true'
+
+    def limits_for(self, model: str) -> Tuple[float, float]:
+        rpm, tpm = MODEL_LIMITS.get(model, DEFAULT_LIMITS)
+        return float(os.getenv('GROQ_RPM', rpm)), float(os.getenv('GROQ_TPM', tpm))
+
+    def get(self, api_key: str, model: str) -> Optional[ModelRateLimiter]:
+        if not self.enabled():
+            return None
+        key = (hash_api_key(api_key), model)
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = ModelRateLimiter(*self.limits_for(model))
+            return self._limiters[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {f"{key_hash}:{model}": limiter.stats() for (key_hash, model), limiter in limiters.items()}
+
+rate_limiters = RateLimiterRegistry()
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from tools.cache import TieredCache
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class ResponseCache:
+    """
+    Caches provider completions keyed on a hash of the canonicalized request.
+
+    Only deterministic requests (temperature 0) are cached; anything else
+    bypasses the cache without counting as a miss.
+    """
+
+    def __init__(self, cache: Optional[TieredCache] = None):
+        self.cache = cache or TieredCache("responses", max_memory_entries=512, max_disk_entries=20000, ttl=86400)
+        self._lock = threading.Lock()
+        self._bypassed = 0
+
+    def make_key(self, provider: str, model: str, messages: List[Dict[str, Any]], max_tokens: int, temperature: float) -> str:
+        request = json.dumps({
+            "provider": provider,
+            "model": model,
+            "messages": messages,
+            "max_tokens": int(max_tokens),
+            "temperature": round(float(temperature), 3)
+        }, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        if float(temperature) == 0.0:
+            return True
+        with self._lock:
+            self._bypassed += 1
+        return False
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        response = self.cache.get(key)
+        log_debug(f"Response cache {'hit' if response else 'miss'} for {key[:16]}")
+        return response
+
+    def set(self, key: str, text: str, finish_reason: Optional[str] = None) -> None:
+        self.cache.set(key, {"text": text, "finish_reason": finish_reason})
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.cache.stats()
+        with self._lock:
+            stats["bypassed"] = self._bypassed
+        return stats
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Return the process-wide response cache, or None unless RESPONSE_CACHE is enabled"""
+    global _response_cache
+    if os.getenv('RESPONSE_CACHE', 'False').lower() != 'true':
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(TieredCache(
+                "responses",
+                max_memory_entries=int(os.getenv('RESPONSE_CACHE_MEMORY_SIZE', '512')),
+                max_disk_entries=int(os.getenv('RESPONSE_CACHE_DISK_SIZE', '20000')),
+                ttl=float(os.getenv('RESPONSE_CACHE_TTL', '86400'))
+            ))
+        return _response_cache
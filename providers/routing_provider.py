@@ -0,0 +1,169 @@
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from providers.base_provider import BaseLLMProvider
+from providers.latency_tracker import LatencyTracker, latency_tracker
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+class Route:
+    """One backend the router can send a request to: a provider, and optionally a model to use on it"""
+
+    def __init__(self, provider_name: str, provider: BaseLLMProvider, model: Optional[str] = None):
+        self.provider_name = provider_name
+        self.provider = provider
+        self.model = model
+
+    @property
+    def key(self) -> str:
+        # Matches the keys providers record latency under
+        return f"{self.provider_name}:{self.model}" if self.model else self.provider_name
+
+    def kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(kwargs, model=self.model) if self.model else kwargs
+
+class RoutingProvider(BaseLLMProvider):
+    """
+    Sends each request to the fastest healthy backend out of several.
+
+    Backends are ranked by their latency EWMA. A backend with no history ranks
+    first so that it gets measured. One whose error EWMA exceeds max_error_rate
+    drops to the back of the list until it has gone probe_after seconds without
+    an error, when it is given another chance. A failed request falls over to
+    the next backend. With hedging on, if the chosen backend has not answered
+    by its p95 latency, the runner-up is asked too and the first answer wins.
+    """
+
+    def __init__(self, routes: List[Route], hedge: bool = False, max_error_rate: float = 0.5,
+                 probe_after: float = 30.0, tracker: Optional[LatencyTracker] = None):
+        if not routes:
+            raise ValueError("RoutingProvider needs at least one route")
+        self.routes = routes
+        self.hedge = hedge
+        self.max_error_rate = max_error_rate
+        self.probe_after = probe_after
+        self.tracker = tracker or latency_tracker
+        self._local = threading.local()
+        self.max_concurrent_requests = max(getattr(route.provider, 'max_concurrent_requests', 2) for route in routes)
+        self._pool = ThreadPoolExecutor(max_workers=max(4, 2 * self.max_concurrent_requests), thread_name_prefix="route")
+
+    def ranked_routes(self) -> List[Route]:
+        def score(route: Route) -> Tuple[bool, float]:
+            since_error = self.tracker.seconds_since_error(route.key)
+            unhealthy = (self.tracker.error_rate(route.key) > self.max_error_rate
+                         and since_error is not None and since_error < self.probe_after)
+            latency = self.tracker.latency(route.key)
+            return unhealthy, 0.0 if latency is None else latency
+        # sorted() is stable, so configuration order breaks ties
+        return sorted(self.routes, key=score)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        routes = self.ranked_routes()
+        errors = []
+        pending = {}
+        next_route = 0
+
+        def submit():
+            nonlocal next_route
+            route = routes[next_route]
+            next_route += 1
+            log_debug(f"Routing request to {route.key}")
+            pending[self._pool.submit(self._call, route, prompt, kwargs)] = route
+
+        submit()
+        while pending:
+            hedge_after = None
+            if self.hedge and len(pending) == 1 and next_route < len(routes):
+                hedge_after = self.tracker.percentile(next(iter(pending.values())).key, 95)
+            done, _ = wait(pending, timeout=hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                log_debug(f"Hedging after {hedge_after:.2f}s")
+                submit()
+                continue
+            for future in done:
+                route = pending.pop(future)
+                try:
+                    text, usage = future.result()
+                except Exception as e:
+                    log_debug(f"Route {route.key} failed: {str(e)}")
+                    errors.append(f"{route.key}: {str(e)}")
+                    if not pending and next_route < len(routes):
+                        submit()
+                    continue
+                # Losing hedged requests finish in the background and still feed the tracker
+                self._record_usage(dict(usage or {}, route=route.key))
+                return text
+        raise Exception(f"All providers failed: {'; '.join(errors)}")
+
+    def _call(self, route: Route, prompt: str, kwargs: Dict[str, Any]):
+        text = route.provider.generate(prompt, **route.kwargs(kwargs))
+        if isinstance(text, str) and text.startswith("Error:"):
+            raise Exception(text)
+        return text, route.provider.last_usage
+
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream from the best backend, failing over only if it breaks before sending anything"""
+        errors = []
+        for route in self.ranked_routes():
+            started = False
+            try:
+                for delta in route.provider.generate_stream(prompt, **route.kwargs(kwargs)):
+                    started = True
+                    yield delta
+                self._record_usage(dict(route.provider.last_usage or {}, route=route.key))
+                return
+            except Exception as e:
+                if started:
+                    raise
+                log_debug(f"Route {route.key} failed to stream: {str(e)}")
+                errors.append(f"{route.key}: {str(e)}")
+        raise Exception(f"All providers failed: {'; '.join(errors)}")
+
+    def get_available_models(self) -> Dict[str, int]:
+        models = {}
+        for route in self.routes:
+            models.update(route.provider.get_available_models())
+        return models
+
+    def process_response(self, response: Any) -> Any:
+        return response
+
+    def send_request(self, data: Dict[str, Any]) -> Any:
+        # Requests arrive as prompts through generate(); route the raw form through the best backend
+        return self.ranked_routes()[0].provider.send_request(data)
+
+    async def _async_create_completion(self, **kwargs) -> str:
+        errors = []
+        for route in self.ranked_routes():
+            try:
+                return await route.provider._async_create_completion(**route.kwargs(kwargs))
+            except Exception as e:
+                log_debug(f"Route {route.key} failed: {str(e)}")
+                errors.append(f"{route.key}: {str(e)}")
+        raise Exception(f"All providers failed: {'; '.join(errors)}")
+
+    def _process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
+        return self.routes[0].provider._process_tool_calls(response, tools)
+
+    async def _async_process_tool_calls(self, response: Any, tools: List[Dict[str, Any]]) -> str:
+        return self._process_tool_calls(response, tools)
+
+    def stats(self) -> Dict[str, Any]:
+        return {route.key: self.tracker.stats().get(route.key) for route in self.ranked_routes()}
+
+def parse_routes(spec: str) -> List[Tuple[str, Optional[str]]]:
+    """Parse "groq:llama3-8b-8192,anthropic:claude-3-haiku-20240307" into (provider, model) pairs"""
+    routes = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        provider_name, _, model = item.partition(":")
+        routes.append((provider_name.strip().lower(), model.strip() or None))
+    return routes
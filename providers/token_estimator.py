@@ -0,0 +1,117 @@
+import math
+import os
+import re
+import threading
+from typing import Dict, Optional
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+# Average characters per token for English prose, by tokenizer family.
+# These are deliberately a little pessimistic so estimates err on the high side.
+CHARS_PER_TOKEN = {
+    "llama": 3.6,
+    "llava": 3.6,
+    "mixtral": 3.3,
+    "gemma": 3.5,
+    "claude": 3.3,
+    "default": 3.5,
+}
+
+# Context windows for models we know about, used when the model id does not encode it
+KNOWN_CONTEXT_WINDOWS = {
+    "llama3-8b-8192": 8192,
+    "llama2-70b-4096": 4096,
+    "llama-3.2-11b-vision-preview": 8192,
+    "llava-v1.5-7b-4096-preview": 4096,
+    "mixtral-8x7b-32768": 32768,
+    "gemma-7b-it": 8192,
+    "claude-3-5-sonnet-20240620": 200000,
+    "claude-3-opus-20240229": 200000,
+    "claude-3-sonnet-20240229": 200000,
+    "claude-3-haiku-20240307": 200000,
+    "claude-2.1": 200000,
+    "claude-2.0": 100000,
+    "claude-instant-1.2": 100000,
+}
+
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens per word for English output, used to turn word targets into token counts
+TOKENS_PER_WORD = 1.35
+
+def model_family(model: Optional[str]) -> str:
+    """Return the tokenizer family for a model id, e.g. 'llama' or 'claude'"""
+    if not model:
+        return "default"
+    model = model.lower()
+    for family in CHARS_PER_TOKEN:
+        if family in model:
+            return family
+    return "default"
+
+def estimate_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Estimate the token count of a string without calling a tokenizer.
+
+    Args:
+        text: The text to measure
+        model: Optional model id used to pick the tokenizer family
+
+    Returns:
+        Estimated number of tokens
+    """
+    if not text:
+        return 0
+    ratio = CHARS_PER_TOKEN[model_family(model)]
+    return math.ceil(len(text) / ratio)
+
+def words_to_tokens(words: int) -> int:
+    """Convert an English word count into an estimated token count"""
+    return math.ceil(words * TOKENS_PER_WORD)
+
+def get_context_window(model: Optional[str], default: int = DEFAULT_CONTEXT_WINDOW) -> int:
+    """Return the context window of a model, falling back to the size encoded in its id"""
+    # Imported here because the registry builds its offline defaults from this module
+    from providers.model_registry import model_registry
+    window = model_registry.context_window(model)
+    if window:
+        return window
+    if model in KNOWN_CONTEXT_WINDOWS:
+        return KNOWN_CONTEXT_WINDOWS[model]
+    if model:
+        match = re.search(r"-(\d{4,6})(?:-|$)", model)
+        if match:
+            return int(match.group(1))
+    return default
+
+class TokenEstimateStats:
+    """Thread-safe record of estimated versus actual prompt tokens, per model family"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._families: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model: Optional[str], estimated: int, actual: Optional[int]):
+        if not actual:
+            return
+        family = model_family(model)
+        with self._lock:
+            stats = self._families.setdefault(family, {"requests": 0, "estimated": 0, "actual": 0})
+            stats["requests"] += 1
+            stats["estimated"] += estimated
+            stats["actual"] += actual
+        log_debug(f"Prompt tokens for {model}: estimated {estimated}, actual {actual}")
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            result = {}
+            for family, stats in self._families.items():
+                ratio = stats["actual"] / stats["estimated"] if stats["estimated"] else 0.0
+                result[family] = dict(stats, actual_to_estimated=round(ratio, 3))
+            return result
+
+token_estimate_stats = TokenEstimateStats()
@@ -0,0 +1,133 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+from PIL import Image
+
+DEBUG = os.getenv('DEBUG', 'False').lower() == 'true'
+
+def log_debug(message):
+    if DEBUG:
+        print(f"Debug: {message}")
+
+HASH_IMAGE_SIZE = 32
+HASH_BITS = 64
+
+def _dct_matrix(size: int) -> np.ndarray:
+    # Orthonormal DCT-II basis, so dct(x) = M @ x @ M.T
+    n = np.arange(size)
+    matrix = np.cos(np.pi * (2 * n[None, :] + 1) * n[:, None] / (2 * size))
+    matrix[0, :] *= 1 / np.sqrt(2)
+    return matrix * np.sqrt(2 / size)
+
+_DCT = _dct_matrix(HASH_IMAGE_SIZE)
+
+# The HASH_BITS lowest frequencies after the DC term, in order of increasing u + v
+_LOW_FREQUENCIES = sorted(((u, v) for u in range(HASH_IMAGE_SIZE) for v in range(HASH_IMAGE_SIZE)), key=lambda uv: (uv[0] + uv[1], uv[0]))[1:HASH_BITS + 1]
+_ROWS = np.array([u for u, _ in _LOW_FREQUENCIES])
+_COLUMNS = np.array([v for _, v in _LOW_FREQUENCIES])
+
+def perceptual_hash(image: Image.Image) -> int:
+    """
+    Compute a 64-bit DCT perceptual hash of an image.
+
+    The image is reduced to 32x32 grayscale, transformed with a 2D DCT, and the
+    64 lowest frequencies after the DC term (by u + v) are thresholded at their
+    median. Resized or recompressed copies of a picture hash to nearby values.
+    """
+    gray = image.convert("L").resize((HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), Image.LANCZOS)
+    pixels = np.asarray(gray, dtype=np.float64)
+    coefficients = (_DCT @ pixels @ _DCT.T)[_ROWS, _COLUMNS]
+    bits = coefficients > np.median(coefficients)
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+def hamming_distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+class VisionCache:
+    """
+    Caches vision model answers keyed on a perceptual image hash plus the prompt and model.
+
+    A lookup matches any cached image of the same prompt and model within
+    max_distance bits, so the same picture re-hosted, resized or recompressed
+    reuses the earlier answer.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_distance: int = 6, cache_nondeterministic: bool = False):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.cache_nondeterministic = cache_nondeterministic
+        # (model, prompt digest) -> OrderedDict of image hash -> answer
+        self._entries: Dict[tuple, "OrderedDict[int, str]"] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {"exact_hits": 0, "near_hits": 0, "misses": 0, "stores": 0}
+
+    def is_cacheable(self, temperature: float) -> bool:
+        return self.cache_nondeterministic or float(temperature) == 0.0
+
+    def _bucket_key(self, prompt: str, model: Optional[str]) -> tuple:
+        return (model or "", hashlib.sha256((prompt or "").strip().encode("utf-8")).hexdigest())
+
+    def get(self, image_hash: int, prompt: str, model: Optional[str]) -> Optional[str]:
+        with self._lock:
+            bucket = self._entries.get(self._bucket_key(prompt, model))
+            if bucket:
+                if image_hash in bucket:
+                    bucket.move_to_end(image_hash)
+                    self._stats["exact_hits"] += 1
+                    return bucket[image_hash]
+                best = min(bucket, key=lambda cached_hash: hamming_distance(cached_hash, image_hash))
+                distance = hamming_distance(best, image_hash)
+                if distance <= self.max_distance:
+                    bucket.move_to_end(best)
+                    self._stats["near_hits"] += 1
+                    log_debug(f"Vision cache near match at distance {distance}")
+                    return bucket[best]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, image_hash: int, prompt: str, model: Optional[str], answer: str):
+        with self._lock:
+            bucket = self._entries.setdefault(self._bucket_key(prompt, model), OrderedDict())
+            if image_hash not in bucket:
+                self._size += 1
+            bucket[image_hash] = answer
+            bucket.move_to_end(image_hash)
+            self._stats["stores"] += 1
+            while self._size > self.max_entries:
+                self._evict_one()
+
+    def _evict_one(self):
+        # Drop the least recently used entry of the largest bucket
+        key = max(self._entries, key=lambda bucket_key: len(self._entries[bucket_key]))
+        self._entries[key].popitem(last=False)
+        if not self._entries[key]:
+            del self._entries[key]
+        self._size -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats, entries=self._size)
+        lookups = stats["exact_hits"] + stats["near_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["exact_hits"] + stats["near_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+_vision_cache = None
+_vision_cache_lock = threading.Lock()
+
+def get_vision_cache() -> Optional[VisionCache]:
+    """Return the process-wide vision cache, or None when VISION_CACHE is disabled"""
+    global _vision_cache
+    if os.getenv('VISION_CACHE', 'True').lower() != 'true':
+        return None
+    with _vision_cache_lock:
+        if _vision_cache is None:
+            _vision_cache = VisionCache(
+                max_entries=int(os.getenv('VISION_CACHE_SIZE', '1024')),
+                max_distance=int(os.getenv('VISION_CACHE_MAX_DISTANCE', '6'))
+            )
+        return _vision_cache
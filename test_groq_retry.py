@@ -0,0 +1,90 @@
+"""
+Unit tests for the retry policy of the Groq HTTP fallback.
+
+Run with: python -m pytest test_groq_retry.py
+"""
+
+from email.utils import formatdate
+from unittest import mock
+
+import pytest
+import requests
+
+from providers import groq_provider
+from providers.groq_provider import GroqProvider
+
+URL = "https://api.groq.com/openai/v1/chat/completions"
+
+def response(status, headers=None):
+    result = requests.Response()
+    result.status_code = status
+    result.headers.update(headers or {})
+    result.url = URL
+    result._content = b"{}"
+    result.raw = mock.Mock()
+    return result
+
+@pytest.fixture
+def provider(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(groq_provider.time, "sleep", sleeps.append)
+    provider = GroqProvider("gsk_test")
+    provider._session = mock.Mock(spec=requests.Session)
+    provider.sleeps = sleeps
+    return provider
+
+def test_rate_limit_and_server_errors_are_retried(provider):
+    provider._session.post.side_effect = [response(429), response(503), response(200)]
+    result, attempts = provider._post_with_retry(URL, {})
+    assert result.status_code == 200
+    assert attempts == 3
+    assert len(provider.sleeps) == 2
+
+def test_client_errors_are_not_retried(provider):
+    provider._session.post.side_effect = [response(400)]
+    with pytest.raises(requests.HTTPError):
+        provider._post_with_retry(URL, {})
+    assert provider._session.post.call_count == 1
+
+def test_gives_up_after_max_retries(provider):
+    provider._session.post.side_effect = [response(500)] * (provider.HTTP_MAX_RETRIES + 1)
+    with pytest.raises(requests.HTTPError):
+        provider._post_with_retry(URL, {})
+    assert provider._session.post.call_count == provider.HTTP_MAX_RETRIES + 1
+    assert len(provider.sleeps) == provider.HTTP_MAX_RETRIES
+
+def test_numeric_retry_after_is_honored(provider):
+    provider._session.post.side_effect = [response(429, {"Retry-After": "7"}), response(200)]
+    provider._post_with_retry(URL, {})
+    assert provider.sleeps == [7.0]
+
+def test_http_date_retry_after_is_honored(provider):
+    retry_at = formatdate(groq_provider.time.time() + 10, usegmt=True)
+    provider._session.post.side_effect = [response(503, {"Retry-After": retry_at}), response(200)]
+    provider._post_with_retry(URL, {})
+    assert 8 <= provider.sleeps[0] <= 10
+
+def test_waits_are_capped(provider):
+    provider._session.post.side_effect = [response(429, {"Retry-After": "3600"}), response(200)]
+    provider._post_with_retry(URL, {})
+    assert provider.sleeps == [provider.BACKOFF_MAX]
+
+def test_connection_errors_back_off_exponentially(provider):
+    provider._session.post.side_effect = [requests.ConnectionError("reset"), requests.Timeout("slow"), response(200)]
+    _, attempts = provider._post_with_retry(URL, {})
+    assert attempts == 3
+    first, second = provider.sleeps
+    assert provider.BACKOFF_BASE <= first <= provider.BACKOFF_BASE * 1.25
+    assert 2 * provider.BACKOFF_BASE <= second <= 2 * provider.BACKOFF_BASE * 1.25
+
+def test_connection_errors_raise_after_max_retries(provider):
+    provider._session.post.side_effect = requests.ConnectionError("down")
+    with pytest.raises(requests.ConnectionError):
+        provider._post_with_retry(URL, {})
+    assert provider._session.post.call_count == provider.HTTP_MAX_RETRIES + 1
+
+def test_backoff_delay_is_capped_when_sleeping(provider):
+    provider._session.post.side_effect = [response(502)] * provider.HTTP_MAX_RETRIES + [response(200)]
+    with mock.patch.object(provider, "_backoff_delay", return_value=1000.0):
+        provider._post_with_retry(URL, {})
+    assert provider.sleeps == [provider.BACKOFF_MAX] * provider.HTTP_MAX_RETRIES
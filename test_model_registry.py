@@ -0,0 +1,42 @@
+"""
+Unit tests for the model registry's refresh.
+
+Run with: python -m pytest test_model_registry.py
+"""
+
+import threading
+from unittest import mock
+
+import providers.model_registry as model_registry_module
+from providers.model_registry import ModelRegistry
+
+def test_lookups_are_not_blocked_by_a_refresh_in_flight(tmp_path, monkeypatch):
+    registry = ModelRegistry(ttl=3600, snapshot_path=str(tmp_path / "models.json"))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_get(url, headers, timeout):
+        started.set()
+        release.wait(10)
+        return mock.Mock(raise_for_status=lambda: None,
+                         json=lambda: {"data": [{"id": "new-model-70b", "context_window": 65536}]})
+
+    monkeypatch.setattr(model_registry_module.requests, "get", slow_get)
+    refresher = threading.Thread(target=registry.models, args=("gsk_test",), daemon=True)
+    refresher.start()
+    assert started.wait(5)
+
+    looked_up = []
+    lookup = threading.Thread(target=lambda: looked_up.append(registry.context_window("llama3-8b-8192")), daemon=True)
+    lookup.start()
+    lookup.join(2)
+    assert looked_up == [8192], "context_window waited for the HTTP refresh"
+
+    release.set()
+    refresher.join(5)
+    assert registry.context_window("new-model-70b") == 65536
+    assert (tmp_path / "models.json").exists()
+
+def test_failed_refresh_keeps_the_last_known_list(tmp_path, monkeypatch):
+    registry = ModelRegistry(ttl=0, snapshot_path=str(tmp_path / "models.json"))
+    monkeypatch.setattr(model_registry_module.requests, "get", mock.Mock(side_effect=OSError("offline")))
+    assert "llama3-8b-8192" in registry.models("gsk_test")
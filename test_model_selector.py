@@ -0,0 +1,101 @@
+"""
+Unit tests for automatic model selection.
+
+Run with: python -m pytest test_model_selector.py
+"""
+
+import importlib
+from unittest import mock
+
+from providers.latency_tracker import LatencyTracker
+from providers.model_selector import ModelSelector, model_size
+
+WINDOWS = {
+    "llama3-8b-8192": 8192,
+    "gemma-7b-it": 8192,
+    "mixtral-8x7b-32768": 32768,
+    "llama-3.1-70b-versatile": 131072,
+    "llama-3.2-11b-vision-preview": 8192,
+    "llama-guard-3-8b": 8192,
+}
+
+class FakeRegistry:
+    def context_windows(self, api_key=None, provider="groq"):
+        return dict(WINDOWS)
+
+def selector(tracker=None):
+    return ModelSelector(registry=FakeRegistry(), tracker=tracker or LatencyTracker())
+
+def test_model_size_parses_parameter_counts():
+    assert model_size("llama3-8b-8192") == 8
+    assert model_size("mixtral-8x7b-32768") == 56
+    assert model_size("claude-2.0") == float("inf")
+
+def test_small_prompt_gets_the_most_preferred_model():
+    assert selector().select(1000, 400) == "llama3-8b-8192"
+
+def test_large_prompt_gets_a_model_whose_window_fits():
+    assert selector().select(20000, 400) == "mixtral-8x7b-32768"
+    assert selector().select(60000, 400) == "llama-3.1-70b-versatile"
+
+def test_context_budget_caps_the_fit_check():
+    # With a 4096 budget no window is usable past 4096, so a bigger model buys nothing
+    assert selector().select(20000, 400, max_context=4096) == "llama3-8b-8192"
+    assert selector().select(20000, 400, max_context=32768) == "mixtral-8x7b-32768"
+
+def test_slow_models_are_skipped_when_others_meet_the_target():
+    tracker = LatencyTracker()
+    tracker.record("groq:llama3-8b-8192", 9.0)
+    assert selector(tracker).select(1000, 400, latency_target=5) == "gemma-7b-it"
+    assert selector(tracker).select(1000, 400, latency_target=20) == "llama3-8b-8192"
+
+def test_fastest_fitting_model_when_none_meets_the_target():
+    tracker = LatencyTracker()
+    for model, seconds in (("gemma-7b-it", 9.0), ("llama3-8b-8192", 7.0), ("mixtral-8x7b-32768", 8.0), ("llama-3.1-70b-versatile", 12.0)):
+        tracker.record(f"groq:{model}", seconds)
+    assert selector(tracker).select(1000, 400, latency_target=1) == "llama3-8b-8192"
+
+def test_largest_respects_the_context_budget():
+    assert selector().largest() == "llama-3.1-70b-versatile"
+    assert selector().largest(max_context=8192) == "llama3-8b-8192"
+
+def test_choice_does_not_depend_on_which_list_the_registry_holds():
+    live = dict(WINDOWS, **{"allam-2-7b": 4096, "llama-3.1-8b-instant": 131072})
+    class LiveRegistry:
+        def context_windows(self, api_key=None, provider="groq"):
+            return dict(live)
+    live_selector = ModelSelector(registry=LiveRegistry(), tracker=LatencyTracker())
+    for prompt_tokens in (0, 1000, 20000, 60000):
+        assert live_selector.select(prompt_tokens, 400) == selector().select(prompt_tokens, 400)
+
+def test_explicit_candidates_are_taken_in_the_given_order():
+    ordered = ModelSelector(candidates=["mixtral-8x7b-32768", "llama3-8b-8192"], registry=FakeRegistry(), tracker=LatencyTracker())
+    assert ordered.select(1000, 400) == "mixtral-8x7b-32768"
+
+def test_falls_back_to_size_order_when_no_candidate_is_listed():
+    class RetiredRegistry:
+        def context_windows(self, api_key=None, provider="groq"):
+            return {"qwen-32b": 32768, "allam-2-7b": 4096, "llama-guard-3-8b": 8192}
+    fallback = ModelSelector(registry=RetiredRegistry(), tracker=LatencyTracker())
+    assert fallback.select(1000, 400) == "allam-2-7b"
+    assert fallback.select(10000, 400) == "qwen-32b"
+
+def test_news_auto_fetches_for_the_largest_candidate(monkeypatch):
+    news_module = importlib.import_module("agents.News_Agent")
+
+    fetched = []
+    def fetch(url, output_format, max_tokens, token_counter):
+        fetched.append(max_tokens)
+        return "word " * 30000
+
+    monkeypatch.setattr(news_module, "WebGetContents_Tool", fetch)
+    monkeypatch.setattr(news_module, "get_page_cache", lambda: mock.Mock(get=mock.Mock(return_value=None)))
+    monkeypatch.setattr(news_module.ProviderFactory, "get_provider", lambda *args, **kwargs: mock.Mock())
+    # The constructor selects a model right away; keep it off the live registry
+    monkeypatch.setattr(news_module, "get_model_selector", lambda provider_name: selector())
+    agent = news_module.News_Agent("gsk_test", model="auto", max_tokens=32768)
+
+    content = agent._get_news_content("https://news.example/story")
+    # Sized for mixtral's 32k window rather than the small default model's
+    assert fetched[0] > 20000
+    assert agent._select_model(content, "https://news.example/story") == "mixtral-8x7b-32768"
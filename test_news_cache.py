@@ -0,0 +1,43 @@
+"""
+Unit tests for news result caching and stale refreshes.
+
+Run with: python -m pytest test_news_cache.py
+"""
+
+from agents import news_cache
+from agents.news_cache import NewsCache, merge_news_results
+from tools.cache import TieredCache
+
+def stories(*names):
+    return [{"url": f"https://news.example/{name}", "title": name} for name in names]
+
+def memory_cache(ttl=3600):
+    return NewsCache(TieredCache("news-test", ttl=ttl, persist=False))
+
+def test_merge_puts_newest_first_and_drops_duplicates():
+    merged = merge_news_results(stories("c", "b"), stories("b", "a"))
+    assert [story["title"] for story in merged] == ["c", "b", "a"]
+
+def test_merge_respects_limit():
+    assert len(merge_news_results(stories("d", "c"), stories("b", "a"), limit=3)) == 3
+
+def test_repeated_refreshes_stay_capped():
+    cache = memory_cache()
+    entry = cache.store("q", stories("a", "b", "c"), complete=False)
+    for round in range(10):
+        entry = cache.refresh("q", entry, stories(f"new{round}-1", f"new{round}-2"), limit=5)
+    assert len(entry["results"]) == 5
+    assert entry["results"][0]["title"] == "new9-1"
+    assert set(entry["first_seen"]) == {story["url"] for story in entry["results"]}
+
+def test_refresh_drops_stories_past_hard_ttl(monkeypatch):
+    cache = memory_cache(ttl=600)
+    clock = [1000.0]
+    monkeypatch.setattr(news_cache.time, "time", lambda: clock[0])
+    entry = cache.store("q", stories("old"), complete=True)
+    clock[0] += 400
+    entry = cache.refresh("q", entry, stories("mid"), limit=10)
+    clock[0] += 400
+    entry = cache.refresh("q", entry, stories("new"), limit=10)
+    assert [story["title"] for story in entry["results"]] == ["new", "mid"]
+    assert entry["complete"] is False
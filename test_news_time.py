@@ -0,0 +1,33 @@
+"""
+Unit tests for parsing the news "since" filter.
+
+Run with: python -m pytest test_news_time.py
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from agents.news_time import parse_since
+
+NOW = datetime(2024, 9, 12, 12, 0, tzinfo=timezone.utc)
+
+def test_accepts_ages_timestamps_and_iso_dates():
+    assert parse_since("6h", NOW) == NOW - timedelta(hours=6)
+    assert parse_since(0) == datetime(1970, 1, 1, tzinfo=timezone.utc)
+    assert parse_since("2024-09-01T00:00:00Z") == datetime(2024, 9, 1, tzinfo=timezone.utc)
+    assert parse_since(None) is None and parse_since("") is None
+
+@pytest.mark.parametrize("value", [["6h"], {"hours": 6}, True, 1e20, "sometime"])
+def test_unusable_values_raise_value_error(value):
+    with pytest.raises(ValueError):
+        parse_since(value, NOW)
+
+def test_api_rejects_a_non_string_since_with_400(monkeypatch):
+    import Groqqle
+    monkeypatch.setattr(Groqqle.model_registry, "models", lambda *args, **kwargs: {})
+    client = Groqqle.create_api_app("gsk_test").test_client()
+    for path in ("/search", "/news/articles"):
+        response = client.post(path, json={"query": "ai", "since": ["6h"]})
+        assert response.status_code == 400
+        assert "Invalid since value" in response.get_json()["error"]
@@ -0,0 +1,57 @@
+"""
+Unit tests for per-session prefetch cancellation.
+
+Run with: python -m pytest test_prefetcher.py
+"""
+
+import threading
+
+from agents.prefetcher import Prefetcher
+
+class BlockingAgent:
+    """Fake Web_Agent whose fetches wait until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def _get_web_content(self, url):
+        self.release.wait(5)
+        return "content"
+
+def results(*urls):
+    return [{"url": url} for url in urls]
+
+def queued_urls(prefetcher):
+    with prefetcher._queue.mutex:
+        return [item[3] for item in prefetcher._queue.queue]
+
+def test_cancel_drops_only_the_same_sessions_queue():
+    # No workers, so everything stays queued
+    prefetcher = Prefetcher(workers=0, top_k=3)
+    agent = BlockingAgent()
+    prefetcher.prefetch(agent, results("https://a/1", "https://a/2"), session="alice")
+    prefetcher.prefetch(agent, results("https://b/1"), session="bob")
+
+    prefetcher.cancel("alice")
+    assert queued_urls(prefetcher) == ["https://b/1"]
+    assert prefetcher.stats()["cancelled"] == 2
+
+def test_new_search_supersedes_only_its_own_session():
+    prefetcher = Prefetcher(workers=0, top_k=3)
+    agent = BlockingAgent()
+    prefetcher.prefetch(agent, results("https://a/1"), session="alice")
+    prefetcher.prefetch(agent, results("https://b/1"), session="bob")
+    prefetcher.prefetch(agent, results("https://a/2"), session="alice")
+
+    assert queued_urls(prefetcher) == ["https://b/1", "https://a/2"]
+    session, generation = next((item[0], item[1]) for item in prefetcher._queue.queue if item[0] == "bob")
+    assert prefetcher._is_current(session, generation)
+
+def test_forgotten_sessions_work_is_never_current():
+    prefetcher = Prefetcher(workers=0, top_k=1)
+    prefetcher.TRACKED_SESSIONS = 1
+    agent = BlockingAgent()
+    prefetcher.prefetch(agent, results("https://a/1"), session="alice")
+    generation = prefetcher._sessions["alice"]
+    prefetcher.prefetch(agent, results("https://b/1"), session="bob")
+    assert not prefetcher._is_current("alice", generation)
@@ -0,0 +1,143 @@
+"""
+Unit tests for prompt budgeting, chunking and token estimation.
+
+Run with: python -m pytest test_prompt_budget.py
+"""
+
+from agents.prompt_budget import (
+    MIN_CONTENT_TOKENS,
+    SAFETY_MARGIN_TOKENS,
+    TRUNCATION_RETRIES,
+    PromptBudget,
+    compact_prompt,
+    generate_within_budget,
+    split_into_chunks,
+)
+from providers.token_estimator import DEFAULT_CONTEXT_WINDOW, estimate_tokens, get_context_window, words_to_tokens
+
+# A model id the registry does not know, so its window comes from the id itself
+MODEL = "acme-chat-16384"
+
+def count_words(text):
+    return len(text.split())
+
+def test_estimate_tokens_rounds_up_and_handles_empty_text():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("a" * 7) == 2
+    assert words_to_tokens(100) == 135
+
+def test_context_window_parsed_from_model_id():
+    assert get_context_window("acme-chat-16384") == 16384
+    assert get_context_window("acme-32768-instruct") == 32768
+
+def test_context_window_falls_back_to_default():
+    assert get_context_window("acme-chat") == DEFAULT_CONTEXT_WINDOW
+    assert get_context_window(None) == DEFAULT_CONTEXT_WINDOW
+    assert get_context_window("acme-chat", default=1234) == 1234
+
+def test_budget_window_is_capped_by_requested_context():
+    assert PromptBudget(MODEL).context_window == 16384
+    assert PromptBudget(MODEL, context_window=4096).context_window == 4096
+    assert PromptBudget(MODEL, context_window=100000).context_window == 16384
+
+def test_content_budget_subtracts_instructions_output_cap_and_margin():
+    budget = PromptBudget(MODEL, context_window=4096, output_tokens=400)
+    instructions = "a" * 350  # 100 tokens at 3.5 characters per token
+    assert budget.max_output_tokens == 500
+    assert budget.content_budget(lambda content: instructions + content) == 4096 - 100 - 500 - SAFETY_MARGIN_TOKENS
+
+def test_content_budget_never_drops_below_minimum():
+    budget = PromptBudget(MODEL, context_window=1024, output_tokens=2000)
+    assert budget.content_budget(lambda content: content) == MIN_CONTENT_TOKENS
+
+def test_render_compacts_template_and_truncates_content():
+    budget = PromptBudget(MODEL, context_window=1024, output_tokens=100)
+    content = "\n\n".join(f"## Section {i}\n\n" + "word " * 200 for i in range(10))
+    prompt = budget.render(lambda page: f"""
+        Summarize:
+        {page}
+    """, content)
+    assert prompt.startswith("Summarize:\n")
+    assert prompt.endswith("[Content truncated]")
+    assert budget.count_tokens(prompt) <= budget.context_window - budget.max_output_tokens
+
+def test_compact_prompt_strips_indentation_and_blank_runs():
+    assert compact_prompt("\n    one\n\n\n\n    two\n") == "one\n\ntwo"
+
+def test_chunks_break_on_section_boundaries():
+    sections = [f"# Part {i}\n" + "word " * 8 for i in range(4)]
+    chunks = split_into_chunks("\n".join(sections), 25, count_words)
+    assert len(chunks) == 2
+    assert chunks[0].startswith("# Part 0") and "# Part 1" in chunks[0]
+    assert chunks[1].startswith("# Part 2")
+    assert all(count_words(chunk) <= 25 for chunk in chunks)
+
+def test_oversized_section_splits_on_paragraphs():
+    section = "# Big\n\n" + "\n\n".join("word " * 6 for _ in range(5))
+    chunks = split_into_chunks(section, 10, count_words)
+    assert all(count_words(chunk) <= 10 for chunk in chunks)
+    assert sum(count_words(chunk) for chunk in chunks) == count_words(section)
+
+def test_oversized_paragraph_is_cut_on_whitespace():
+    paragraph = " ".join(f"w{i}" for i in range(50))
+    chunks = split_into_chunks(paragraph, 10, count_words)
+    assert all(count_words(chunk) <= 10 for chunk in chunks)
+    assert " ".join(chunks).split() == paragraph.split()
+
+class StubProvider:
+    """Returns canned finish reasons in order and records the max_tokens of each call"""
+
+    def __init__(self, *finish_reasons):
+        self.finish_reasons = list(finish_reasons)
+        self.max_tokens = []
+        self.last_usage = None
+
+    def generate(self, prompt, max_tokens, temperature, model):
+        self.max_tokens.append(max_tokens)
+        self.last_usage = {"finish_reason": self.finish_reasons.pop(0), "prompt_tokens": 10}
+        return f"answer {len(self.max_tokens)}"
+
+def test_generation_is_capped_by_expected_output_not_context():
+    provider = StubProvider("stop")
+    budget = PromptBudget(MODEL, context_window=16384, output_tokens=400)
+    assert generate_within_budget(provider, "prompt", budget, 0.0) == "answer 1"
+    assert provider.max_tokens == [500]
+
+def test_truncated_answer_is_retried_with_double_cap():
+    provider = StubProvider("length", "stop")
+    budget = PromptBudget(MODEL, context_window=16384, output_tokens=400)
+    assert generate_within_budget(provider, "prompt", budget, 0.0) == "answer 2"
+    assert provider.max_tokens == [500, 1000]
+
+def test_retry_cap_is_bounded_by_room_left_in_the_window():
+    provider = StubProvider("max_tokens", "stop")
+    budget = PromptBudget(MODEL, context_window=1400, output_tokens=400)
+    prompt = "a" * 1400  # 400 tokens
+    generate_within_budget(provider, prompt, budget, 0.0)
+    assert provider.max_tokens == [500, 1400 - 400 - SAFETY_MARGIN_TOKENS]
+
+def test_no_retry_when_the_window_has_no_more_room():
+    provider = StubProvider("length")
+    budget = PromptBudget(MODEL, context_window=1024, output_tokens=400)
+    prompt = "a" * 1400  # leaves 496 tokens, less than the 500 already tried
+    assert generate_within_budget(provider, prompt, budget, 0.0) == "answer 1"
+    assert len(provider.max_tokens) == 1
+
+def test_partial_answer_returned_after_the_last_retry():
+    provider = StubProvider(*["length"] * (TRUNCATION_RETRIES + 1))
+    budget = PromptBudget(MODEL, context_window=16384, output_tokens=400)
+    assert generate_within_budget(provider, "prompt", budget, 0.0) == f"answer {TRUNCATION_RETRIES + 1}"
+    assert provider.max_tokens == [500 * 2 ** attempt for attempt in range(TRUNCATION_RETRIES + 1)]
+
+def test_recorded_prompt_sizes_are_exposed_in_cache_stats(monkeypatch):
+    import Groqqle
+    from providers.token_estimator import TokenEstimateStats
+    stats = TokenEstimateStats()
+    monkeypatch.setattr(Groqqle, "token_estimate_stats", stats)
+    monkeypatch.setattr("agents.prompt_budget.token_estimate_stats", stats)
+
+    PromptBudget(MODEL).record("a" * 350, {"prompt_tokens": 120})  # estimated at 100 tokens
+    response = Groqqle.create_api_app("gsk_test").test_client().get("/cache/stats")
+    assert response.get_json()["token_estimates"] == {
+        "default": {"requests": 1, "estimated": 100, "actual": 120, "actual_to_estimated": 1.2}
+    }
@@ -0,0 +1,60 @@
+"""
+Unit tests for the shared provider registry.
+
+Run with: python -m pytest test_provider_registry.py
+"""
+
+import threading
+import time
+
+from providers.provider_registry import ProviderRegistry
+
+def test_same_key_returns_shared_instance():
+    registry = ProviderRegistry()
+    first = registry.get("groq", "key", object)
+    assert registry.get("GROQ", "key", object) is first
+    assert registry.get("groq", "other-key", object) is not first
+    assert registry.stats()["hits"] == 1
+
+def test_factory_can_resolve_other_providers():
+    registry = ProviderRegistry()
+    outer = registry.get("outer", "key", lambda: ("outer", registry.get("inner", "key", object)))
+    assert outer[1] is registry.get("inner", "key", object)
+
+def test_slow_construction_does_not_block_other_keys():
+    registry = ProviderRegistry()
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return object()
+
+    worker = threading.Thread(target=registry.get, args=("slow", "key", slow))
+    worker.start()
+    started.wait(5)
+    began = time.monotonic()
+    registry.get("fast", "key", object)
+    assert time.monotonic() - began < 1
+    release.set()
+    worker.join(5)
+
+def test_concurrent_builders_share_one_instance():
+    registry = ProviderRegistry()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("groq", "key", object))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len({id(provider) for provider in results}) == 1
+
+def test_size_limit_evicts_least_recently_used():
+    registry = ProviderRegistry(max_size=2)
+    first = registry.get("a", "key", object)
+    registry.get("b", "key", object)
+    registry.get("a", "key", object)
+    registry.get("c", "key", object)
+    assert registry.get("a", "key", object) is first
+    assert registry.stats()["evictions"] == 1
@@ -0,0 +1,118 @@
+"""
+Unit tests for the token bucket and per-model request/token limits.
+
+Run with: python -m pytest test_rate_limiter.py
+"""
+
+import pytest
+
+from providers.rate_limiter import ModelRateLimiter
+from tools import rate_limiter
+from tools.rate_limiter import TokenBucket
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    return clock
+
+def test_bucket_allows_a_burst_then_reports_the_wait(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4.0)
+    assert [bucket.try_acquire() for _ in range(4)] == [0.0] * 4
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+def test_bucket_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2.0, capacity=4.0)
+    bucket.try_acquire(4)
+    clock.now += 1.0
+    assert bucket.available() == pytest.approx(2.0)
+    clock.now += 60.0
+    assert bucket.available() == pytest.approx(4.0)
+
+def test_acquire_blocks_until_tokens_refill(clock):
+    bucket = TokenBucket(rate=10.0, capacity=10.0)
+    bucket.acquire(10)
+    started = clock.now
+    assert bucket.acquire(5)
+    assert clock.now - started == pytest.approx(0.5)
+
+def test_acquire_times_out(clock):
+    bucket = TokenBucket(rate=1.0, capacity=1.0)
+    bucket.acquire()
+    assert bucket.acquire(timeout=0.5) is False
+
+def test_acquire_more_than_capacity_is_an_error(clock):
+    with pytest.raises(ValueError):
+        TokenBucket(rate=1.0, capacity=2.0).acquire(3)
+
+def test_credit_can_leave_the_bucket_in_debt(clock):
+    bucket = TokenBucket(rate=1.0, capacity=10.0)
+    bucket.credit(-15)
+    assert bucket.available() == pytest.approx(-5.0)
+    bucket.credit(100)
+    assert bucket.available() == pytest.approx(10.0)
+
+def test_reservation_covers_prompt_and_output(clock):
+    limiter = ModelRateLimiter(rpm=60, tpm=6000)
+    limiter.acquire(1000 + 2000)
+    assert limiter.tokens.available() == pytest.approx(3000)
+
+def test_settle_refunds_unused_output(clock):
+    limiter = ModelRateLimiter(rpm=60, tpm=6000)
+    limiter.acquire(3000)
+    limiter.settle(3000, {"total_tokens": 1200})
+    assert limiter.tokens.available() == pytest.approx(4800)
+
+def test_concurrent_reservations_cannot_exceed_tpm(clock):
+    limiter = ModelRateLimiter(rpm=60, tpm=6000)
+    limiter.acquire(3000)
+    limiter.acquire(3000)
+    # A third request has to wait for the bucket to refill, even before either one settles
+    assert limiter.tokens.try_acquire(3000) > 0
+
+def test_release_refunds_all_but_the_used_tokens(clock):
+    limiter = ModelRateLimiter(rpm=60, tpm=6000)
+    limiter.acquire(3000)
+    limiter.release(3000)
+    assert limiter.tokens.available() == pytest.approx(6000)
+    limiter.acquire(3000)
+    limiter.release(3000, used_tokens=500)
+    assert limiter.tokens.available() == pytest.approx(5500)
+
+@pytest.fixture
+def limited_provider(clock, monkeypatch):
+    from providers import groq_provider
+    limiter = ModelRateLimiter(rpm=60, tpm=6000)
+    monkeypatch.setattr(groq_provider.rate_limiters, "get", lambda api_key, model: limiter)
+    provider = groq_provider.GroqProvider("gsk_test")
+    provider.client = None
+    provider._response_cache_key = lambda data: (None, None)
+    return provider, limiter
+
+def test_failed_request_gets_its_reservation_back(limited_provider):
+    provider, limiter = limited_provider
+    provider._post_with_retry = lambda *args, **kwargs: (_ for _ in ()).throw(ConnectionError("down"))
+    with pytest.raises(Exception):
+        provider.send_request({"model": "llama3-8b-8192", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 2000})
+    assert limiter.tokens.available() == pytest.approx(6000)
+
+def test_closed_stream_keeps_only_what_was_streamed(limited_provider):
+    provider, limiter = limited_provider
+    provider._stream_http = lambda data: iter(["a" * 35] * 10)  # 10 tokens per delta
+    stream = provider.generate_stream("b" * 35, max_tokens=2000)
+    next(stream)
+    next(stream)
+    stream.close()
+    # Charged for the 10-token prompt and the two deltas read, not the 2000-token output cap
+    assert limiter.tokens.available() == pytest.approx(6000 - 30)
@@ -0,0 +1,71 @@
+"""
+Unit tests for building and using the routing provider.
+
+Run with: python -m pytest test_routing_provider.py
+"""
+
+import threading
+
+from providers.latency_tracker import LatencyTracker
+from providers.provider_factory import ProviderFactory
+from providers.provider_registry import provider_registry
+from providers.routing_provider import Route, RoutingProvider, parse_routes
+
+class FakeProvider:
+    max_concurrent_requests = 2
+
+    def __init__(self, answer=None, error=None):
+        self.answer = answer
+        self.error = error
+        self.last_usage = {}
+
+    def generate(self, prompt, **kwargs):
+        if self.error:
+            raise Exception(self.error)
+        return self.answer
+
+def test_factory_builds_routing_provider_without_deadlock(monkeypatch):
+    monkeypatch.setenv("ROUTING_BACKENDS", "groq:llama3-8b-8192,groq:mixtral-8x7b-32768")
+    provider_registry.clear()
+    built = []
+    worker = threading.Thread(target=lambda: built.append(ProviderFactory.get_provider("routing", "gsk_test")), daemon=True)
+    worker.start()
+    worker.join(10)
+    assert built, "get_provider('routing') did not return"
+
+    router = built[0]
+    assert isinstance(router, RoutingProvider)
+    assert [route.key for route in router.routes] == ["groq:llama3-8b-8192", "groq:mixtral-8x7b-32768"]
+    # Backends are the shared Groq provider for the key
+    assert router.routes[0].provider is ProviderFactory.get_provider("groq", "gsk_test")
+    assert ProviderFactory.get_provider("routing", "gsk_test") is router
+
+def test_backend_without_its_own_key_is_skipped(monkeypatch):
+    monkeypatch.setenv("ROUTING_BACKENDS", "anthropic,groq:llama3-8b-8192")
+    monkeypatch.delenv("ANTHROPIC_API_KEY", raising=False)
+    provider_registry.clear()
+    router = ProviderFactory.get_provider("routing", "gsk_test")
+    # The Groq key is never handed to the Anthropic backend
+    assert [route.key for route in router.routes] == ["groq:llama3-8b-8192"]
+
+def test_parse_routes():
+    assert parse_routes(" groq:llama3-8b-8192, Anthropic ,") == [("groq", "llama3-8b-8192"), ("anthropic", None)]
+
+def test_fails_over_to_the_next_backend():
+    tracker = LatencyTracker()
+    router = RoutingProvider([
+        Route("groq", FakeProvider(error="boom"), "a"),
+        Route("groq", FakeProvider(answer="ok"), "b"),
+    ], tracker=tracker)
+    assert router.generate("hi") == "ok"
+    assert router.last_usage["route"] == "groq:b"
+
+def test_prefers_the_faster_backend():
+    tracker = LatencyTracker()
+    tracker.record("groq:slow", 3.0)
+    tracker.record("groq:fast", 0.5)
+    router = RoutingProvider([
+        Route("groq", FakeProvider(answer="slow"), "slow"),
+        Route("groq", FakeProvider(answer="fast"), "fast"),
+    ], tracker=tracker)
+    assert router.generate("hi") == "fast"
@@ -0,0 +1,49 @@
+"""
+Unit tests for adaptive search over-fetching and top-up.
+
+Run with: python -m pytest test_search_overfetch.py
+"""
+
+from agents import search_overfetch
+from agents.search_overfetch import OverfetchTracker, search_with_topup
+from tools.web_tools.WebSearch_Tool import GOOGLE_PAGE_LIMIT, _set_backend
+
+def fake_google(calls):
+    def search(query, num_results, offset=0):
+        calls.append((num_results, offset))
+        count = min(num_results, GOOGLE_PAGE_LIMIT)
+        _set_backend("google", count)
+        return [{"url": f"https://example.com/{offset + i}"} for i in range(count)]
+    return search
+
+def keep_even(results):
+    return [result for result in results if int(result["url"].rsplit("/", 1)[1]) % 2 == 0]
+
+def test_placeholder_backends_are_not_recorded_or_predicted():
+    tracker = OverfetchTracker()
+    tracker.record("google", 10, 5)
+    tracker.record("generated", 3, 3)
+    tracker.record("error", 1, 0)
+    assert tracker.predicted_backend() == "google"
+    assert set(tracker.stats()) == {"google"}
+
+def test_fetch_count_scales_with_survival_rate():
+    tracker = OverfetchTracker(margin=0.0)
+    tracker.record("google", 10, 5)
+    assert tracker.fetch_count("google", 10) == 20
+    assert tracker.fetch_count("unknown", 10) == 20
+
+def test_top_up_fires_when_backend_caps_the_page(monkeypatch):
+    monkeypatch.setattr(search_overfetch, "overfetch_tracker", OverfetchTracker())
+    calls = []
+    raw, results = search_with_topup("q", 15, keep_even, lambda results: results, search=fake_google(calls))
+    # 15 wanted at the default 50% survival asks for more than Google's 20-result page
+    assert calls[0][0] > GOOGLE_PAGE_LIMIT
+    assert len(calls) == 2 and calls[1][1] == GOOGLE_PAGE_LIMIT
+    assert len(results) >= 15
+
+def test_no_top_up_when_enough_results_survive(monkeypatch):
+    monkeypatch.setattr(search_overfetch, "overfetch_tracker", OverfetchTracker())
+    calls = []
+    search_with_topup("q", 5, keep_even, lambda results: results, search=fake_google(calls))
+    assert len(calls) == 1
@@ -0,0 +1,39 @@
+"""
+Unit tests for the perceptual image hash.
+
+Run with: python -m pytest test_vision_cache.py
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+from providers.vision_cache import HASH_BITS, hamming_distance, perceptual_hash
+
+def sample_image(seed=0, size=256):
+    rng = np.random.default_rng(seed)
+    # Smooth shapes rather than noise, like a real picture
+    small = rng.integers(0, 256, (8, 8, 3), dtype=np.uint8)
+    return Image.fromarray(small).resize((size, size), Image.BICUBIC)
+
+def recompress(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue()))
+
+def test_hash_has_sixty_four_bits():
+    hashes = [perceptual_hash(sample_image(seed)) for seed in range(20)]
+    assert all(0 <= value < 2 ** HASH_BITS for value in hashes)
+    # Median thresholding sets about half the bits
+    assert all(20 <= bin(value).count("1") <= 44 for value in hashes)
+    assert max(value.bit_length() for value in hashes) == HASH_BITS
+
+def test_resized_and_recompressed_copies_hash_close():
+    image = sample_image()
+    original = perceptual_hash(image)
+    assert hamming_distance(original, perceptual_hash(image.resize((120, 120)))) <= 6
+    assert hamming_distance(original, perceptual_hash(recompress(image, 40))) <= 6
+
+def test_different_images_hash_far_apart():
+    assert hamming_distance(perceptual_hash(sample_image(1)), perceptual_hash(sample_image(2))) > 12
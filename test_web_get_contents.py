@@ -0,0 +1,34 @@
+"""
+Unit tests for stripping page chrome before a page is converted to markdown.
+
+Run with: python -m pytest test_web_get_contents.py
+"""
+
+from bs4 import BeautifulSoup
+
+from tools.web_tools.WebGetContents_Tool import BOILERPLATE_PATTERN, _strip_boilerplate
+
+STORY = " ".join(["The council approved the new budget after a long debate."] * 20)
+
+def stripped_text(html):
+    return _strip_boilerplate(BeautifulSoup(html, "html.parser")).get_text(" ", strip=True)
+
+def test_chrome_tokens_match_but_modifiers_do_not():
+    for token in ("sidebar", "left-sidebar", "share-buttons", "related-posts", "cookie-banner"):
+        assert BOILERPLATE_PATTERN.fullmatch(token), token
+    for token in ("no-sidebar", "has-sidebar", "with-comments", "comment-body", "article-related-content"):
+        assert not BOILERPLATE_PATTERN.fullmatch(token), token
+
+def test_wrapper_with_a_modifier_class_keeps_the_story():
+    html = f"""<body><div class="page no-sidebar"><h1>Budget passes</h1><p>{STORY}</p>
+        <div class="share-buttons">Share on social</div></div></body>"""
+    text = stripped_text(html)
+    assert "Budget passes" in text and "The council approved" in text
+    assert "Share on social" not in text
+
+def test_wrapper_holding_most_of_the_text_survives_a_misleading_name():
+    html = f"""<body><div id="main-menu-wrapper"><p>{STORY}</p></div>
+        <div class="sidebar">Popular this week</div></body>"""
+    text = stripped_text(html)
+    assert "The council approved" in text
+    assert "Popular this week" not in text
@@ -0,0 +1,155 @@
+# tools/cache.py
+
+# Two-tier key/value cache: an in-memory LRU in front of an optional SQLite store
+# Values must be JSON serializable
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEBUG = os.environ.get('DEBUG') == 'True'
+
+DEFAULT_CACHE_DIR = os.environ.get('GROQQLE_CACHE_DIR', os.path.join(os.getcwd(), '.groqqle_cache'))
+
+def log_debug(message):
+    if DEBUG:
+        print(message)
+
+class TieredCache:
+    """
+    LRU memory cache backed by a persistent SQLite tier.
+
+    Entries expire after ttl seconds (None for no expiry). Both tiers are size
+    bounded; the disk tier evicts least recently used rows.
+    """
+
+    # Check the disk tier size every this many writes rather than on every write
+    DISK_PRUNE_INTERVAL = 50
+
+    def __init__(self, name: str, max_memory_entries: int = 256, max_disk_entries: int = 5000,
+                 ttl: Optional[float] = None, persist: bool = True, cache_dir: Optional[str] = None):
+        self.name = name
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory = OrderedDict()
+        self._lock = threading.RLock()
+        self._writes = 0
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._db = None
+        if persist:
+            self._open_disk_tier(cache_dir or DEFAULT_CACHE_DIR)
+
+    def _open_disk_tier(self, cache_dir: str):
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            path = os.path.join(cache_dir, f"{self.name}.sqlite3")
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, created REAL, accessed REAL)"
+            )
+            self._db.commit()
+            log_debug(f"Opened {self.name} cache at {path}")
+        except (OSError, sqlite3.Error) as e:
+            # A read-only filesystem should not break the app; fall back to memory only
+            log_debug(f"Persistent {self.name} cache unavailable: {str(e)}")
+            self._db = None
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        value, created = json.loads(row[0]), row[1]
+                        if not self._expired(created):
+                            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+                            self._db.commit()
+                            self._remember(key, created, value)
+                            self._stats["disk_hits"] += 1
+                            return value
+                        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    log_debug(f"Error reading {self.name} cache: {str(e)}")
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            self._stats["stores"] += 1
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now)
+                )
+                self._db.commit()
+                self._writes += 1
+                if self._writes % self.DISK_PRUNE_INTERVAL == 0:
+                    self._prune_disk()
+            except (sqlite3.Error, TypeError, ValueError) as e:
+                log_debug(f"Error writing {self.name} cache: {str(e)}")
+
+    def _remember(self, key: str, created: float, value: Any):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _prune_disk(self):
+        if self.ttl is not None:
+            self._db.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+        count = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        excess = count - self.max_disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed ASC LIMIT ?)",
+                (excess,)
+            )
+            self._stats["evictions"] += excess
+        self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM entries")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["persistent"] = self._db is not None
+            return stats
@@ -0,0 +1,42 @@
+# tools/domain_utils.py
+
+# Root-domain extraction that never touches the network
+# tldextract's default extractor downloads the public suffix list on first use;
+# this one reads the snapshot bundled with the package, or a local PSL file if configured
+
+import os
+from functools import lru_cache
+
+import tldextract
+
+DEBUG = os.environ.get('DEBUG') == 'True'
+
+def log_debug(message):
+    if DEBUG:
+        print(message)
+
+def _suffix_list_urls():
+    # Optional local copy of public_suffix_list.dat, for deployments that want a newer list
+    path = os.environ.get('PUBLIC_SUFFIX_LIST_FILE')
+    if path:
+        return (f"file://{os.path.abspath(path)}",)
+    return ()
+
+# cache_dir=None keeps the extractor off the disk cache too; it is built once per process
+_extractor = tldextract.TLDExtract(suffix_list_urls=_suffix_list_urls(), cache_dir=None, fallback_to_snapshot=True)
+
+@lru_cache(maxsize=4096)
+def root_domain(url: str) -> str:
+    """
+    Return the registered domain of a URL, e.g. "bbc.co.uk" for "https://www.bbc.co.uk/news".
+
+    Falls back to the host name for addresses without a public suffix, such as IPs or localhost.
+    """
+    ext = _extractor(url)
+    if ext.domain and ext.suffix:
+        return f"{ext.domain}.{ext.suffix}"
+    return ext.domain or ""
+
+def domain_cache_info():
+    """Hit and miss counts of the root_domain memo, for /cache/stats"""
+    return root_domain.cache_info()._asdict()
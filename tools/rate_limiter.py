@@ -0,0 +1,103 @@
+# tools/rate_limiter.py
+
+# Token-bucket rate limiting, globally or per remote host
+# Callers block until a token is available instead of sleeping a fixed interval
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+DEBUG = os.environ.get('DEBUG') == 'True'
+
+def log_debug(message):
+    if DEBUG:
+        print(message)
+
+class TokenBucket:
+    """
+    Classic token bucket: refills at rate tokens per second up to capacity.
+
+    acquire() blocks until the requested tokens are available, so a burst of
+    up to capacity requests goes out immediately and the rest are spaced at
+    the refill rate.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available; otherwise return the seconds to wait (0.0 means acquired)"""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available; returns False if timeout expires first"""
+        if tokens > self.capacity:
+            raise ValueError(f"Cannot acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def credit(self, tokens: float):
+        """Return unused tokens, or charge extra ones with a negative amount; the balance may go into debt"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+
+class HostRateLimiter:
+    """One TokenBucket per host name, created on first use"""
+
+    def __init__(self, rate: float = 2.0, capacity: float = 4.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).hostname or url
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self._buckets[host]
+
+    def acquire(self, url: str, timeout: Optional[float] = None) -> bool:
+        started = time.monotonic()
+        acquired = self.bucket(url).acquire(timeout=timeout)
+        waited = time.monotonic() - started
+        if waited > 0.01:
+            log_debug(f"Rate limiter held request to {urlparse(url).hostname} for {waited:.2f}s")
+        return acquired
+
+host_rate_limiter = HostRateLimiter(
+    rate=float(os.environ.get('HOST_RATE_LIMIT', '2')),
+    capacity=float(os.environ.get('HOST_RATE_BURST', '4'))
+)
@@ -1,9 +1,11 @@
 # tools/web_tools/WebGetContents_Tool.py
 
 # Returns the text content of a web page given its URL
+# Supports plain text and structure-preserving Markdown output
 # No API key required
 
 import os
+import re
 import requests
 import sys
 from bs4 import BeautifulSoup
@@ -11,7 +13,42 @@ from bs4 import BeautifulSoup
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 DEBUG = os.environ.get('DEBUG') == 'True'
 
-def WebGetContents_Tool(URL):
+# Try to import html2text, but fall back to plain text extraction if it is missing
+try:
+    import html2text
+    HAS_HTML2TEXT = True
+except ImportError:
+    HAS_HTML2TEXT = False
+    if DEBUG:
+        print("Warning: html2text package not found; Markdown extraction will fall back to plain text")
+
+# Tags that never carry article content
+BOILERPLATE_TAGS = ["script", "style", "noscript", "nav", "footer", "aside", "form", "iframe", "svg", "button"]
+
+# A single class or id token that names page chrome: the keyword, optionally with one
+# leading qualifier and a trailing widget word ("share-buttons", "site-menu", "related-posts").
+# Tokens such as "comment-body" or "article-related-content" do not match, and neither do
+# layout modifiers on content wrappers ("no-sidebar", "has-sidebar", "with-comments").
+BOILERPLATE_PATTERN = re.compile(
+    r"(?!(?:no|has|with|without|is|show|hide|hidden|toggle|enable|disable|disabled)[-_])"
+    r"(?:[a-z0-9]+[-_])?"
+    r"(?:cookie|consent|banner|subscribe|newsletter|share|sharing|social|related|comments?|advert|ads?|promo|sidebar|breadcrumbs?|popup|modal|menu)s?"
+    r"(?:[-_](?:bar|box|buttons?|links?|list|widget|wrapper|container|section|area|block|panel|nav|tools|icons?|posts|stories|articles|items))?",
+    re.IGNORECASE
+)
+
+# A class match on an element holding more than this share of the page's text is taken
+# to be a content wrapper with a misleading name, not chrome, and is kept
+BOILERPLATE_MAX_TEXT_SHARE = 0.5
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+TRUNCATION_MARKER = "[Content truncated]"
+
+def _estimate_tokens(text):
+    # Rough heuristic: about four characters per token for English text
+    return len(text) // 4
+
+def _fetch_html(URL):
     headers = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,/;q=0.8',
@@ -21,25 +58,166 @@ def WebGetContents_Tool(URL):
         'Connection': 'keep-alive',
         'Upgrade-Insecure-Requests': '1',
     }
+    response = requests.get(URL, headers=headers, timeout=10)
+    response.raise_for_status()
+    return response.text
 
-    try:
-        response = requests.get(URL, headers=headers, timeout=10)
-        response.raise_for_status()
+def _extract_text(soup):
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    text = soup.get_text()
+
+    # Break into lines and remove leading and trailing space on each
+    lines = (line.strip() for line in text.splitlines())
+    # Break multi-headlines into a line each
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    # Drop blank lines
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+def _is_boilerplate(element):
+    tokens = list(element.get("class") or []) + ([element.get("id")] if element.get("id") else [])
+    return any(BOILERPLATE_PATTERN.fullmatch(token) for token in tokens)
+
+def _strip_boilerplate(soup):
+    # Prefer the main article body when the page marks one up
+    content = soup.find("article") or soup.find("main")
+    # The content element and everything that contains it must survive
+    protected = {id(content)} | {id(parent) for parent in content.parents} if content else set()
+
+    for tag in soup(BOILERPLATE_TAGS):
+        if id(tag) not in protected:
+            tag.decompose()
+
+    # Site headers are chrome, but an article's own <header> holds its headline and byline
+    for header in soup.find_all("header"):
+        if not header.decomposed and id(header) not in protected and header.find_parent(["article", "main"]) is None:
+            header.decompose()
+
+    page_text = len((soup.body or soup).get_text(" ", strip=True))
+    for element in soup.find_all(True):
+        if element.decomposed or element.attrs is None:
+            continue
+        # Never drop the document skeleton, only page chrome inside it
+        if element.name in ("html", "body", "main", "article") or id(element) in protected:
+            continue
+        if _is_boilerplate(element) and len(element.get_text(" ", strip=True)) <= page_text * BOILERPLATE_MAX_TEXT_SHARE:
+            element.decompose()
+
+    return content or soup.body or soup
 
-        soup = BeautifulSoup(response.text, 'html.parser')
+def _extract_markdown(soup):
+    root = _strip_boilerplate(soup)
 
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
+    converter = html2text.HTML2Text()
+    converter.ignore_links = True
+    converter.ignore_images = True
+    converter.ignore_tables = False
+    converter.body_width = 0
+    markdown = converter.handle(str(root))
 
-        text = soup.get_text()
+    cleaned_lines = []
+    previous = None
+    for line in markdown.splitlines():
+        line = line.rstrip()
+        # Drop separator-only lines such as "* * *" or "|---|"
+        if line and not re.search(r"[\w]", line):
+            continue
+        # Collapse runs of blank lines and repeated boilerplate lines
+        if line == previous and (not line or len(line) < 80):
+            continue
+        cleaned_lines.append(line)
+        previous = line
+
+    return "\n".join(cleaned_lines).strip()
+
+def split_markdown_sections(markdown):
+    # Each section starts at a Markdown heading; any text before the first heading is its own section
+    sections = []
+    current = []
+    for line in markdown.splitlines():
+        if HEADING_PATTERN.match(line) and current:
+            sections.append("\n".join(current).strip())
+            current = []
+        current.append(line)
+    if current:
+        sections.append("\n".join(current).strip())
+    return [section for section in sections if section]
+
+def truncate_markdown(markdown, max_tokens, token_counter=None):
+    """
+    Truncate Markdown to a token budget without cutting through the middle of a section.
+
+    Whole sections are kept while they fit. The first section that does not fit is
+    trimmed paragraph by paragraph, and a truncation marker is appended.
+
+    Args:
+        markdown: The Markdown text to truncate
+        max_tokens: The token budget for the returned text
+        token_counter: Optional callable returning the token count of a string
+
+    Returns:
+        The Markdown text, truncated to fit within max_tokens
+    """
+    count_tokens = token_counter or _estimate_tokens
+    if max_tokens is None or count_tokens(markdown) <= max_tokens:
+        return markdown
+
+    budget = max_tokens - count_tokens(TRUNCATION_MARKER)
+    kept = []
+    used = 0
+    for section in split_markdown_sections(markdown):
+        section_tokens = count_tokens(section)
+        if used + section_tokens <= budget:
+            kept.append(section)
+            used += section_tokens
+            continue
+
+        # Keep as many leading paragraphs of the overflowing section as fit
+        paragraphs = []
+        for paragraph in section.split("\n\n"):
+            paragraph_tokens = count_tokens(paragraph)
+            if used + paragraph_tokens > budget:
+                break
+            paragraphs.append(paragraph)
+            used += paragraph_tokens
+        # A heading with nothing under it is just noise
+        if paragraphs and not (len(paragraphs) == 1 and HEADING_PATTERN.match(paragraphs[0])):
+            kept.append("\n\n".join(paragraphs))
+        break
+
+    if not kept:
+        # Even the first paragraph is too large, so fall back to a hard cut
+        approx_chars = max(budget, 0) * 4
+        kept.append(markdown[:approx_chars].rsplit(" ", 1)[0])
+
+    return "\n\n".join(kept) + "\n\n" + TRUNCATION_MARKER
+
+def WebGetContents_Tool(URL, output_format='text', max_tokens=None, token_counter=None):
+    """
+    Retrieve the content of a web page.
+
+    Args:
+        URL: The URL of the page to fetch
+        output_format: 'text' for flattened plain text, 'markdown' to keep headings and lists
+        max_tokens: Optional token budget; Markdown output is truncated section-aware to fit
+        token_counter: Optional callable returning the token count of a string
+
+    Returns:
+        The page content as a string, or None if the page could not be retrieved
+    """
+    try:
+        html = _fetch_html(URL)
+        soup = BeautifulSoup(html, 'html.parser')
 
-        # Break into lines and remove leading and trailing space on each
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = '\n'.join(chunk for chunk in chunks if chunk)
+        if output_format == 'markdown' and HAS_HTML2TEXT:
+            text = _extract_markdown(soup)
+            text = truncate_markdown(text, max_tokens, token_counter)
+        else:
+            text = _extract_text(soup)
+            if max_tokens is not None:
+                text = truncate_markdown(text, max_tokens, token_counter)
 
         if DEBUG:
             print(f"Successfully retrieved content from {URL}")
@@ -55,13 +233,15 @@ def WebGetContents_Tool(URL):
 
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 2:
-        print("Usage: WebGetContents_Tool.py <URL>")
+    if len(sys.argv) < 2:
+        print("Usage: WebGetContents_Tool.py <URL> [text|markdown] [max_tokens]")
         sys.exit(1)
 
     url = sys.argv[1]
-    content = WebGetContents_Tool(url)
+    output_format = sys.argv[2] if len(sys.argv) > 2 else 'text'
+    max_tokens = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    content = WebGetContents_Tool(url, output_format, max_tokens)
     if content:
         print(content)  # Print first 500 characters
     else:
-        print("Failed to retrieve content")
\ No newline at end of file
+        print("Failed to retrieve content")
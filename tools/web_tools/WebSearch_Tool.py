@@ -1,5 +1,6 @@
 import os
 import sys
+import threading
 import time
 
 # Only import Selenium if not in cloud mode
@@ -30,6 +31,31 @@ def log_debug(message):
     if DEBUG:
         print(message)
 
+# Backends that honor the offset parameter, so a follow-up request returns new results
+OFFSET_BACKENDS = {"google", "bing_api", "selenium"}
+
+# Pseudo-backends that return canned links when every real search failed
+PLACEHOLDER_BACKENDS = {"generated", "error"}
+
+# Most results one request to a backend can return, whatever num_results asked for
+GOOGLE_PAGE_LIMIT = 20
+BING_PAGE_LIMIT = 50
+
+# Records which backend served the most recent search on each thread, and how many results it asked for
+_search_context = threading.local()
+
+def _set_backend(name, page_size=None):
+    _search_context.backend = name
+    _search_context.page_size = page_size
+
+def last_search_backend():
+    """Return the backend that served the most recent search on the calling thread"""
+    return getattr(_search_context, 'backend', None)
+
+def last_search_page_size():
+    """Return how many results the most recent search on the calling thread actually requested"""
+    return getattr(_search_context, 'page_size', None)
+
 def create_driver():
     """Create and configure a headless Chrome browser using webdriver-manager"""
     # Check if we're in cloud mode - if so, we can't create a driver
@@ -91,13 +117,14 @@ def create_driver():
             log_debug(f"Error creating Firefox driver: {str(e2)}")
             raise Exception("Could not initialize any webdriver. Make sure Chrome or Firefox is installed.")
 
-def WebSearch_Tool(query: str, num_results: int = 10):
+def WebSearch_Tool(query: str, num_results: int = 10, offset: int = 0):
     """
     Perform a Google search using either Selenium (local) or a direct API (cloud).
     
     Args:
         query: The search query string
         num_results: Maximum number of results to return
+        offset: Number of leading results to skip, for paging (only some backends honor it)
         
     Returns:
         List of dictionaries containing search results with title, url, and description
@@ -119,12 +146,12 @@ def WebSearch_Tool(query: str, num_results: int = 10):
     
     if CLOUD_MODE:
         log_debug("Running in cloud environment, using API fallback")
-        return _api_search(query, num_results)
+        return _api_search(query, num_results, offset)
     else:
         log_debug("Running in local environment, using Selenium")
-        return _selenium_search(query, num_results)
+        return _selenium_search(query, num_results, offset)
 
-def _api_search(query: str, num_results: int = 10):
+def _api_search(query: str, num_results: int = 10, offset: int = 0):
     """Use a simple API-based approach for cloud environments"""
     log_debug(f"Performing API search for query: {query}")
     
@@ -141,7 +168,7 @@ def _api_search(query: str, num_results: int = 10):
         try:
             # Format the query for Google search
             encoded_query = quote_plus(query)
-            search_url = f"https://www.google.com/search?q={encoded_query}&num={min(num_results + 5, 20)}"
+            search_url = f"https://www.google.com/search?q={encoded_query}&num={min(num_results + 5, GOOGLE_PAGE_LIMIT)}" + (f"&start={offset}" if offset else "")
             
             # Set up headers to look like a normal browser request
             headers = {
@@ -195,6 +222,7 @@ def _api_search(query: str, num_results: int = 10):
                 
                 if results:
                     log_debug(f"Successfully scraped {len(results)} results from Google")
+                    _set_backend("google", min(num_results, GOOGLE_PAGE_LIMIT))
                     return results
                 else:
                     log_debug("No results found in Google search response")
@@ -219,7 +247,7 @@ def _api_search(query: str, num_results: int = 10):
                 # Format for Bing Search API
                 search_url = "https://api.bing.microsoft.com/v7.0/search"
                 headers = {"Ocp-Apim-Subscription-Key": bing_api_key}
-                params = {"q": query, "count": num_results, "responseFilter": "Webpages"}
+                params = {"q": query, "count": min(num_results, BING_PAGE_LIMIT), "offset": offset, "responseFilter": "Webpages"}
                 
                 response = requests.get(search_url, headers=headers, params=params)
                 response.raise_for_status()
@@ -235,6 +263,7 @@ def _api_search(query: str, num_results: int = 10):
                 
                 if results:
                     log_debug(f"Successfully retrieved {len(results)} results from Bing API")
+                    _set_backend("bing_api", min(num_results, BING_PAGE_LIMIT))
                     return results
             else:
                 log_debug("No Bing API key found")
@@ -324,6 +353,7 @@ def _api_search(query: str, num_results: int = 10):
             
             if results:
                 log_debug(f"Successfully retrieved {len(results)} results from fallback search")
+                _set_backend("duckduckgo" if "duckduckgo" in search_url else "brave")
                 return results
             
         except Exception as e:
@@ -362,6 +392,7 @@ def _api_search(query: str, num_results: int = 10):
             
             if results:
                 log_debug(f"Successfully retrieved {len(results)} results from DDG JSON API")
+                _set_backend("ddg_json")
                 return results
                 
         except Exception as e:
@@ -369,6 +400,7 @@ def _api_search(query: str, num_results: int = 10):
         
         # Last resort: Generate search results with direct links
         log_debug("All search methods failed, returning generated results")
+        _set_backend("generated")
         return [
             {
                 "title": f"Google Search: {query}",
@@ -390,6 +422,7 @@ def _api_search(query: str, num_results: int = 10):
     except Exception as e:
         log_debug(f"API search fallback error: {str(e)}")
         # Return a generic result with the query so users can at least get something
+        _set_backend("error")
         return [
             {
                 "title": f"Search failed: {query}",
@@ -398,10 +431,11 @@ def _api_search(query: str, num_results: int = 10):
             }
         ]
 
-def _selenium_search(query: str, num_results: int = 10):
+def _selenium_search(query: str, num_results: int = 10, offset: int = 0):
     """Original Selenium-based search implementation for local environments"""
-    search_url = f"https://www.google.com/search?q={query}&num={num_results}"
+    search_url = f"https://www.google.com/search?q={query}&num={num_results}" + (f"&start={offset}" if offset else "")
     log_debug(f"Search URL: {search_url}")
+    _set_backend("selenium", num_results)
     
     driver = None
     try: